@@ -0,0 +1,203 @@
+"""
+Artifact manifest + HTTP caching helpers.
+Expose:
+  build_manifest(run_dir) -> dict   (call once after a run has written its files)
+  artifact_entry(run_dir, name) -> dict | None
+  not_modified(headers, etag, last_modified) -> bool
+  negotiate_encoding(accept_encoding, available) -> str | None
+A run's manifest records sha256/size/mtime for every artifact and the names of
+precompressed variants (.gz / .br) of the text artifacts, so requests never hash
+or compress anything on the fly.
+"""
+
+import os,gzip,json,hashlib,logging,threading
+from pathlib import Path
+from typing import Optional,Dict
+from email.utils import formatdate, parsedate_to_datetime
+
+# brotli is optional, gzip-only when missing
+BROTLI_AVAILABLE = True
+try:
+    import brotli
+except Exception:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger("artifacts")
+
+MANIFEST_NAME = "manifest.json"
+# text artifacts worth compressing (PDF/DOCX/PNG are already compressed)
+COMPRESSIBLE_SUFFIXES = {".csv", ".json", ".txt"}
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+# artifacts are immutable per run, clients must revalidate (cheap 304) before reuse
+CACHE_CONTROL = "no-cache"
+
+def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+def precompress(path: Path) -> Dict[str, str]:
+    """Write path.gz (and path.br if brotli is installed). Returns {encoding: filename}."""
+    data = path.read_bytes()
+    variants = {}
+    gz_path = path.with_name(path.name + ".gz")
+    # mtime=0 keeps the gzip bytes deterministic for identical input
+    with open(gz_path, "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    variants["gzip"] = gz_path.name
+    if BROTLI_AVAILABLE:
+        br_path = path.with_name(path.name + ".br")
+        with open(br_path, "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+        variants["br"] = br_path.name
+    return variants
+
+def _is_variant(name: str) -> bool:
+    return name == MANIFEST_NAME or any(name.endswith(s) for s in ENCODING_SUFFIXES.values())
+
+def build_manifest(run_dir) -> dict:
+    """
+    Hash every artifact in run_dir, precompress the text ones and write manifest.json.
+    meta.json is excluded: it points at the artifacts and is written after this.
+    """
+    run_dir = Path(run_dir)
+    artifacts = {}
+    for path in sorted(run_dir.iterdir()):
+        if not path.is_file() or _is_variant(path.name) or path.name == "meta.json":
+            continue
+        st = path.stat()
+        entry = {"sha256": sha256_file(path), "size": st.st_size, "mtime": st.st_mtime, "encodings": {}}
+        if path.suffix.lower() in COMPRESSIBLE_SUFFIXES:
+            try:
+                entry["encodings"] = precompress(path)
+            except Exception as e:
+                logger.warning("Precompression failed for %s: %s", path.name, e)
+        artifacts[path.name] = entry
+
+    run_hash = hashlib.sha256()
+    for name, entry in artifacts.items():
+        run_hash.update(f"{name}:{entry['sha256']}\n".encode("utf-8"))
+    manifest = {"run_etag": run_hash.hexdigest(), "artifacts": artifacts}
+
+    tmp = run_dir / (MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, run_dir / MANIFEST_NAME)
+    return manifest
+
+# manifest cache keyed by (path, mtime_ns) so /files does not re-read json per request
+_manifest_cache: Dict[str, tuple] = {}
+# fallback hashes for runs written before manifests existed, keyed by (path, mtime_ns, size)
+_hash_cache: Dict[tuple, str] = {}
+_cache_lock = threading.Lock()
+
+def load_manifest(run_dir) -> dict:
+    mf = Path(run_dir) / MANIFEST_NAME
+    try:
+        mtime = mf.stat().st_mtime_ns
+    except OSError:
+        return {}
+    key = str(mf)
+    with _cache_lock:
+        cached = _manifest_cache.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    try:
+        with open(mf, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except Exception as e:
+        logger.warning("Unreadable manifest %s: %s", mf, e)
+        return {}
+    with _cache_lock:
+        _manifest_cache[key] = (mtime, manifest)
+    return manifest
+
+def artifact_entry(run_dir, name: str) -> Optional[dict]:
+    """Manifest entry for an artifact; hashes legacy (manifest-less) files once and caches."""
+    path = Path(run_dir) / name
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    entry = load_manifest(run_dir).get("artifacts", {}).get(name)
+    if entry and entry.get("size") == st.st_size and abs(entry.get("mtime", 0) - st.st_mtime) < 1e-3:
+        return entry
+    key = (str(path), st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        digest = _hash_cache.get(key)
+    if digest is None:
+        digest = sha256_file(path)
+        with _cache_lock:
+            _hash_cache[key] = digest
+    return {"sha256": digest, "size": st.st_size, "mtime": st.st_mtime, "encodings": {}}
+
+def etag_for(entry: dict, encoding: Optional[str] = None) -> str:
+    # strong etag, one per representation (identity / gzip / br)
+    tag = entry["sha256"][:32]
+    if encoding:
+        tag = f"{tag}-{encoding}"
+    return f'"{tag}"'
+
+def http_date(ts: float) -> str:
+    return formatdate(ts, usegmt=True)
+
+def cache_headers(etag: str, last_modified: float) -> Dict[str, str]:
+    return {"ETag": etag, "Last-Modified": http_date(last_modified), "Cache-Control": CACHE_CONTROL}
+
+def _etag_matches(if_none_match: str, etags) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    candidates = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return any(e.removeprefix("W/") in candidates for e in etags)
+
+def not_modified(headers, etags, last_modified: float) -> bool:
+    """
+    RFC 9110 evaluation order: If-None-Match wins, If-Modified-Since only when it is absent.
+    etags: the representation's etag (or several, e.g. identity + encoded variants)
+    """
+    if isinstance(etags, str):
+        etags = [etags]
+    inm = headers.get("if-none-match")
+    if inm:
+        return _etag_matches(inm, etags)
+    ims = headers.get("if-modified-since")
+    if ims:
+        try:
+            since = parsedate_to_datetime(ims).timestamp()
+        except Exception:
+            return False
+        # HTTP dates have 1s resolution
+        return int(last_modified) <= int(since)
+    return False
+
+def negotiate_encoding(accept_encoding: Optional[str], available) -> Optional[str]:
+    """Pick the best precompressed variant the client accepts (br > gzip), honouring q=0."""
+    if not accept_encoding or not available:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token] = q
+    best, best_q = None, 0.0
+    for enc in ("br", "gzip"):
+        if enc not in available:
+            continue
+        q = accepted.get(enc, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
@@ -0,0 +1,131 @@
+"""
+Throughput benchmark: legacy generator-based StreamingResponse vs file_serving.ArtifactResponse.
+Usage (from server/):  python -m benchmarks.bench_file_serving [--size-mb 64] [--rounds 5] [--clients 4]
+Starts a uvicorn server on a free port serving one temp file through both implementations and
+downloads it repeatedly (full body, single range, multi-range) reporting MB/s per variant.
+"""
+
+import os,sys,time,socket,argparse,tempfile,threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import requests
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from file_serving import ArtifactResponse
+
+def legacy_response(path: Path, request: Request) -> StreamingResponse:
+    """Copy of the pre-ArtifactResponse serve_file path: 1 MB chunks through a Python generator."""
+    file_size = path.stat().st_size
+    rng = request.headers.get("range")
+    start, end = 0, file_size - 1
+    status = 200
+    if rng and rng.startswith("bytes=") and "," not in rng:
+        first, _, last = rng[6:].partition("-")
+        start = int(first) if first else file_size - int(last)
+        end = int(last) if (first and last) else file_size - 1
+        status = 206
+    length = end - start + 1
+    def iterfile():
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(1024 * 1024, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    headers = {"Content-Length": str(length), "Accept-Ranges": "bytes"}
+    if status == 206:
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    return StreamingResponse(iterfile(), status_code=status, headers=headers, media_type="application/octet-stream")
+
+def build_app(path: Path) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/legacy")
+    async def legacy(request: Request):
+        return legacy_response(path, request)
+
+    @app.get("/extensions")
+    async def extensions(request: Request):
+        return sorted((request.scope.get("extensions") or {}).keys())
+
+    @app.get("/artifact")
+    async def artifact(request: Request):
+        return ArtifactResponse(path, request, etag='"bench"', last_modified=path.stat().st_mtime)
+
+    return app
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def download(url: str, headers: dict) -> int:
+    total = 0
+    with requests.get(url, headers=headers, stream=True) as r:
+        r.raise_for_status()
+        for chunk in r.iter_content(chunk_size=1024 * 1024):
+            total += len(chunk)
+    return total
+
+def run_case(base: str, route: str, headers: dict, rounds: int, clients: int):
+    url = f"{base}/{route}"
+    download(url, headers)  # warm-up
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        sizes = list(pool.map(lambda _: download(url, headers), range(rounds * clients)))
+    elapsed = time.perf_counter() - start
+    mb = sum(sizes) / (1024 * 1024)
+    return mb / elapsed, elapsed
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size-mb", type=int, default=64)
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--clients", type=int, default=4)
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp()) / "artifact.bin"
+    with open(tmp, "wb") as f:
+        f.write(os.urandom(args.size_mb * 1024 * 1024))
+    size = tmp.stat().st_size
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(build_app(tmp), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    base = f"http://127.0.0.1:{port}"
+
+    cases = [
+        ("full", {}),
+        ("range (second half)", {"Range": f"bytes={size // 2}-"}),
+        ("multi-range (4 parts)", {"Range": "bytes=" + ",".join(f"{i * size // 4}-{i * size // 4 + size // 8}" for i in range(4))}),
+    ]
+    print(f"file={args.size_mb} MB rounds={args.rounds} clients={args.clients} uvicorn={uvicorn.__version__}")
+    # without these ArtifactResponse copies through userspace too, so expect parity, not a speedup
+    offered = [e for e in requests.get(f"{base}/extensions").json()
+               if e in ("http.response.zerocopysend", "http.response.pathsend")]
+    print("zero-copy extensions offered:", ", ".join(offered) or "none (userspace copy)")
+    for name, headers in cases:
+        for route in ("legacy", "artifact"):
+            if route == "legacy" and "," in headers.get("Range", ""):
+                print(f"{name:<24} {route:<9} unsupported (single range only)")
+                continue
+            mbps, elapsed = run_case(base, route, headers, args.rounds, args.clients)
+            print(f"{name:<24} {route:<9} {mbps:9.1f} MB/s  ({elapsed:.2f}s)")
+
+    server.should_exit = True
+    thread.join(timeout=5)
+    tmp.unlink(missing_ok=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+/classify latency under load: p50 / p99 per request and throughput with cross-request
+micro-batching (micro_batcher.py) against one model call per request (max_batch=1).
+Starts the API (main.app) with uvicorn on a free port in-process, warms the models up, then
+for every setting fires --requests posts from --clients concurrent clients. Settings are
+switched on the running batcher, so the models are loaded once.
+
+Usage (from server/):
+  python -m benchmarks.classify_latency
+  python -m benchmarks.classify_latency --clients 32 --requests 1000 --max-wait-ms 2 5 10 --max-batch 32
+  python -m benchmarks.classify_latency --corpus storage/latest/scraped_input.csv
+"""
+
+import sys,time,socket,argparse,statistics,threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import requests
+import uvicorn
+
+SAMPLE_POSTS = [
+    "Proud of India and our soldiers, jai hind",
+    "The government is failing on every policy it announces",
+    "Join the protest tomorrow against the new farm laws",
+    "Great match yesterday, what a finish",
+    "This is a foreign funded conspiracy to destabilize the country",
+    "Modi government did a great job with the vaccine rollout",
+    "Boycott india, they are the real problem here",
+    "Opposition parties need to come together before the elections",
+]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def load_posts(corpus: str, limit: int) -> list:
+    if not corpus:
+        return SAMPLE_POSTS
+    from src.train_stage_one import load_corpus_texts
+    return load_corpus_texts(corpus)[:limit] or SAMPLE_POSTS
+
+def run_load(url: str, posts: list, n: int, clients: int):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=clients, pool_maxsize=clients)
+    session.mount("http://", adapter)
+
+    def one(i: int) -> float:
+        start = time.perf_counter()
+        r = session.post(url, json={"text": posts[i % len(posts)]})
+        r.raise_for_status()
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = list(pool.map(one, range(n)))
+    return latencies, time.perf_counter() - start
+
+def pct(values: list, q: float) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--clients", type=int, default=16)
+    ap.add_argument("--max-wait-ms", type=float, nargs="+", default=[5.0])
+    ap.add_argument("--max-batch", type=int, nargs="+", default=[32])
+    ap.add_argument("--corpus", default=None, help="CSV of posts to send (default: built-in sample)")
+    args = ap.parse_args()
+
+    import main as api
+    posts = load_posts(args.corpus, args.requests)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    url = f"http://127.0.0.1:{port}/classify"
+
+    print("warming up the models ...")
+    run_load(url, posts, len(posts), 1)
+
+    # max_batch=1: every request is its own model call, the pre-batching behaviour
+    settings = [(0.0, 1)] + [(w, b) for w in args.max_wait_ms for b in args.max_batch]
+    print(f"requests={args.requests} clients={args.clients} posts={len(posts)}")
+    print(f"{'max_wait_ms':>11}{'max_batch':>10}{'p50 ms':>9}{'p99 ms':>9}{'req/s':>8}{'mean batch':>12}")
+    for max_wait_ms, max_batch in settings:
+        batcher = api.classify_batcher
+        batcher.max_wait_ms, batcher.max_batch = max_wait_ms, max_batch
+        before = (batcher.batches, batcher.batched)
+        latencies, elapsed = run_load(url, posts, args.requests, args.clients)
+        batches, batched = batcher.batches - before[0], batcher.batched - before[1]
+        print(f"{max_wait_ms:>11g}{max_batch:>10}{pct(latencies, 50):>9.1f}{pct(latencies, 99):>9.1f}"
+              f"{args.requests / elapsed:>8.1f}{batched / max(batches, 1):>12.2f}")
+
+    server.should_exit = True
+    thread.join(timeout=5)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Skip rate / agreement of the cascade (src/cascade.py) against the full pipeline on a reference corpus.
+Every post is run through the full pipeline once (features cached to --features-cache), then each
+threshold is evaluated offline: stage one answers when its margin confidence >= threshold,
+otherwise the full-pipeline label is used.
+
+Usage (from server/):
+  python -m benchmarks.eval_cascade --corpus storage/latest/scraped_input.csv --limit 500 \
+      --features-cache /tmp/cascade_features.npz
+Prints, per threshold: skip rate, agreement with the full pipeline, and the zero-shot time saved.
+Use a corpus the stage-one model was not trained on, or the agreement is optimistic.
+"""
+
+import sys,argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", required=True)
+    ap.add_argument("--limit", type=int, default=None)
+    ap.add_argument("--features-cache", default=None)
+    ap.add_argument("--thresholds", default="0.3,0.4,0.5,0.6,0.7,0.8,0.9")
+    args = ap.parse_args()
+
+    from src import cascade
+    from src.predict import clf as final_clf, margin_confidence
+    from src.train_stage_one import load_corpus_texts, corpus_features
+
+    texts = load_corpus_texts(args.corpus, args.limit)
+    X, context_s = corpus_features(texts, args.features_cache)
+    if not len(X):
+        print("No posts in corpus")
+        return
+    full_labels = final_clf.predict(X)
+    stage_one = [margin_confidence(cascade.stage_one_proba(x)) for x in X]
+    s1_labels = np.array([label for label, _ in stage_one])
+    s1_conf = np.array([conf for _, conf in stage_one])
+
+    print(f"posts={len(X)} stage-one model={'trained' if cascade.stage_one_clf is not None else 'fallback (final clf, neutral context)'}")
+    print(f"zero-shot context: {context_s.mean() * 1000:.1f} ms/post, {context_s.sum():.1f}s total")
+    print(f"stage-one alone agreement: {(s1_labels == full_labels).mean():.4f}")
+    print(f"{'threshold':>9} {'skip_rate':>9} {'agreement':>9} {'skipped_agree':>13} {'nli_saved_s':>11}")
+    for t in (float(x) for x in args.thresholds.split(",")):
+        skip = s1_conf >= t
+        cascade_labels = np.where(skip, s1_labels, full_labels)
+        agreement = (cascade_labels == full_labels).mean()
+        skipped_agree = (s1_labels[skip] == full_labels[skip]).mean() if skip.any() else float("nan")
+        print(f"{t:>9.2f} {skip.mean():>9.3f} {agreement:>9.4f} {skipped_agree:>13.4f} {context_s[skip].sum():>11.1f}")
+    print(f"(serving threshold: CASCADE_THRESHOLD={cascade.CASCADE_THRESHOLD})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Local fake Reddit API for exercising reddit_scrapper without credentials or network.
+Serves POST /api/v1/access_token and GET /r/all/search with Reddit-style listings, pagination
+and X-Ratelimit-* headers (a fixed request budget per window, 429 when exceeded).
+
+Usage (from server/):
+  python -m benchmarks.fake_reddit --port 8765                       # just serve
+  python -m benchmarks.fake_reddit --bench --latency-ms 150 --budget 600
+      -> runs scrape_reddit_concurrent against it and prints wall time / requests / 429s
+  python -m benchmarks.fake_reddit --bench --plan
+      -> same with the query_planner's OR-grouped searches (rows per API request)
+"""
+
+import sys,json,time,zlib,argparse,tempfile,threading
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+class FakeRedditState:
+    def __init__(self, budget: int, window: float, latency: float, posts_per_query: int):
+        self.budget = budget
+        self.window = window
+        self.latency = latency
+        self.posts_per_query = posts_per_query
+        self.window_start = time.monotonic()
+        self.used = 0
+        self.requests = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= self.window:
+                self.window_start, self.used = now, 0
+            self.requests += 1
+            reset = max(self.window - (now - self.window_start), 0.0)
+            if self.used >= self.budget:
+                self.throttled += 1
+                return False, 0, reset
+            self.used += 1
+            return True, self.budget - self.used, reset
+
+    def listing(self, query: str, limit: int, after: str):
+        start = int(after.split("_")[-1]) if after else 0
+        end = min(start + limit, self.posts_per_query)
+        words = query.replace("(", " ").replace(")", " ").replace('"', " ").split()
+        children = []
+        for i in range(start, end):
+            # ids overlap across queries sharing words, like real crossposted results
+            sid = f"{zlib.crc32(f'{words[i % len(words)]}:{i // 3}'.encode()):x}"
+            children.append({"kind": "t3", "data": {
+                "id": sid, "title": f"post about {' '.join(words)} #{i}", "score": i, "num_comments": i % 7,
+                "created_utc": 1_700_000_000 + i * 60, "author": f"user{i % 50}",
+                "subreddit": f"sub{i % 9}", "selftext": "lorem ipsum " * (i % 5), "url": f"https://example.org/{sid}",
+            }})
+        nxt = f"t3_{end}" if end < self.posts_per_query else None
+        return {"kind": "Listing", "data": {"children": children, "after": nxt}}
+
+def make_handler(state: FakeRedditState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            raw = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self._send(200, {"access_token": "fake-token", "token_type": "bearer", "expires_in": 3600})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/r/all/search":
+                return self._send(404, {"error": 404})
+            ok, remaining, reset = state.take()
+            headers = {"X-Ratelimit-Remaining": f"{remaining:.1f}", "X-Ratelimit-Reset": f"{int(reset) + 1}",
+                       "X-Ratelimit-Used": str(state.used)}
+            if not ok:
+                return self._send(429, {"error": 429}, headers)
+            time.sleep(state.latency)
+            qs = parse_qs(url.query)
+            body = state.listing(qs.get("q", [""])[0], int(qs.get("limit", ["25"])[0]), qs.get("after", [""])[0])
+            self._send(200, body, headers)
+    return Handler
+
+def serve(port: int, state: FakeRedditState) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=0)
+    ap.add_argument("--budget", type=int, default=600, help="requests allowed per window")
+    ap.add_argument("--window", type=float, default=600.0, help="rate-limit window in seconds")
+    ap.add_argument("--latency-ms", type=float, default=150.0)
+    ap.add_argument("--posts-per-query", type=int, default=150)
+    ap.add_argument("--per-query", type=int, default=100)
+    ap.add_argument("--total", type=int, default=800)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--bench", action="store_true")
+    ap.add_argument("--plan", action="store_true", help="use query_planner (stats kept in a temp dir)")
+    args = ap.parse_args()
+
+    state = FakeRedditState(args.budget, args.window, args.latency_ms / 1000, args.posts_per_query)
+    server = serve(args.port, state)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    print("fake reddit listening on", base)
+    if not args.bench:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return
+
+    import os
+    os.environ.setdefault("REDDIT_CLIENT_ID", "fake")
+    os.environ.setdefault("REDDIT_CLIENT_SECRET", "fake")
+    import reddit_scrapper
+    fetcher = reddit_scrapper.RedditSearchFetcher(api_base=base, auth_url=f"{base}/api/v1/access_token")
+    tmp = Path(tempfile.mkdtemp())
+    out = tmp / "scraped_input.csv"
+    plan = planner = None
+    if args.plan:
+        import query_planner
+        planner = query_planner.QueryPlanner(tmp / "query_stats.json")
+        plan = planner.plan(reddit_scrapper.political_queries, args.per_query)
+    start = time.perf_counter()
+    written = reddit_scrapper.scrape_reddit_concurrent(str(out), args.per_query, args.total,
+                                                       max_workers=args.workers, fetcher=fetcher,
+                                                       plan=plan, planner=planner)
+    elapsed = time.perf_counter() - start
+    print(f"rows={written} wall={elapsed:.2f}s requests={state.requests} throttled(429)={state.throttled}"
+          f" rows/request={written / max(state.requests, 1):.1f}")
+    # what the sequential path would have slept alone: 1.5 s after each of the queries it ran
+    print(f"sequential fixed sleeps alone: {1.5 * len(reddit_scrapper.political_queries):.1f}s")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Memory of the analysis frame (processor.ANALYSIS_SCHEMA: Arrow strings, categoricals, parsed
+numbers) against the same rows held the way the processor used to: every column an object
+column, plus the raw score / time strings.
+
+Usage (from server/):
+  python -m benchmarks.frame_memory --csv storage/latest/scraped_input.csv
+  python -m benchmarks.frame_memory --csv big.csv --repeat 20      # the input stacked 20 times
+Sentiment is a stand-in (labels cycled over the rows): no model runs, only the dtypes matter.
+Prints per-column and total MB for both layouts.
+"""
+
+import sys,argparse
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+LABELS = ["Pro-India", "Anti-India", "Pro-Government", "Anti-Government", "Neutral"]
+
+def mb(series: pd.Series) -> float:
+    return series.memory_usage(deep=True, index=False) / 1e6
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", required=True)
+    ap.add_argument("--repeat", type=int, default=1)
+    args = ap.parse_args()
+
+    import processor
+
+    raw = pd.concat([next(processor.read_input_chunks(args.csv, 0))] * args.repeat, ignore_index=True)
+    df = processor.normalize_chunk(raw, pd.Timestamp.now())
+    df["dup_group"] = range(len(df))
+    df["sentiment"] = [LABELS[i % len(LABELS)] for i in range(len(df))]
+    df["sentiment_score"] = 0.5
+    df = processor.annotate_chunk(df)
+
+    legacy = df.astype(object)
+    legacy["raw_score"] = raw["Score"].astype(object) if "Score" in raw else None
+    legacy["time_raw"] = raw["Time"].astype(object) if "Time" in raw else None
+
+    print(f"{len(df)} rows, Arrow strings: {processor.ARROW_AVAILABLE}")
+    print(f"{'column':<20}{'object MB':>12}{'schema MB':>12}")
+    for col in legacy.columns:
+        new = mb(df[col]) if col in df else 0.0
+        print(f"{col:<20}{mb(legacy[col]):>12.2f}{new:>12.2f}  {df[col].dtype if col in df else 'dropped'}")
+    old_total = legacy.memory_usage(deep=True, index=False).sum() / 1e6
+    new_total = df.memory_usage(deep=True, index=False).sum() / 1e6
+    print(f"{'total':<20}{old_total:>12.2f}{new_total:>12.2f}  ({old_total / max(new_total, 1e-9):.1f}x smaller)")
+
+if __name__ == "__main__":
+    main()
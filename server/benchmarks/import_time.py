@@ -0,0 +1,76 @@
+"""
+API server startup: wall time and peak RSS of importing main.py (what a fresh worker pays before
+it can serve /report or /files) against loading the processing stack it now defers to the first
+rerun (processing_loader.load(), optionally + the models).
+Every measurement runs in a fresh interpreter, so nothing is cached between repeats.
+
+Usage (from server/):
+  python -m benchmarks.import_time
+  python -m benchmarks.import_time --repeat 5 --models     # also time sentiment_analysis.warm_up()
+  python -m benchmarks.import_time --top 15                 # slowest modules under import main
+"""
+
+import sys,json,argparse,statistics,subprocess
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+PROBE = r"""
+import sys,time,json,resource
+start = time.perf_counter()
+error = None
+try:
+    {code}
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"s": elapsed, "rss_mb": rss / (1024 * 1024 if sys.platform == "darwin" else 1024), "error": error}}))
+"""
+
+CASES = {
+    "import main": "import main",
+    "processing stack": "import processing_loader; processing_loader.load()",
+    "processing stack + models": "import processing_loader; processing_loader.load().sentiment_analysis.warm_up()",
+}
+
+def measure(code: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE.format(code=code)], cwd=SERVER_DIR,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def top_imports(n: int) -> list:
+    """(cumulative seconds, module) of the slowest imports under `import main` (python -X importtime)."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=SERVER_DIR,
+                         capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]) / 1e6, parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:n]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--models", action="store_true", help="also load every model (downloads on first use)")
+    ap.add_argument("--top", type=int, default=0)
+    args = ap.parse_args()
+
+    cases = [c for c in CASES if args.models or "models" not in c]
+    print(f"{'case':<28}{'median s':>10}{'min s':>8}{'peak RSS MB':>13}")
+    for case in cases:
+        runs = [measure(CASES[case]) for _ in range(args.repeat)]
+        if runs[0]["error"]:
+            print(f"{case:<28}  failed: {runs[0]['error']}")
+            continue
+        secs = [r["s"] for r in runs]
+        print(f"{case:<28}{statistics.median(secs):>10.2f}{min(secs):>8.2f}{max(r['rss_mb'] for r in runs):>13.0f}")
+
+    if args.top:
+        print(f"\nslowest imports under `import main` (cumulative):")
+        for secs, module in top_imports(args.top):
+            print(f"{secs:>8.3f}s {module}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Model load time and memory: hub id (from_pretrained through the Hugging Face cache) against the
+local safetensors snapshot (src/model_snapshots.py, prepare_models.py).
+Each load runs in a fresh interpreter after the imports, so only the load itself is timed.
+RssAnon is private memory the weights were copied into; RssFile is the memory-mapped snapshot,
+page cache shared with every other process that maps it.
+
+Usage (from server/):
+  python prepare_models.py
+  python -m benchmarks.model_load
+  python -m benchmarks.model_load --only sentiment --repeat 5
+  python -m benchmarks.model_load --hub-id sentiment=/path/to/checkpoint   # compare another source
+"""
+
+import sys,json,argparse,statistics,subprocess
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+MODULES = {"embedder": "src.embeddings", "sentiment": "src.sentiment", "sarcasm": "src.sarcasm",
+           "context": "src.context_llm"}
+
+PROBE = r"""
+import sys,time,json
+def rss():
+    status = dict(l.split(":", 1) for l in open("/proc/self/status") if l.startswith("Rss"))
+    return {{k: int(v.split()[0]) / 1024 for k, v in status.items()}}
+import torch, transformers
+# transformers resolves its Auto classes lazily; import them here so only the load is timed
+from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+import {module}
+from src import model_manager, model_snapshots
+from pathlib import Path
+if {hub_id!r}:
+    model_snapshots._registry[{name!r}]["hub_id"] = {hub_id!r}
+if {mode!r} == "hub":
+    model_snapshots.SNAPSHOT_DIR = Path("/nonexistent")
+elif model_snapshots.snapshot_dir({name!r}) is None:
+    print(json.dumps({{"error": "no snapshot, run prepare_models.py"}}))
+    sys.exit(0)
+before = rss()
+start = time.perf_counter()
+model_manager.get({name!r})
+elapsed = time.perf_counter() - start
+after = rss()
+print(json.dumps({{"s": elapsed, "anon_mb": after["RssAnon"] - before["RssAnon"],
+                  "file_mb": after["RssFile"] - before["RssFile"]}}))
+"""
+
+def measure(name: str, mode: str, hub_id: str) -> dict:
+    code = PROBE.format(module=MODULES[name], name=name, mode=mode, hub_id=hub_id)
+    out = subprocess.run([sys.executable, "-c", code], cwd=SERVER_DIR, capture_output=True, text=True)
+    lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+    if not lines:
+        return {"error": (out.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(lines[-1])
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--only", nargs="+", choices=sorted(MODULES), default=sorted(MODULES))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--hub-id", action="append", default=[], help="name=hub_id or local checkpoint dir")
+    args = ap.parse_args()
+    overrides = dict(o.split("=", 1) for o in args.hub_id)
+
+    print(f"{'model':<10}{'source':<10}{'median s':>10}{'min s':>8}{'anon MB':>10}{'file MB':>10}")
+    for name in args.only:
+        medians = {}
+        for mode in ("hub", "snapshot"):
+            runs = [measure(name, mode, overrides.get(name, "")) for _ in range(args.repeat)]
+            if "error" in runs[0]:
+                print(f"{name:<10}{mode:<10}  {runs[0]['error']}")
+                continue
+            secs = [r["s"] for r in runs]
+            medians[mode] = statistics.median(secs)
+            print(f"{name:<10}{mode:<10}{medians[mode]:>10.2f}{min(secs):>8.2f}"
+                  f"{statistics.median(r['anon_mb'] for r in runs):>10.0f}{statistics.median(r['file_mb'] for r in runs):>10.0f}")
+        if len(medians) == 2:
+            print(f"{'':<10}{'speedup':<10}{medians['hub'] / max(medians['snapshot'], 1e-9):>9.1f}x")
+
+if __name__ == "__main__":
+    main()
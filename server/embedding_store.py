@@ -0,0 +1,299 @@
+"""
+Embedding store + "similar posts" search.
+Every published run appends the normalized mpnet embedding of each post (the one classify()
+already computed for the anchor comparison) to storage/embeddings/:
+  embeddings.f32   N x DIM float32, row-major (np.memmap)
+  posts.jsonl      N lines: post_id, run_id, subreddit, title, label, url, time
+  segments.jsonl   commit record per run (run_id, start, count, dim); rows past the last
+                   segment are crash leftovers and get truncated on the next append
+  .writer.lock     flocked by the staging RunWriter, so one writer appends at a time across processes
+Search is cosine similarity (= dot product, vectors are normalized) over the newest row of
+every post: exact blocked matmul by default, an HNSW graph (hnswlib, optional) once the store
+holds HNSW_MIN_ROWS posts.
+Expose: RunWriter(run_id).write(...)/commit()/abort(), append_run(...), SimilarityIndex().similar_to_post(post_id, k) / .search(vector, k)
+"""
+
+import os,json,time,logging,threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+try:
+    import fcntl
+except ImportError:  # Windows: writers only exclude each other within a process
+    fcntl = None
+
+logger = logging.getLogger("embedding_store")
+
+HNSW_AVAILABLE = True
+try:
+    import hnswlib
+except Exception:
+    HNSW_AVAILABLE = False
+
+BASE_DIR = Path(__file__).resolve().parent
+STORE_DIR = BASE_DIR / "storage" / "embeddings"
+EMBEDDINGS_FILE = "embeddings.f32"
+POSTS_FILE = "posts.jsonl"
+SEGMENTS_FILE = "segments.jsonl"
+WRITER_LOCK_FILE = ".writer.lock"
+# rows per matmul block in exact search (block x DIM float32 at a time)
+SEARCH_BLOCK_ROWS = int(os.environ.get("SIMILAR_BLOCK_ROWS", 65536))
+HNSW_MIN_ROWS = int(os.environ.get("SIMILAR_HNSW_MIN_ROWS", 50000))
+TITLE_CHARS = 300
+
+# held by a RunWriter from its first write() until commit()/abort(), together with an exclusive
+# flock on WRITER_LOCK_FILE for writers in other processes (uvicorn --workers N).
+# Not feature_store's: one run stages into both stores at once.
+_writer_lock = threading.Lock()
+
+def _acquire_writer(store_dir: Path):
+    """Wait for the store's writer slot; returns the lock file to hand to _release_writer."""
+    _writer_lock.acquire()
+    try:
+        store_dir.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            return None
+        f = open(store_dir / WRITER_LOCK_FILE, "a+b")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            f.close()
+            raise
+        return f
+    except BaseException:
+        _writer_lock.release()
+        raise
+
+def _release_writer(lock_file) -> None:
+    try:
+        if lock_file is not None:
+            lock_file.close()
+    finally:
+        _writer_lock.release()
+
+def _segments(store_dir: Path) -> List[dict]:
+    path = store_dir / SEGMENTS_FILE
+    if not path.exists():
+        return []
+    segments = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                try:
+                    segments.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+    return segments
+
+def _committed_rows(segments: List[dict]) -> int:
+    return segments[-1]["start"] + segments[-1]["count"] if segments else 0
+
+def _truncate(store_dir: Path, rows: int, dim: int) -> None:
+    path = store_dir / EMBEDDINGS_FILE
+    if path.exists() and path.stat().st_size > rows * dim * 4:
+        with open(path, "r+b") as f:
+            f.truncate(rows * dim * 4)
+    posts = store_dir / POSTS_FILE
+    if posts.exists():
+        with open(posts, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        if len(lines) > rows:
+            with open(posts, "w", encoding="utf-8") as f:
+                f.writelines(lines[:rows])
+
+class RunWriter:
+    """
+    Stages one run's rows chunk by chunk; they become searchable at commit() (see
+    feature_store.RunWriter, same protocol). Only one writer stages at a time.
+    """
+
+    def __init__(self, run_id: str, store_dir: Path = STORE_DIR):
+        self.run_id = run_id
+        self.store_dir = Path(store_dir)
+        self.start = None
+        self.dim = None
+        self.count = 0
+        self.failed = False
+        self._lock_file = None
+
+    def write(self, embeddings: np.ndarray, posts: List[dict]) -> int:
+        """posts: one dict per embedding row with at least post_id (subreddit, title, label, url, time optional)."""
+        if self.failed:
+            return 0
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if len(embeddings) != len(posts):
+            raise ValueError("embeddings and posts must have the same length")
+        if len(posts) == 0:
+            return 0
+        dim = embeddings.shape[1]
+        if self.start is None:
+            lock_file = _acquire_writer(self.store_dir)
+            try:
+                segments = _segments(self.store_dir)
+                if segments and segments[-1]["dim"] != dim:
+                    raise ValueError(f"Embedding dim {dim} does not match the store ({segments[-1]['dim']})")
+                self.start = _committed_rows(segments)
+                self.dim = dim
+                _truncate(self.store_dir, self.start, dim)
+            except Exception:
+                self.start = None
+                _release_writer(lock_file)
+                raise
+            self._lock_file = lock_file
+        elif dim != self.dim:
+            raise ValueError(f"Embedding dim {dim} does not match this run ({self.dim})")
+        try:
+            with open(self.store_dir / EMBEDDINGS_FILE, "ab") as f:
+                f.write(embeddings.tobytes())
+            with open(self.store_dir / POSTS_FILE, "a", encoding="utf-8") as f:
+                for p in posts:
+                    entry = {"post_id": str(p["post_id"]), "run_id": self.run_id,
+                             "subreddit": p.get("subreddit"), "title": (p.get("title") or "")[:TITLE_CHARS],
+                             "label": p.get("label"), "url": p.get("url"), "time": p.get("time")}
+                    f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        except Exception:
+            # a half-written chunk would misalign the files: drop the whole run
+            self.abort()
+            self.failed = True
+            raise
+        self.count += len(posts)
+        return len(posts)
+
+    def commit(self) -> int:
+        if self.start is None:
+            return 0
+        try:
+            with open(self.store_dir / SEGMENTS_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"run_id": self.run_id, "start": self.start, "count": self.count, "dim": self.dim,
+                                    "appended_at": time.time()}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            self.start = None
+            _release_writer(self._lock_file)
+            self._lock_file = None
+        logger.info("Embedding store: appended %d rows for run %s", self.count, self.run_id)
+        return self.count
+
+    def abort(self) -> None:
+        if self.start is None:
+            return
+        try:
+            _truncate(self.store_dir, self.start, self.dim)
+        except Exception as e:
+            # the next writer truncates the leftovers anyway
+            logger.warning("Embedding store: dropping staged rows of run %s failed: %s", self.run_id, e)
+        finally:
+            self.start = None
+            _release_writer(self._lock_file)
+            self._lock_file = None
+
+def append_run(run_id: str, embeddings: np.ndarray, posts: List[dict], store_dir: Path = STORE_DIR) -> int:
+    """Append one run's rows in one go."""
+    writer = RunWriter(run_id, store_dir)
+    try:
+        writer.write(embeddings, posts)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.commit()
+
+class SimilarityIndex:
+    """Snapshot of the committed rows; call refresh() to pick up newly appended runs."""
+
+    def __init__(self, store_dir: Path = STORE_DIR):
+        self.store_dir = Path(store_dir)
+        self.rows = -1
+        self._hnsw = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self) -> None:
+        with self._lock:
+            segments = _segments(self.store_dir)
+            rows = _committed_rows(segments)
+            if rows == self.rows:
+                return
+            self.rows = rows
+            self.dim = segments[-1]["dim"] if segments else 0
+            if rows:
+                self.matrix = np.memmap(self.store_dir / EMBEDDINGS_FILE, dtype=np.float32, mode="r",
+                                        shape=(rows, self.dim))
+                with open(self.store_dir / POSTS_FILE, "r", encoding="utf-8") as f:
+                    self.posts = [json.loads(line) for _, line in zip(range(rows), f)]
+            else:
+                self.matrix = np.zeros((0, 0), dtype=np.float32)
+                self.posts = []
+            # a post scraped again in a later run is searched once, as its newest row
+            latest: Dict[str, int] = {}
+            for i, p in enumerate(self.posts):
+                latest[p["post_id"]] = i
+            self.latest = latest
+            self.live = np.array(sorted(latest.values()), dtype=np.int64)
+            self._hnsw = None
+
+    def _hnsw_index(self):
+        if not HNSW_AVAILABLE or len(self.live) < HNSW_MIN_ROWS:
+            return None
+        if self._hnsw is None:
+            start = time.perf_counter()
+            index = hnswlib.Index(space="ip", dim=self.dim)
+            index.init_index(max_elements=len(self.live), ef_construction=200, M=16)
+            index.add_items(self.matrix[self.live], self.live)
+            index.set_ef(64)
+            self._hnsw = index
+            logger.info("Built HNSW index over %d posts in %.1fs", len(self.live), time.perf_counter() - start)
+        return self._hnsw
+
+    def _exact(self, vector: np.ndarray, k: int):
+        best_idx = np.zeros(0, dtype=np.int64)
+        best_score = np.zeros(0, dtype=np.float32)
+        for start in range(0, len(self.live), SEARCH_BLOCK_ROWS):
+            rows = self.live[start:start + SEARCH_BLOCK_ROWS]
+            scores = self.matrix[rows] @ vector
+            if len(scores) > k:
+                top = np.argpartition(-scores, k)[:k]
+                rows, scores = rows[top], scores[top]
+            best_idx = np.concatenate([best_idx, rows])
+            best_score = np.concatenate([best_score, scores])
+            if len(best_idx) > k:
+                top = np.argpartition(-best_score, k)[:k]
+                best_idx, best_score = best_idx[top], best_score[top]
+        order = np.argsort(-best_score)
+        return best_idx[order], best_score[order]
+
+    def search(self, vector: np.ndarray, k: int = 10, exclude_post: Optional[str] = None) -> List[dict]:
+        """Top-k posts by cosine similarity to a normalized vector."""
+        if self.rows <= 0:
+            return []
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        want = k + 1 if exclude_post else k
+        index = self._hnsw_index()
+        if index is not None:
+            labels, distances = index.knn_query(vector, k=min(want, len(self.live)))
+            # hnswlib "ip" distance is 1 - dot
+            idx, scores = labels[0].astype(np.int64), 1.0 - distances[0]
+        else:
+            idx, scores = self._exact(vector, min(want, len(self.live)))
+        out = []
+        for i, score in zip(idx, scores):
+            post = self.posts[int(i)]
+            if post["post_id"] == exclude_post:
+                continue
+            out.append({**post, "score": round(float(score), 4)})
+        return out[:k]
+
+    def vector_for(self, post_id: str) -> Optional[np.ndarray]:
+        row = self.latest.get(str(post_id))
+        return None if row is None else np.asarray(self.matrix[row])
+
+    def post(self, post_id: str) -> Optional[dict]:
+        row = self.latest.get(str(post_id))
+        return None if row is None else self.posts[row]
+
+    def similar_to_post(self, post_id: str, k: int = 10) -> Optional[List[dict]]:
+        vector = self.vector_for(post_id)
+        if vector is None:
+            return None
+        return self.search(vector, k, exclude_post=str(post_id))
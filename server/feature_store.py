@@ -0,0 +1,286 @@
+"""
+Append-only feature store for retraining without re-running the transformers.
+Every published run appends the 13-dim feature vectors it classified (src/feature_builder order),
+plus post ids, predicted labels and the cascade stage, to flat files under storage/features/:
+  features.f32     N x 13 float32, row-major        (np.memmap)
+  labels.i1        N int8 predicted label index      (np.memmap, -1 = unknown)
+  stages.i1        N int8: 2 = full pipeline, 1 = cascade stage one (context features are the
+                   neutral placeholder, not real zero-shot scores)
+  post_ids.txt     N lines
+  segments.jsonl   one line per appended run: run_id, start, count, model_version, appended_at;
+                   written last, so it is the commit record (rows past the last segment are
+                   leftovers of a crash and get truncated on the next append)
+  corrections.jsonl  analyst labels: post_id, label, analyst, note, ts (latest line per post wins)
+  .writer.lock  flocked by the staging RunWriter, so one writer appends at a time across processes
+Expose: RunWriter(run_id).write(...)/commit()/abort(), append_run(...), load() -> FeatureStore, add_correction(...), corrections(), model_version()
+"""
+
+import os,json,time,hashlib,logging,threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+try:
+    import fcntl
+except ImportError:  # Windows: writers only exclude each other within a process
+    fcntl = None
+
+logger = logging.getLogger("feature_store")
+
+BASE_DIR = Path(__file__).resolve().parent
+STORE_DIR = BASE_DIR / "storage" / "features"
+MODELS_DIR = BASE_DIR / "models"
+N_FEATURES = 13
+FEATURES_FILE = "features.f32"
+LABELS_FILE = "labels.i1"
+STAGES_FILE = "stages.i1"
+IDS_FILE = "post_ids.txt"
+SEGMENTS_FILE = "segments.jsonl"
+CORRECTIONS_FILE = "corrections.jsonl"
+WRITER_LOCK_FILE = ".writer.lock"
+
+# same order as sentiment_analysis.LABELS (not imported: that pulls in every model)
+LABELS = ["Pro-India", "Anti-India", "Pro-Government", "Anti-Government", "Neutral"]
+
+_lock = threading.Lock()
+# held by a RunWriter from its first write() until commit()/abort(), together with an exclusive
+# flock on WRITER_LOCK_FILE for writers in other processes (uvicorn --workers N)
+_writer_lock = threading.Lock()
+
+def _acquire_writer(store_dir: Path):
+    """Wait for the store's writer slot; returns the lock file to hand to _release_writer."""
+    _writer_lock.acquire()
+    try:
+        store_dir.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            return None
+        f = open(store_dir / WRITER_LOCK_FILE, "a+b")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            f.close()
+            raise
+        return f
+    except BaseException:
+        _writer_lock.release()
+        raise
+
+def _release_writer(lock_file) -> None:
+    try:
+        if lock_file is not None:
+            lock_file.close()
+    finally:
+        _writer_lock.release()
+
+def label_index(label) -> int:
+    try:
+        return LABELS.index(str(label))
+    except ValueError:
+        return -1
+
+def model_version() -> str:
+    """Short hash of the model files that produced the features and labels."""
+    h = hashlib.sha256()
+    for name in ("final_classifier.pkl", "stage_one_classifier.pkl"):
+        path = MODELS_DIR / name
+        if path.exists():
+            h.update(name.encode())
+            h.update(path.read_bytes())
+    return h.hexdigest()[:12]
+
+def _segments(store_dir: Path) -> List[dict]:
+    path = store_dir / SEGMENTS_FILE
+    if not path.exists():
+        return []
+    segments = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                try:
+                    segments.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # torn last line from a crash: everything after it is uncommitted
+                    break
+    return segments
+
+def _committed_rows(segments: List[dict]) -> int:
+    return segments[-1]["start"] + segments[-1]["count"] if segments else 0
+
+def _truncate(store_dir: Path, rows: int) -> None:
+    """Drop rows appended by a crashed writer after the last committed segment."""
+    for name, width in ((FEATURES_FILE, N_FEATURES * 4), (LABELS_FILE, 1), (STAGES_FILE, 1)):
+        path = store_dir / name
+        if path.exists() and path.stat().st_size > rows * width:
+            with open(path, "r+b") as f:
+                f.truncate(rows * width)
+    ids_path = store_dir / IDS_FILE
+    if ids_path.exists():
+        with open(ids_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        if len(lines) > rows:
+            with open(ids_path, "w", encoding="utf-8") as f:
+                f.writelines(lines[:rows])
+
+class RunWriter:
+    """
+    Writes one run's rows chunk by chunk (processor.py streams its input). Rows land past the
+    committed end of the files and stay invisible to readers until commit() writes the segment;
+    abort() (or a crash) leaves them as leftovers that the next writer truncates.
+    Only one writer stages at a time: the first write() waits for the previous one to finish.
+    """
+
+    def __init__(self, run_id: str, version: Optional[str] = None, store_dir: Path = STORE_DIR):
+        self.run_id = run_id
+        self.version = version
+        self.store_dir = Path(store_dir)
+        self.start = None
+        self.count = 0
+        self.failed = False
+        self._lock_file = None
+
+    def write(self, post_ids: List[str], features: np.ndarray, labels: List, stages: List[int]) -> int:
+        """Stage rows; labels may be label strings or indices. Returns rows staged."""
+        if self.failed:
+            return 0
+        features = np.ascontiguousarray(features, dtype=np.float32).reshape(-1, N_FEATURES)
+        n = len(features)
+        if not (len(post_ids) == len(labels) == len(stages) == n):
+            raise ValueError("post_ids, features, labels and stages must have the same length")
+        if n == 0:
+            return 0
+        label_idx = np.array([l if isinstance(l, (int, np.integer)) else label_index(l) for l in labels], dtype=np.int8)
+        if self.start is None:
+            lock_file = _acquire_writer(self.store_dir)
+            try:
+                self.start = _committed_rows(_segments(self.store_dir))
+                _truncate(self.store_dir, self.start)
+            except Exception:
+                self.start = None
+                _release_writer(lock_file)
+                raise
+            self._lock_file = lock_file
+        try:
+            with open(self.store_dir / FEATURES_FILE, "ab") as f:
+                f.write(features.tobytes())
+            with open(self.store_dir / LABELS_FILE, "ab") as f:
+                f.write(label_idx.tobytes())
+            with open(self.store_dir / STAGES_FILE, "ab") as f:
+                f.write(np.asarray(stages, dtype=np.int8).tobytes())
+            with open(self.store_dir / IDS_FILE, "a", encoding="utf-8") as f:
+                f.writelines(f"{str(pid).strip()}\n" for pid in post_ids)
+        except Exception:
+            # a half-written chunk would misalign the files: drop the whole run
+            self.abort()
+            self.failed = True
+            raise
+        self.count += n
+        return n
+
+    def commit(self) -> int:
+        """Make the staged rows visible. Returns rows committed."""
+        if self.start is None:
+            return 0
+        try:
+            segment = {"run_id": self.run_id, "start": self.start, "count": self.count,
+                       "model_version": self.version or model_version(), "appended_at": time.time()}
+            with open(self.store_dir / SEGMENTS_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(segment) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            self.start = None
+            _release_writer(self._lock_file)
+            self._lock_file = None
+        logger.info("Feature store: appended %d rows for run %s (rows %d-%d)", self.count, self.run_id,
+                    segment["start"], segment["start"] + self.count - 1)
+        return self.count
+
+    def abort(self) -> None:
+        """Drop the staged rows."""
+        if self.start is None:
+            return
+        try:
+            _truncate(self.store_dir, self.start)
+        except Exception as e:
+            # the next writer truncates the leftovers anyway
+            logger.warning("Feature store: dropping staged rows of run %s failed: %s", self.run_id, e)
+        finally:
+            self.start = None
+            _release_writer(self._lock_file)
+            self._lock_file = None
+
+def append_run(run_id: str, post_ids: List[str], features: np.ndarray, labels: List, stages: List[int],
+               version: Optional[str] = None, store_dir: Path = STORE_DIR) -> int:
+    """Append one run's rows in one go; labels may be label strings or indices. Returns rows appended."""
+    writer = RunWriter(run_id, version, store_dir)
+    try:
+        writer.write(post_ids, features, labels, stages)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.commit()
+
+class FeatureStore:
+    """Read-only view of the committed rows; features/labels/stages are memory-mapped."""
+
+    def __init__(self, store_dir: Path = STORE_DIR):
+        self.store_dir = Path(store_dir)
+        self.segments = _segments(self.store_dir)
+        self.rows = _committed_rows(self.segments)
+        if self.rows:
+            self.features = np.memmap(self.store_dir / FEATURES_FILE, dtype=np.float32, mode="r",
+                                      shape=(self.rows, N_FEATURES))
+            self.labels = np.memmap(self.store_dir / LABELS_FILE, dtype=np.int8, mode="r", shape=(self.rows,))
+            self.stages = np.memmap(self.store_dir / STAGES_FILE, dtype=np.int8, mode="r", shape=(self.rows,))
+            with open(self.store_dir / IDS_FILE, "r", encoding="utf-8") as f:
+                self.post_ids = [line.rstrip("\n") for _, line in zip(range(self.rows), f)]
+        else:
+            self.features = np.zeros((0, N_FEATURES), dtype=np.float32)
+            self.labels = np.zeros(0, dtype=np.int8)
+            self.stages = np.zeros(0, dtype=np.int8)
+            self.post_ids = []
+
+    def model_versions(self) -> np.ndarray:
+        """Model version of every row (from the segments)."""
+        out = np.empty(self.rows, dtype=object)
+        for seg in self.segments:
+            out[seg["start"]:seg["start"] + seg["count"]] = seg["model_version"]
+        return out
+
+    def latest_rows(self) -> np.ndarray:
+        """Row index of the newest occurrence of every post (posts reappear across runs)."""
+        latest: Dict[str, int] = {}
+        for i, pid in enumerate(self.post_ids):
+            latest[pid] = i
+        return np.array(sorted(latest.values()), dtype=np.int64)
+
+def load(store_dir: Path = STORE_DIR) -> FeatureStore:
+    return FeatureStore(store_dir)
+
+def add_correction(post_id: str, label: str, analyst: Optional[str] = None, note: Optional[str] = None,
+                   store_dir: Path = STORE_DIR) -> dict:
+    if label_index(label) < 0:
+        raise ValueError(f"Unknown label {label!r}, expected one of {LABELS}")
+    entry = {"post_id": str(post_id), "label": label, "analyst": analyst, "note": note, "ts": time.time()}
+    with _lock:
+        store_dir.mkdir(parents=True, exist_ok=True)
+        with open(store_dir / CORRECTIONS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return entry
+
+def corrections(store_dir: Path = STORE_DIR) -> Dict[str, int]:
+    """post_id -> corrected label index (latest correction wins)."""
+    out: Dict[str, int] = {}
+    path = store_dir / CORRECTIONS_FILE
+    if not path.exists():
+        return out
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            idx = label_index(entry.get("label"))
+            if idx >= 0:
+                out[str(entry["post_id"])] = idx
+    return out
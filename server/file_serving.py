@@ -0,0 +1,190 @@
+"""
+File-serving layer for run artifacts.
+Expose: ArtifactResponse(path, request, media_type=..., etag=..., last_modified=...)
+- Range / If-Range for every artifact type, single and multi-range (multipart/byteranges)
+- body goes out through the ASGI zero-copy extensions when the server offers them
+  ("http.response.zerocopysend" -> os.sendfile on the socket, "http.response.pathsend"),
+  otherwise file reads run in a worker thread so the event loop is never blocked.
+  uvicorn (what this repo runs on) offers neither extension, so under uvicorn every body is
+  copied through userspace in CHUNK_SIZE reads and throughput is on par with the old
+  StreamingResponse (benchmarks/bench_file_serving.py); the zero-copy paths only take effect
+  under a server that implements the extensions.
+- the background task (main.py releases the run pin with it) runs however the send ends,
+  client disconnects included
+"""
+
+import os,secrets
+from pathlib import Path
+from typing import List,Optional,Tuple
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response
+
+from artifacts import http_date
+
+CHUNK_SIZE = 1024 * 1024
+# more ranges than this in one request is treated as abuse and answered with the full body
+MAX_RANGES = 16
+
+def parse_range_header(range_header: Optional[str], file_size: int):
+    """
+    Parse 'bytes=0-99,200-,-50' into sorted, merged (start, end) pairs (inclusive).
+    Returns None when the header is absent/malformed (serve the full file),
+    [] when it is syntactically valid but no range is satisfiable (416).
+    """
+    if not range_header:
+        return None
+    unit, _, spec = range_header.strip().partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    ranges: List[Tuple[int, int]] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        if not sep:
+            return None
+        try:
+            if first == "":
+                # suffix bytes: '-N' -> last N bytes
+                n = int(last)
+                if n <= 0:
+                    continue
+                start, end = max(file_size - n, 0), file_size - 1
+            else:
+                start = int(first)
+                if last and int(last) < start:
+                    return None
+                end = min(int(last), file_size - 1) if last else file_size - 1
+        except ValueError:
+            return None
+        if start < 0 or start >= file_size:
+            continue
+        ranges.append((start, end))
+    if len(ranges) > MAX_RANGES:
+        return None
+    # merge overlapping/adjacent ranges so the body never repeats bytes
+    ranges.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def if_range_matches(if_range: Optional[str], etag: Optional[str], last_modified: Optional[float]) -> bool:
+    """If-Range needs a strong validator match, otherwise the full representation is sent."""
+    if not if_range:
+        return True
+    value = if_range.strip()
+    if value.startswith('"') or value.startswith("W/"):
+        return etag is not None and not value.startswith("W/") and value == etag
+    return last_modified is not None and value == http_date(last_modified)
+
+class ArtifactResponse(Response):
+    """Serve one file with Range/If-Range support and zero-copy transfer when available."""
+
+    def __init__(self, path, request: Request, media_type: str = "application/octet-stream",
+                 headers: Optional[dict] = None, etag: Optional[str] = None,
+                 last_modified: Optional[float] = None, allow_ranges: bool = True, background=None):
+        self.path = Path(path)
+        self.media_type = media_type
+        self.background = background
+        self.send_header_only = request.method.upper() == "HEAD"
+        self.file_size = os.stat(self.path).st_size
+
+        headers = dict(headers or {})
+        if etag:
+            headers.setdefault("ETag", etag)
+        if last_modified is not None:
+            headers.setdefault("Last-Modified", http_date(last_modified))
+        # encoded variants are served whole, ranges apply to the identity representation
+        headers["Accept-Ranges"] = "bytes" if allow_ranges else "none"
+
+        ranges = None
+        if allow_ranges and if_range_matches(request.headers.get("if-range"), etag, last_modified):
+            ranges = parse_range_header(request.headers.get("range"), self.file_size)
+
+        self.ranges: List[Tuple[int, int]] = []
+        self.boundary = None
+        self.part_headers: List[bytes] = []
+        self.closing = b""
+        if ranges is None:
+            self.status_code = 200
+            self.ranges = [(0, self.file_size - 1)] if self.file_size else []
+            headers["Content-Length"] = str(self.file_size)
+        elif not ranges:
+            self.status_code = 416
+            headers["Content-Range"] = f"bytes */{self.file_size}"
+            headers["Content-Length"] = "0"
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            self.status_code = 206
+            self.ranges = ranges
+            headers["Content-Range"] = f"bytes {start}-{end}/{self.file_size}"
+            headers["Content-Length"] = str(end - start + 1)
+        else:
+            self.status_code = 206
+            self.ranges = ranges
+            self.boundary = secrets.token_hex(16)
+            length = 0
+            for start, end in ranges:
+                part = (f"--{self.boundary}\r\nContent-Type: {media_type}\r\n"
+                        f"Content-Range: bytes {start}-{end}/{self.file_size}\r\n\r\n").encode("latin-1")
+                self.part_headers.append(part)
+                length += len(part) + (end - start + 1) + 2
+            self.closing = f"--{self.boundary}--\r\n".encode("latin-1")
+            length += len(self.closing)
+            headers["Content-Length"] = str(length)
+            self.media_type = f"multipart/byteranges; boundary={self.boundary}"
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            extensions = scope.get("extensions") or {}
+            if self.send_header_only or not self.ranges:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            elif "http.response.zerocopysend" in extensions:
+                await self._send_zerocopy(send)
+            elif "http.response.pathsend" in extensions and self.status_code == 200:
+                await send({"type": "http.response.pathsend", "path": str(self.path)})
+            else:
+                await self._send_chunks(send)
+        finally:
+            # a disconnect or failed send must not leave the run pinned (main.py releases it here)
+            if self.background is not None:
+                await self.background()
+
+    async def _send_zerocopy(self, send) -> None:
+        # server calls os.sendfile(socket, fd, offset, count): bytes never enter Python
+        with open(self.path, "rb") as f:
+            fd = f.fileno()
+            for i, (start, end) in enumerate(self.ranges):
+                if self.boundary:
+                    await send({"type": "http.response.body", "body": self.part_headers[i], "more_body": True})
+                await send({"type": "http.response.zerocopysend", "file": fd, "offset": start,
+                            "count": end - start + 1, "more_body": True})
+                if self.boundary:
+                    await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+        await send({"type": "http.response.body", "body": self.closing if self.boundary else b"", "more_body": False})
+
+    async def _send_chunks(self, send) -> None:
+        async with await anyio.open_file(self.path, "rb") as f:
+            for i, (start, end) in enumerate(self.ranges):
+                if self.boundary:
+                    await send({"type": "http.response.body", "body": self.part_headers[i], "more_body": True})
+                await f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = await f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                if self.boundary:
+                    await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+        await send({"type": "http.response.body", "body": self.closing if self.boundary else b"", "more_body": False})
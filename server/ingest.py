@@ -0,0 +1,242 @@
+"""
+Streaming ingest for POST /ingest.
+The request body is newline-delimited JSON, one post per line in the scraper's column layout
+(Title, Reference, Subreddit, Score, Comments, Time, Author, Description, Url; missing ones are
+empty). Every post is classified like a row of the batch report (processor.py):
+text_for_analysis -> clean_text -> classify_batch, then nature, dangerous and, when the
+published run saved its topic model, topic.
+Results go back as NDJSON, one line per non-blank input line, in input order, a batch at a time:
+  reader  parses body chunks into batches of INGEST_BATCH_ROWS posts
+  queue   at most INGEST_QUEUE_BATCHES parsed batches wait for the classifier
+  worker  classifies one batch in a worker thread and sends its result lines
+When the classifier falls behind the queue fills and the reader stops pulling the body; when
+the client stops reading results send() blocks and the worker stops. The server's flow control
+then pauses the socket, so memory is bounded by the queue and one line
+(INGEST_MAX_LINE_BYTES) whatever the body size.
+Expose: IngestResponse(), classify_rows(items), topic_model()
+"""
+
+import os,json,time,asyncio,logging,threading
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+import post_labels
+import processing_loader
+import run_store
+
+logger = logging.getLogger("ingest")
+
+BATCH_ROWS = int(os.environ.get("INGEST_BATCH_ROWS", 64))
+QUEUE_BATCHES = int(os.environ.get("INGEST_QUEUE_BATCHES", 2))
+MAX_LINE_BYTES = int(os.environ.get("INGEST_MAX_LINE_BYTES", 1024 * 1024))
+# processor.INPUT_SCHEMA, not imported: processor pulls in the whole report stack
+INPUT_COLUMNS = ("Title", "Reference", "Subreddit", "Score", "Comments", "Time", "Author", "Description", "Url")
+# processor.TOPIC_MODEL_FILE
+TOPIC_MODEL_FILE = "topic_model.joblib"
+
+# ---- topic model of the published run ----
+_topic_lock = threading.Lock()
+_topic_cache = {"run_id": None, "model": None}
+
+def topic_model():
+    """(vectorizer, lda) the published run was reported with, None when it saved none."""
+    with run_store.pinned() as (run_id, run_dir):
+        with _topic_lock:
+            if _topic_cache["run_id"] != run_id:
+                model = None
+                path = run_dir / TOPIC_MODEL_FILE
+                if path.exists():
+                    try:
+                        import joblib
+                        model = joblib.load(path)
+                    except Exception as e:
+                        logger.warning("Loading the topic model of run %s failed: %s", run_id, e)
+                _topic_cache.update(run_id=run_id, model=model)
+            return _topic_cache["model"]
+
+# ---- parsing ----
+def parse_line(line_no: int, raw: bytes) -> tuple:
+    """(line_no, row, None) for a post, (line_no, None, error) for a line that is not one."""
+    try:
+        obj = json.loads(raw)
+    except ValueError as e:
+        return line_no, None, f"Invalid JSON: {e}"
+    if not isinstance(obj, dict):
+        return line_no, None, "Expected a JSON object"
+    row = {c: "" if obj.get(c) is None else str(obj.get(c)) for c in INPUT_COLUMNS}
+    return line_no, row, None
+
+class LineSplitter:
+    """Body chunks -> complete lines; a line over max_bytes is reported once and skipped."""
+
+    def __init__(self, max_bytes: int = MAX_LINE_BYTES):
+        self.max_bytes = max_bytes
+        self.buffer = bytearray()
+        self.line_no = 0
+        self.skipping = False
+
+    def feed(self, chunk: bytes) -> list:
+        """[(line_no, bytes or None)] for every line completed by chunk; None marks an over-long line."""
+        lines = []
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            lines.extend(self._complete(chunk[start:end]))
+            start = end + 1
+        rest = chunk[start:]
+        if not self.skipping:
+            self.buffer += rest
+            if len(self.buffer) > self.max_bytes:
+                self.line_no += 1
+                lines.append((self.line_no, None))
+                self.buffer.clear()
+                self.skipping = True
+        return lines
+
+    def _complete(self, tail: bytes) -> list:
+        if self.skipping:
+            # end of the over-long line, already reported
+            self.skipping = False
+            return []
+        self.buffer += tail
+        raw = bytes(self.buffer).strip()
+        self.buffer.clear()
+        self.line_no += 1
+        if len(raw) > self.max_bytes:
+            return [(self.line_no, None)]
+        return [(self.line_no, raw)] if raw else []
+
+    def close(self) -> list:
+        """The last line when the body does not end with a newline."""
+        if self.skipping or not self.buffer.strip():
+            return []
+        return self._complete(b"")
+
+# ---- classification ----
+def classify_rows(items: list) -> list:
+    """
+    [(line_no, row, error)] -> one NDJSON-ready dict per item: line, reference, label,
+    confidence, nature, dangerous (+ topic when the published run has a topic model), or error.
+    """
+    out = [None] * len(items)
+    todo = []
+    for i, (line_no, row, error) in enumerate(items):
+        if error is not None:
+            out[i] = {"line": line_no, "error": error}
+            continue
+        text = post_labels.row_text_for_analysis(row["Title"], row["Comments"], row["Description"])
+        clean = post_labels.clean_text(text)
+        if not clean:
+            out[i] = {"line": line_no, "reference": row["Reference"], "error": "Empty input text"}
+            continue
+        todo.append((i, clean))
+    if not todo:
+        return out
+
+    sentiment_analysis = processing_loader.load_classifier()
+    cleans = [clean for _, clean in todo]
+    results = sentiment_analysis.classify_batch(cleans)
+    model = topic_model()
+    topics = None
+    if model is not None:
+        vectorizer, lda = model
+        topics = lda.transform(vectorizer.transform(cleans)).argmax(axis=1)
+    for j, ((i, clean), result) in enumerate(zip(todo, results)):
+        line_no, row, _ = items[i]
+        entry = {"line": line_no, "reference": row["Reference"]}
+        if "error" in result:
+            entry["error"] = result["error"]
+        else:
+            entry.update(label=result["label"], confidence=result["confidence"],
+                         nature=post_labels.determine_nature(clean, result["label"]),
+                         dangerous=post_labels.is_dangerous(clean, result["label"]))
+            if topics is not None:
+                entry["topic"] = int(topics[j])
+        out[i] = entry
+    return out
+
+# ---- response ----
+_END = object()
+_DISCONNECTED = object()
+
+class IngestResponse(Response):
+    """Reads the NDJSON request body itself (so it can stream both ways) and answers in NDJSON."""
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, batch_rows: int = BATCH_ROWS, queue_batches: int = QUEUE_BATCHES,
+                 max_line_bytes: int = MAX_LINE_BYTES):
+        self.status_code = 200
+        self.background = None
+        self.batch_rows = max(1, batch_rows)
+        self.queue_batches = max(1, queue_batches)
+        self.max_line_bytes = max_line_bytes
+        self.init_headers({"Cache-Control": "no-store"})
+        self.stats = {"lines": 0, "classified": 0, "errors": 0, "batches": 0}
+
+    async def _read(self, receive, queue: asyncio.Queue) -> None:
+        splitter = LineSplitter(self.max_line_bytes)
+        batch = []
+
+        async def add(lines) -> None:
+            nonlocal batch
+            for line_no, raw in lines:
+                batch.append(parse_line(line_no, raw) if raw is not None
+                             else (line_no, None, f"Line longer than {self.max_line_bytes} bytes"))
+                if len(batch) >= self.batch_rows:
+                    # blocks while queue_batches batches wait: the body is not read any further
+                    await queue.put(batch)
+                    batch = []
+
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                await queue.put(_DISCONNECTED)
+                return
+            await add(splitter.feed(message.get("body", b"")))
+            if not message.get("more_body", False):
+                break
+        await add(splitter.close())
+        if batch:
+            await queue.put(batch)
+        await queue.put(_END)
+
+    async def __call__(self, scope, receive, send) -> None:
+        start = time.perf_counter()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_batches)
+        reader = asyncio.create_task(self._read(receive, queue))
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        try:
+            while True:
+                batch = await queue.get()
+                if batch is _DISCONNECTED:
+                    logger.info("Ingest client disconnected after %d lines", self.stats["lines"])
+                    return
+                if batch is _END:
+                    break
+                try:
+                    results = await run_in_threadpool(classify_rows, batch)
+                except Exception as e:
+                    # the 200 is already sent: report the failure in-band and stop
+                    logger.exception("Ingest classification failed: %s", e)
+                    body = json.dumps({"error": f"Classification failed: {e}"}) + "\n"
+                    await send({"type": "http.response.body", "body": body.encode("utf-8"), "more_body": False})
+                    return
+                self.stats["batches"] += 1
+                self.stats["lines"] += len(results)
+                self.stats["errors"] += sum("error" in r for r in results)
+                self.stats["classified"] = self.stats["lines"] - self.stats["errors"]
+                body = "".join(json.dumps(r) + "\n" for r in results)
+                await send({"type": "http.response.body", "body": body.encode("utf-8"), "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            logger.info("Ingested %s in %.1fs", self.stats, time.perf_counter() - start)
+        finally:
+            if not reader.done():
+                reader.cancel()
+            try:
+                await reader
+            except (asyncio.CancelledError, Exception):
+                pass
@@ -1,5 +1,5 @@
-import requests,time,csv,re,json,sys,math,random,io
-import uuid,shutil,logging,os
+import time,csv,re,json,sys,math,random,io
+import uuid,shutil,logging,os,hashlib
 from pathlib import Path
 from typing import Optional,Tuple
 from datetime import datetime, timezone,timedelta
@@ -7,38 +7,42 @@ from datetime import datetime, timezone,timedelta
 from fastapi import FastAPI, Query, HTTPException, Header, BackgroundTasks, Request, Response
 from fastapi.responses import HTMLResponse, JSONResponse,StreamingResponse,FileResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
+from file_serving import ArtifactResponse
 from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Literal
 
-try:
-    import processor
-except Exception as e:
-    raise RuntimeError(f"Failed to import processor.py: {e}")
-
-from reddit_scrapper import scrape_reddit_to_csv
-
-# try import python-docx (optional)
-DOCX_AVAILABLE = True
-try:
-    from docx import Document
-    from docx.shared import Inches
-except Exception:
-    DOCX_AVAILABLE = False
+# processor / pipeline / models load on the first rerun (or PREWARM_MODELS), see processing_loader
+import processing_loader
+from src import model_manager, model_client
+import artifacts
+import run_store
+import feature_store
+import embedding_store
+from rerun_coordinator import RerunCoordinator
+from run_budget import RunBudget
+from refresh_scheduler import RefreshScheduler
+from micro_batcher import MicroBatcher
+import post_labels
+import ingest
+import trend_store
 
 class RerunRequest(BaseModel):
     intent: Literal["light", "medium", "deep"]
 
+# budget_s: wall-clock budget of the whole run; processing degrades to fit it (run_budget.py)
 INTENT_LIMITS = {
-    "light":  {"per_query": 10,  "total": 25},
-    "medium": {"per_query": 50,  "total": 300},
-    "deep":   {"per_query": 100, "total": 800},
+    "light":  {"per_query": 10,  "total": 25,  "budget_s": 180},
+    "medium": {"per_query": 50,  "total": 300, "budget_s": 900},
+    "deep":   {"per_query": 100, "total": 800, "budget_s": 2700},
 }
 
 # ---- Configuration ----
 BASE_DIR= Path(__file__).resolve().parent
 STORAGE_DIR= BASE_DIR/"storage"
-LATEST_DIR= STORAGE_DIR/"latest"
+# legacy single-run folder; new runs live in storage/runs/<run_id>, see run_store
+LATEST_DIR= run_store.LEGACY_DIR
 STORAGE_DIR.mkdir(exist_ok=True)
 LATEST_DIR.mkdir(exist_ok=True)
 
@@ -65,231 +69,470 @@ origins=[
 
 app.add_middleware(CORSMiddleware, allow_origins=origins,allow_credentials=True, allow_methods=["*"],allow_headers=["*"])
 
-# Helper: safe path join inside storage using Path
+# Helper: safe path join inside the currently published run
 def storage_path(filename:str)-> Path:
-    return LATEST_DIR/filename
+    return run_store.current_run()[1]/os.path.basename(filename)
 
-def scrape_live_data(output_csv_path:str, per_query: int, total:int)->None:
-    scrape_reddit_to_csv(output_csv_path,per_query,total)
+# classify while scraping (pipeline.py); set STREAMING_PIPELINE=0 to scrape first, then process
+STREAMING_PIPELINE = os.environ.get("STREAMING_PIPELINE", "1").lower() in ("1", "true", "yes")
 
-# ------------------------------
-# Range-supporting file response for large files (PDF preview)
-def get_range_byte_positions(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
-    # Example Range header: 'bytes=0-1023' or 'bytes=1024-'
-    if not range_header:
-        return None
-    header = range_header.strip()
-    if not header.startswith("bytes="):
-        return None
-    range_val = header.split("=", 1)[1]
-    parts = range_val.split("-")
-    try:
-        if parts[0] == "":
-            # suffix bytes: '-N' -> last N bytes
-            end = file_size - 1
-            start = file_size - int(parts[1])
-        elif parts[1] == "":
-            # 'start-' to end of file
-            start = int(parts[0])
-            end = file_size - 1
-        else:
-            start = int(parts[0])
-            end = int(parts[1])
-        if start < 0:
-            start = 0
-        if end >= file_size:
-            end = file_size - 1
-        if start > end:
-            return None
-        return (start, end)
-    except Exception:
-        return None
-    
-def range_stream_response(path: Path, request: Request) -> StreamingResponse:
-    """Return a StreamingResponse that honors Range requests for a file."""
-    file_size = path.stat().st_size
-    range_header = request.headers.get("range")
-    range_pos = get_range_byte_positions(range_header, file_size)
-    headers = {
-        "Accept-Ranges": "bytes",
-        "Content-Type": "application/octet-stream",
-        "Content-Disposition": f'inline; filename="{path.name}"',
-    }
-
-    if range_pos is None:
-        # full content
-        def iterfile():
-            with open(path, "rb") as f:
-                while True:
-                    chunk = f.read(1024 * 1024)
-                    if not chunk:
-                        break
-                    yield chunk
-        headers["Content-Length"] = str(file_size)
-        return StreamingResponse(iterfile(), status_code=200, headers=headers)
-    else:
-        start, end = range_pos
-        length = end - start + 1
-        headers["Content-Length"] = str(length)
-        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
-        # status 206 Partial Content
-        def iterfile_range():
-            with open(path, "rb") as f:
-                f.seek(start)
-                remaining = length
-                chunk_size = 1024 * 1024
-                while remaining > 0:
-                    to_read = min(chunk_size, remaining)
-                    chunk = f.read(to_read)
-                    if not chunk:
-                        break
-                    remaining -= len(chunk)
-                    yield chunk
-        return StreamingResponse(iterfile_range(), status_code=206, headers=headers)
-    
+def scrape_live_data(output_csv_path:str, per_query: int, total:int, budget: Optional[RunBudget]=None)->Optional[dict]:
+    """Scrape into output_csv_path. Returns streamed predictions when STREAMING_PIPELINE is on."""
+    modules = processing_loader.load()
+    if STREAMING_PIPELINE:
+        return modules.pipeline.scrape_and_classify(output_csv_path, per_query, total, budget=budget)
+    modules.scrape_reddit_to_csv(output_csv_path,per_query,total)
+    return None
 
 @app.get("/")
 def home():
     return {"message":"sever working"}
 
-@app.post("/rerun")
-async def rerun_endpoint(body: RerunRequest, x_api_key: Optional[str] = Header(None)):
+def run_pipeline(intent: str) -> dict:
     """
-    Trigger live scraping + processing.
-    Optional x-api-key header if API_KEY is set in env.
-    This endpoint blocks until processing completes and returns file paths.
+    Blocking scrape + process + publish for one intent. Runs in a worker thread,
+    only ever called through rerun_coordinator so pipelines never overlap.
     """
-    # auth check
-    if API_KEY:
-        if not x_api_key or x_api_key != API_KEY:
-            logger.warning("Rejected rerun: invalid API key")
-            raise HTTPException(status_code=401, detail="Invalid or missing x-api-key")
+    # first rerun of the process imports the processing stack; not charged to the run budget
+    try:
+        processor = processing_loader.load().processor
+    except Exception as e:
+        logger.exception("Loading processing modules failed: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
 
-    # create a new working folder
-    # uid = uuid.uuid4().hex
-    work_dir = STORAGE_DIR / "latest"
-    work_dir.mkdir(parents=True, exist_ok=True)
+    # create a new, unpublished run folder; readers keep seeing the previous run until publish
+    run_id, work_dir = run_store.create_run()
 
     # step 1: scrape live data -> create input CSV path
     input_csv = work_dir / "scraped_input.csv"
-    limits= INTENT_LIMITS[body.intent]
-    logger.info(f"Received rerun request. Intent: {body.intent}, Limits: {limits}")
+    limits= INTENT_LIMITS[intent]
+    budget = RunBudget(limits["budget_s"], intent)
+    logger.info(f"Starting rerun pipeline. Intent: {intent}, Limits: {limits}")
     
     try:
         logger.info(f"Starting scraping to {input_csv}...")
-        scrape_live_data(str(input_csv),int(limits["per_query"]),int(limits["total"]))
+        precomputed = scrape_live_data(str(input_csv),int(limits["per_query"]),int(limits["total"]),budget)
         logger.info("Scraping completed successfully.")
     except Exception as e:
         logger.exception("Scraping failed: %s", e)
+        run_store.discard(run_id)
         raise HTTPException(status_code=500, detail=f"Scraping failed: {e}")
 
     # step 2: process csv into pdf, docx, analysis_output.csv
-    try:
-        logger.info("Calling user-provided processor.generate_reports_from_csv")
-        # assume processor writes to out_dir and returns dict or nothing
-        out = processor.generate_reports_from_csv(str(input_csv), str(work_dir))
-        logger.info(f"Processing return value: {out}")
-
-        # normalize result
-        pdf_path = str(work_dir / "report.pdf")
-        csv_path = str(work_dir / "analysis_output.csv")
-        docx_path = str(work_dir / "report.docx")
-        # if processor returned explicit paths, use them
-        if isinstance(out, dict):
-            pdf_path = out.get("pdf", pdf_path)
-            csv_path = out.get("csv", csv_path)
-            docx_path = out.get("docx", docx_path)
-        result = {"pdf": pdf_path, "csv": csv_path, "docx": docx_path}
-    except Exception as e:
-        logger.exception("Processing failed: %s", e)
-        raise HTTPException(status_code=500, detail=f"Processing failed: {e}")
+    # feature vectors / embeddings are staged chunk by chunk and only committed once the run is published
+    feature_writer = feature_store.RunWriter(run_id)
+    embedding_writer = embedding_store.RunWriter(run_id)
+
+    def stage_vectors(features: dict, embeddings: dict):
+        # never fails the run: a broken store only loses this run's rows
+        for writer, rows in ((feature_writer, features), (embedding_writer, embeddings)):
+            try:
+                writer.write(**rows)
+            except Exception as e:
+                logger.warning("%s staging failed: %s", type(writer).__module__, e)
 
-    # step 3: update 'latest' storage (atomically)
     try:
-        # clear latest directory
-        # if LATEST_DIR.exists():
-        #     shutil.rmtree(LATEST_DIR)
-        LATEST_DIR.mkdir(parents=True, exist_ok=True)
-        # Define IST timezone
-        IST = timezone(timedelta(hours=5, minutes=30))
-        generated_at = datetime.now(IST).strftime("%Y-%m-%d %H:%M:%S")
-        # write metadata file
-        meta = {
-            "pdf": "/files/report.pdf" if (LATEST_DIR / "report.pdf").exists() else "",
-            "csv": "/files/analysis_output.csv" if (LATEST_DIR / "analysis_output.csv").exists() else "",
-            "docx": "/files/report.docx" if (LATEST_DIR / "report.docx").exists() else "",
-            "generated_at": generated_at,
-        }
-
-        # write meta to disk for persistence
-        with open(LATEST_DIR / "meta.json", "w", encoding="utf-8") as mf:
-            import json
-            json.dump(meta, mf)
+        try:
+            logger.info("Calling user-provided processor.generate_reports_from_csv")
+            # assume processor writes to out_dir and returns dict or nothing
+            out = processor.generate_reports_from_csv(str(input_csv), str(work_dir), precomputed=precomputed,
+                                                      on_classified=stage_vectors, budget=budget)
+            logger.info(f"Processing return value: {out}")
+
+            # normalize result
+            pdf_path = str(work_dir / "report.pdf")
+            csv_path = str(work_dir / "analysis_output.csv")
+            docx_path = str(work_dir / "report.docx")
+            # if processor returned explicit paths, use them
+            if isinstance(out, dict):
+                pdf_path = out.get("pdf", pdf_path)
+                csv_path = out.get("csv", csv_path)
+                docx_path = out.get("docx", docx_path)
+            result = {"pdf": pdf_path, "csv": csv_path, "docx": docx_path}
+            rollups = out.get("rollups") if isinstance(out, dict) else None
+        except Exception as e:
+            logger.exception("Processing failed: %s", e)
+            run_store.discard(run_id)
+            raise HTTPException(status_code=500, detail=f"Processing failed: {e}")
+
+        # step 3: publish the run (atomic pointer swap), then apply retention
+        try:
+            # Define IST timezone
+            IST = timezone(timedelta(hours=5, minutes=30))
+            generated_at = datetime.now(IST).strftime("%Y-%m-%d %H:%M:%S")
+            # hash + precompress artifacts once, requests only read the manifest
+            manifest = artifacts.build_manifest(work_dir)
+            # write metadata file
+            meta = {
+                "pdf": "/files/report.pdf" if (work_dir / "report.pdf").exists() else "",
+                "csv": "/files/analysis_output.csv" if (work_dir / "analysis_output.csv").exists() else "",
+                "docx": "/files/report.docx" if (work_dir / "report.docx").exists() else "",
+                "generated_at": generated_at,
+                "etag": manifest["run_etag"],
+                "run_id": run_id,
+                # epoch seconds, /report measures staleness from it
+                "completed_at": time.time(),
+                # time budget of the intent and every degradation applied to stay within it
+                "budget": budget.summary(),
+            }
+
+            # write meta to disk for persistence
+            with open(work_dir / "meta.json", "w", encoding="utf-8") as mf:
+                json.dump(meta, mf)
+            run_store.publish(run_id)
+        except Exception as e:
+            logger.exception("Failed to publish run: %s", e)
+            run_store.discard(run_id)
+            raise HTTPException(status_code=500, detail=f"Failed to publish run: {e}")
+
+        # keep the run's feature vectors for retraining (src/train_from_store.py); never fails the run
+        for writer in (feature_writer, embedding_writer):
+            try:
+                writer.commit()
+            except Exception as e:
+                logger.warning("%s commit failed: %s", type(writer).__module__, e)
+    finally:
+        # also on SystemExit/KeyboardInterrupt: a writer left open keeps its store's lock forever;
+        # no-op for writers that committed
+        feature_writer.abort()
+        embedding_writer.abort()
+
+    # stance counts for /trends; never fails the run
+    if rollups is not None:
+        try:
+            trend_store.append_run(run_id, meta["completed_at"], rollups, intent)
+        except Exception as e:
+            logger.warning("Trend store append failed: %s", e)
 
+    try:
+        run_store.compact()
     except Exception as e:
-        logger.exception("Failed to update latest storage: %s", e)
-        raise HTTPException(status_code=500, detail=f"Failed to update latest storage: {e}")
+        logger.warning("Retention/compaction failed: %s", e)
+
+    logger.info("Rerun completed, run %s published as latest", run_id)
+    return {"run_id": run_id, "intent": intent, "pdf": meta["pdf"], "csv": meta["csv"], "docx": meta["docx"],
+            "degradations": [d["name"] for d in budget.degradations]}
+
+rerun_coordinator = RerunCoordinator(run_pipeline)
+
+def completed_at(meta: dict, meta_file: Path) -> float:
+    # runs published before completed_at was recorded: meta.json is written right before publish
+    return float(meta.get("completed_at") or meta_file.stat().st_mtime)
+
+def current_completed_at() -> Optional[float]:
+    with run_store.pinned() as (_, run_dir):
+        meta_file = run_dir / "meta.json"
+        if not meta_file.exists():
+            return None
+        return completed_at(json.loads(meta_file.read_text(encoding="utf-8")), meta_file)
+
+# background refresh of the published run, REFRESH_INTERVAL_S=0 (default) leaves it off
+refresh_scheduler = RefreshScheduler(rerun_coordinator, current_completed_at)
 
-    logger.info("Rerun completed, files available under latest/ directory")
+@app.on_event("startup")
+async def start_refresh_scheduler():
+    refresh_scheduler.start()
+
+@app.on_event("startup")
+async def prewarm_processing():
+    # background thread, startup does not wait for it
+    processing_loader.prewarm()
+
+@app.on_event("shutdown")
+async def stop_refresh_scheduler():
+    await refresh_scheduler.stop()
+
+@app.post("/rerun")
+async def rerun_endpoint(body: RerunRequest, x_api_key: Optional[str] = Header(None)):
+    """
+    Trigger live scraping + processing.
+    Optional x-api-key header if API_KEY is set in env.
+    This endpoint blocks until processing completes and returns file paths.
+    Concurrent calls are coalesced: callers attach to an in-flight run that covers their intent,
+    and the decision taken is reported under "coalescing".
+    """
+    # auth check
+    if API_KEY:
+        if not x_api_key or x_api_key != API_KEY:
+            logger.warning("Rejected rerun: invalid API key")
+            raise HTTPException(status_code=401, detail="Invalid or missing x-api-key")
+
+    logger.info(f"Received rerun request. Intent: {body.intent}")
+    result, coalescing = await rerun_coordinator.submit(body.intent)
     return JSONResponse(status_code=200, content={
         "status": "ok",
-        "pdf": meta["pdf"],
-        "csv": meta["csv"],
-        "docx": meta["docx"]
+        "run_id": result["run_id"],
+        "pdf": result["pdf"],
+        "csv": result["csv"],
+        "docx": result["docx"],
+        "coalescing": coalescing,
     })
 
+class CorrectionRequest(BaseModel):
+    post_id: str
+    label: Literal["Pro-India", "Anti-India", "Pro-Government", "Anti-Government", "Neutral"]
+    analyst: Optional[str] = None
+    note: Optional[str] = None
+
+@app.post("/corrections")
+async def add_correction(body: CorrectionRequest, x_api_key: Optional[str] = Header(None)):
+    """Record an analyst-corrected label; used by src/train_from_store.py for supervised retraining."""
+    if API_KEY:
+        if not x_api_key or x_api_key != API_KEY:
+            logger.warning("Rejected correction: invalid API key")
+            raise HTTPException(status_code=401, detail="Invalid or missing x-api-key")
+    entry = feature_store.add_correction(body.post_id, body.label, body.analyst, body.note)
+    return JSONResponse(status_code=200, content={"status": "ok", "correction": entry})
+
+@app.get("/rerun/status")
+async def rerun_status():
+    """In-flight and queued rerun jobs, the background refresh schedule and model warm-up state."""
+    status = rerun_coordinator.status()
+    status["scheduler"] = refresh_scheduler.status()
+    status["processing"] = processing_loader.status()
+    return JSONResponse(status_code=200, content=status)
+
+
+@app.get("/models")
+async def model_stats():
+    """
+    Model residency: budget, resident MB, per-model size / load / eviction counts (src/model_manager.py),
+    for this process and, when MODEL_SERVER_SOCKET is set, for the shared model server.
+    """
+    content = {"local": model_manager.stats(), "model_server": None}
+    client = model_client.get()
+    if client is not None:
+        try:
+            content["model_server"] = await run_in_threadpool(client.stats)
+        except Exception as e:
+            content["model_server"] = {"error": str(e)}
+    return JSONResponse(status_code=200, content=content)
 
 @app.get("/report")
-async def get_report():
+def get_report(request: Request):
     """
     Return metadata about current report (pdf/csv/docx)
+    Always answers from the last published run, never starts or waits on a rerun; "freshness"
+    says how old it is (stale, stale_at) and whether a refresh is running or scheduled.
+    A plain def so pinning, which can wait on compaction, runs in the threadpool.
+    """
+    with run_store.pinned() as (run_id, run_dir):
+        meta_file = run_dir / "meta.json"
+        if not meta_file.exists():
+            raise HTTPException(status_code=404, detail="No report available yet")
+        raw = meta_file.read_bytes()
+        mtime = meta_file.stat().st_mtime
+    meta = json.loads(raw.decode("utf-8"))
+    meta.setdefault("run_id", run_id)
+    freshness = refresh_scheduler.freshness(completed_at(meta, meta_file))
+    meta["freshness"] = freshness
+    # meta carries the run's artifact hash, so its own hash changes whenever any artifact does;
+    # the freshness state is folded in so a revalidation picks up stale/refreshing flips
+    state = f"{freshness['stale']}|{freshness['refreshing']}|{freshness['next_refresh_at']}".encode()
+    etag = '"' + hashlib.sha256(raw + state).hexdigest()[:32] + '"'
+    last_modified = max(mtime, freshness["stale_at"]) if freshness["stale"] else mtime
+    headers = artifacts.cache_headers(etag, last_modified)
+    if artifacts.not_modified(request.headers, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(status_code=200, content=meta, headers=headers)
+
+@app.get("/runs")
+async def get_runs():
+    """List retained runs, newest first."""
+    return JSONResponse(status_code=200, content={"latest": run_store.current_run_id(), "runs": run_store.list_runs()})
+
+# ---- Trends across runs (trend_store) ----
+def parse_time_param(value: Optional[str], name: str) -> Optional[float]:
+    """Epoch seconds from epoch seconds or an ISO date / datetime (UTC when no offset is given)."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{name} must be epoch seconds or an ISO date/datetime")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+@app.get("/trends")
+async def get_trends(metric: Literal["sentiment", "nature", "subreddit", "topic", "dangerous"] = "sentiment",
+                     from_: Optional[str] = Query(None, alias="from"), to: Optional[str] = None,
+                     bucket: Literal["hour", "day", "week", "month"] = "day",
+                     intent: Optional[Literal["light", "medium", "deep"]] = None):
+    """
+    Counts and shares of every value of metric per time bucket across runs (UTC), from the
+    rollups each run appends (trend_store.py). to defaults to now, from to 30 days before to.
+    Counts are summed per-run snapshots (overlapping runs count a post once each): compare
+    buckets by share or mean_per_run. intent limits the series to runs of that intent.
+    """
+    end = parse_time_param(to, "to")
+    end = time.time() if end is None else end
+    start = parse_time_param(from_, "from")
+    start = end - 30 * 86400 if start is None else start
+    if start >= end:
+        raise HTTPException(status_code=422, detail="from must be before to")
+    result = await run_in_threadpool(trend_store.trends, metric, start, end, bucket, intent)
+    return JSONResponse(status_code=200, content=result)
+
+# ---- Similar posts (embedding_store) ----
+_similarity_index: Optional[embedding_store.SimilarityIndex] = None
+
+def similarity_index() -> embedding_store.SimilarityIndex:
+    global _similarity_index
+    if _similarity_index is None:
+        _similarity_index = embedding_store.SimilarityIndex()
+    else:
+        # cheap when nothing was appended since the last query
+        _similarity_index.refresh()
+    return _similarity_index
+
+class SimilarTextRequest(BaseModel):
+    text: str
+    k: int = 10
+
+@app.get("/posts/{post_id}/similar")
+async def similar_posts(post_id: str, k: int = Query(10, ge=1, le=100)):
+    """Posts closest to a stored post by embedding (cosine), across all retained runs."""
+    index = await run_in_threadpool(similarity_index)
+    results = await run_in_threadpool(index.similar_to_post, post_id, k)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Post not found in embedding store")
+    return JSONResponse(status_code=200, content={"post": index.post(post_id), "similar": results})
+
+@app.post("/posts/similar")
+async def similar_to_text(body: SimilarTextRequest):
+    """Stored posts closest to arbitrary text (embedded like classify() does)."""
+    if not 1 <= body.k <= 100:
+        raise HTTPException(status_code=422, detail="k must be between 1 and 100")
+    modules = await run_in_threadpool(processing_loader.load)
+    vector = await run_in_threadpool(modules.sentiment_analysis.embed_text, body.text)
+    if vector is None:
+        raise HTTPException(status_code=400, detail="Empty input text")
+    index = await run_in_threadpool(similarity_index)
+    results = await run_in_threadpool(index.search, vector, body.k)
+    return JSONResponse(status_code=200, content={"similar": results})
+
+# ---- Live classification (micro_batcher) ----
+class ClassifyRequest(BaseModel):
+    text: str
+
+def classify_posts(texts: list) -> list:
+    """
+    One batch of /classify requests: classify_batch() results (without the embedding) plus the
+    rule-based nature / dangerous flag the report computes from the same cleaned text.
+    """
+    sentiment_analysis = processing_loader.load_classifier()
+    results = sentiment_analysis.classify_batch(texts)
+    out = []
+    for text, result in zip(texts, results):
+        result = {k: v for k, v in result.items() if k != "embedding"}
+        if "error" not in result:
+            clean = post_labels.clean_text(text)
+            result["nature"] = post_labels.determine_nature(clean, result["label"])
+            result["dangerous"] = post_labels.is_dangerous(clean, result["label"])
+        out.append(result)
+    return out
+
+# concurrent /classify calls share model batches (CLASSIFY_MAX_WAIT_MS, CLASSIFY_MAX_BATCH)
+classify_batcher = MicroBatcher(classify_posts)
+
+@app.on_event("shutdown")
+async def stop_classify_batcher():
+    await classify_batcher.stop()
+
+@app.post("/classify")
+async def classify_endpoint(body: ClassifyRequest):
     """
-    meta_file = LATEST_DIR / "meta.json"
-    if not meta_file.exists():
-        raise HTTPException(status_code=404, detail="No report available yet")
-    import json
-    with open(meta_file, "r", encoding="utf-8") as f:
-        meta = json.load(f)
-    return JSONResponse(status_code=200, content=meta)
+    Stance of one post in real time: classify()'s result plus "nature" and "dangerous".
+    Requests arriving within a few milliseconds of each other are classified as one batch.
+    """
+    if not body.text.strip():
+        raise HTTPException(status_code=400, detail="Empty input text")
+    try:
+        result = await classify_batcher.submit(body.text)
+    except Exception as e:
+        logger.exception("Classification failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"Classification failed: {e}")
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return JSONResponse(status_code=200, content=result)
+
+@app.get("/classify/stats")
+async def classify_stats():
+    """Micro-batching settings, batch sizes and p50 / p99 latency of recent /classify calls."""
+    return JSONResponse(status_code=200, content=classify_batcher.stats())
+
+@app.post("/ingest")
+async def ingest_endpoint(x_api_key: Optional[str] = Header(None)):
+    """
+    Classify posts pushed by other systems: the body is NDJSON in the scraper's column layout
+    (Title, Reference, Comments, Description, ...), of any size. Results stream back as NDJSON,
+    one line per post in input order (line, reference, label, confidence, nature, dangerous,
+    topic when the published run has a topic model, or error), a batch at a time (ingest.py).
+    Optional x-api-key header if API_KEY is set in env.
+    """
+    if API_KEY:
+        if not x_api_key or x_api_key != API_KEY:
+            logger.warning("Rejected ingest: invalid API key")
+            raise HTTPException(status_code=401, detail="Invalid or missing x-api-key")
+    # reads the body itself while it streams the results back
+    return ingest.IngestResponse()
+
+def pdf_response(filename: str, request: Request, disposition: str) -> Response:
+    # called from plain def handlers (threadpool): acquire() can wait on compaction
+    # pin the run until the body has been sent; publish/compaction cannot pull it away mid-stream
+    run_id, run_dir = run_store.acquire()
+    try:
+        path = run_dir / os.path.basename(filename)
+        entry = artifacts.artifact_entry(run_dir, path.name)
+        if entry is None or not path.is_file():
+            raise HTTPException(404, "File not found")
+        etag = artifacts.etag_for(entry)
+        headers = artifacts.cache_headers(etag, entry["mtime"])
+        if artifacts.not_modified(request.headers, etag, entry["mtime"]):
+            run_store.release(run_id)
+            return Response(status_code=304, headers=headers)
+        headers["Content-Disposition"] = f'{disposition}; filename="{path.name}"'
+        return ArtifactResponse(path, request, media_type="application/pdf", headers=headers,
+                                etag=etag, last_modified=entry["mtime"],
+                                background=BackgroundTask(run_store.release, run_id))
+    except Exception:
+        run_store.release(run_id)
+        raise
 
 @app.get("/pdf/view/{filename}")
-async def view_pdf(filename: str):
-    path = LATEST_DIR / filename
-    if not path.exists():
-        raise HTTPException(404, "File not found")
-
-    return FileResponse(
-        path,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'inline; filename="{path.name}"'
-        }
-    )
+def view_pdf(filename: str, request: Request):
+    return pdf_response(filename, request, "inline")
 
 @app.get("/pdf/download/{filename}")
-async def download_pdf(filename: str):
-    path = LATEST_DIR / filename
-    if not path.exists():
-        raise HTTPException(404, "File not found")
-
-    return FileResponse(
-        path,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'attachment; filename="{path.name}"'
-        }
-    )
+def download_pdf(filename: str, request: Request):
+    return pdf_response(filename, request, "attachment")
 
 
 @app.get("/files/{filename}")
-async def serve_file(filename: str, request: Request):
+def serve_file(filename: str, request: Request):
     """
-    Serve files from the latest directory. Supports Range requests (for PDFs).
+    Serve files from the latest directory. Supports Range/If-Range (incl. multi-range) for every artifact.
+    Like /report and /pdf/* a plain def: run_store.acquire() must not block the event loop.
     """
-    safe_name = os.path.basename(filename)
-    path = LATEST_DIR / safe_name
+    run_id, run_dir = run_store.acquire()
+    try:
+        return artifact_response(run_id, run_dir, os.path.basename(filename), request)
+    except Exception:
+        run_store.release(run_id)
+        raise
+
+def artifact_response(run_id: str, run_dir: Path, safe_name: str, request: Request) -> Response:
+    path = run_dir / safe_name
     if not path.exists() or not path.is_file():
         raise HTTPException(status_code=404, detail="File not found")
+    entry = artifacts.artifact_entry(run_dir, safe_name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="File not found")
     # Detect file type
     if path.suffix.lower() == ".pdf":
         media_type = "application/pdf"
@@ -297,27 +540,35 @@ async def serve_file(filename: str, request: Request):
         media_type = "text/csv"
     elif path.suffix.lower() == ".docx":
         media_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    elif path.suffix.lower() == ".png":
+        media_type = "image/png"
     else:
         media_type = "application/octet-stream"
 
-    # if the client supports Range (commonly for PDFs), use range_stream_response
+    # conditional request: any representation's etag (identity or precompressed) counts as a match
+    encodings = {enc: name for enc, name in entry.get("encodings", {}).items() if (run_dir / name).is_file()}
+    all_etags = [artifacts.etag_for(entry)] + [artifacts.etag_for(entry, enc) for enc in encodings]
+    # byte ranges are served from the identity representation only
     range_header = request.headers.get("range")
-    if range_header and path.suffix.lower() == ".pdf":
-        return range_stream_response(path, request)
-    else:
-        # full file streaming
-        def file_iterator():
-            with open(path, "rb") as f:
-                while True:
-                    chunk = f.read(1024 * 1024)
-                    if not chunk:
-                        break
-                    yield chunk
-        headers = {
-            "Content-Disposition": f'inline; filename="{path.name}"',
-            "Content-Length": str(path.stat().st_size),
-        }
-        return StreamingResponse(file_iterator(), media_type=media_type, headers=headers)
+    encoding = None if range_header else artifacts.negotiate_encoding(request.headers.get("accept-encoding"), encodings)
+    etag = artifacts.etag_for(entry, encoding)
+    headers = artifacts.cache_headers(etag, entry["mtime"])
+    if encodings:
+        headers["Vary"] = "Accept-Encoding"
+    if artifacts.not_modified(request.headers, all_etags, entry["mtime"]):
+        run_store.release(run_id)
+        return Response(status_code=304, headers=headers)
+
+    # the pin is released once the body has been sent
+    release = BackgroundTask(run_store.release, run_id)
+    headers["Content-Disposition"] = f'inline; filename="{path.name}"'
+    if encoding:
+        # precomputed at write time, never compressed per request; served whole
+        headers["Content-Encoding"] = encoding
+        return ArtifactResponse(run_dir / encodings[encoding], request, media_type=media_type, headers=headers,
+                                etag=etag, last_modified=entry["mtime"], allow_ranges=False, background=release)
+    return ArtifactResponse(path, request, media_type=media_type, headers=headers,
+                            etag=etag, last_modified=entry["mtime"], background=release)
 
 if __name__=='__main__':
     import uvicorn
@@ -0,0 +1,153 @@
+"""
+Cross-request micro-batching for the live /classify endpoint.
+Concurrent requests are queued; a single worker task takes the oldest one, keeps collecting
+until max_batch items are waiting or the oldest has waited max_wait_ms, and runs the whole
+batch through batch_fn (sentiment_analysis.classify_batch: one embedding call, one feature
+matrix) in a worker thread. Requests arriving while a batch runs form the next one, so under
+load batches fill up on their own and a lone request only pays max_wait_ms.
+One batch runs at a time: the models are shared and batching is what buys the throughput.
+Latency (queue wait + batch) of the last LATENCY_WINDOW requests is kept for p50 / p99.
+Expose: MicroBatcher(batch_fn, max_wait_ms, max_batch).submit(item) -> result, stats(), stop()
+"""
+
+import os,math,time,asyncio,logging
+from collections import deque
+from typing import Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger("micro-batcher")
+
+MAX_WAIT_MS = float(os.environ.get("CLASSIFY_MAX_WAIT_MS", 5))
+MAX_BATCH = int(os.environ.get("CLASSIFY_MAX_BATCH", 32))
+LATENCY_WINDOW = 2048
+
+def percentile(values, q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0..100) of values; None when empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    # rank = ceil(q% of n); round() would go to even on .5 and pick the rank below
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered) / 100) - 1))]
+
+class _Pending:
+    __slots__ = ("item", "future", "enqueued")
+
+    def __init__(self, item, future: asyncio.Future):
+        self.item = item
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+class MicroBatcher:
+    def __init__(self, batch_fn: Callable[[list], list], max_wait_ms: float = MAX_WAIT_MS,
+                 max_batch: int = MAX_BATCH):
+        # batch_fn(items) -> one result per item, in order; blocking, runs in a worker thread
+        self.batch_fn = batch_fn
+        self.max_wait_ms = max_wait_ms
+        self.max_batch = max(1, max_batch)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.requests = 0
+        self.batches = 0
+        self.batched = 0
+        self.failed_batches = 0
+        self.largest_batch = 0
+        self._latency_ms = deque(maxlen=LATENCY_WINDOW)
+        self._wait_ms = deque(maxlen=LATENCY_WINDOW)
+        self._batch_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def _ensure_worker(self) -> None:
+        # created on first use, inside the server's event loop
+        if self._worker is None or self._worker.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, item):
+        """Queue item, wait for its batch and return its result (or raise the batch's error)."""
+        self._ensure_worker()
+        pending = _Pending(item, asyncio.get_running_loop().create_future())
+        self._queue.put_nowait(pending)
+        self.requests += 1
+        result = await pending.future
+        self._latency_ms.append((time.perf_counter() - pending.enqueued) * 1000)
+        return result
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = batch[0].enqueued + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch:
+            # take what is already queued without yielding, then wait out the oldest item's deadline
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            # callers that went away (client disconnect) do not cost a model slot
+            batch = [p for p in batch if not p.future.done()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            for p in batch:
+                self._wait_ms.append((started - p.enqueued) * 1000)
+            try:
+                results = await run_in_threadpool(self.batch_fn, [p.item for p in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                self.failed_batches += 1
+                logger.warning("Batch of %d failed: %s", len(batch), e)
+                for p in batch:
+                    if not p.future.done():
+                        p.future.set_exception(e)
+            else:
+                for p, result in zip(batch, results):
+                    if not p.future.done():
+                        p.future.set_result(result)
+            self.batches += 1
+            self.batched += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self._batch_ms.append((time.perf_counter() - started) * 1000)
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def stats(self) -> dict:
+        def summary(values) -> dict:
+            values = list(values)
+            return {"p50": _ms(percentile(values, 50)), "p99": _ms(percentile(values, 99)),
+                    "max": _ms(max(values) if values else None)}
+        return {
+            "max_wait_ms": self.max_wait_ms,
+            "max_batch": self.max_batch,
+            "requests": self.requests,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "mean_batch": round(self.batched / self.batches, 2) if self.batches else None,
+            "largest_batch": self.largest_batch,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            # over the last LATENCY_WINDOW requests / batches
+            "latency_ms": summary(self._latency_ms),
+            "queue_wait_ms": summary(self._wait_ms),
+            "batch_ms": summary(self._batch_ms),
+        }
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
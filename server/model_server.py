@@ -0,0 +1,173 @@
+"""
+Local model server: one long-lived process owns the models, every API worker and CLI run on
+the host shares it.
+Loads the embedder, the sentiment / sarcasm models and the zero-shot context model once, then
+serves batched requests over a Unix socket (wire format and client in src/model_client.py):
+  hello           -> {"dim", "features", "pid"}
+  classify_batch  -> sentiment_analysis.classify_batch results without the arrays; embeddings and
+                     13-dim feature vectors are written into the caller's shared-memory buffer
+  embed           -> {"ok": [...]}, embed_text vectors written into the buffer
+  stats           -> src/model_manager.py residency stats of the server's models
+Batches run one at a time (the models are not shared between threads); connections are
+served concurrently and queue on the inference lock.
+
+Usage (from server/):
+  python model_server.py --socket storage/model_server.sock
+  MODEL_SERVER_SOCKET=storage/model_server.sock uvicorn main:app --workers 4
+Start the server first: with MODEL_SERVER_SOCKET set, workers fail requests while it is down
+unless MODEL_SERVER_FALLBACK=1 lets them load their own models.
+"""
+
+import os,sys,time,socket,logging,argparse,threading,socketserver
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from src import model_client
+from src import model_manager
+
+logger = logging.getLogger("model_server")
+
+DEFAULT_SOCKET = Path(__file__).resolve().parent / "storage" / "model_server.sock"
+
+# the server runs the models itself, never a client of another server
+model_client.disable()
+import sentiment_analysis
+
+_inference_lock = threading.Lock()
+N_FEATURES = 13
+
+def _dim() -> int:
+    return int(sentiment_analysis.get_embedder().get_sentence_embedding_dimension())
+
+def _arrays(shm, n: int, dim: int):
+    emb_bytes = n * dim * np.dtype(model_client.DTYPE).itemsize
+    embeddings = np.ndarray((n, dim), dtype=model_client.DTYPE, buffer=shm.buf)
+    features = np.ndarray((n, N_FEATURES), dtype=model_client.DTYPE, buffer=shm.buf, offset=emb_bytes)
+    return embeddings, features
+
+def _classify_batch(texts: list, options: dict, embeddings, features) -> dict:
+    results = sentiment_analysis.classify_batch(texts, **options)
+    for i, result in enumerate(results):
+        if "error" not in result:
+            embedding = result.pop("embedding")
+            # student backend: no sentence embedding
+            if embedding is None:
+                result["no_embedding"] = True
+            else:
+                embeddings[i] = embedding
+            features[i] = result.pop("features")
+    return {"results": results}
+
+def _embed(texts: list, embeddings) -> dict:
+    ok = []
+    for i, text in enumerate(texts):
+        vector = sentiment_analysis.embed_text(text)
+        if vector is not None:
+            embeddings[i] = vector
+        ok.append(vector is not None)
+    return {"ok": ok}
+
+class Handler(socketserver.BaseRequestHandler):
+    def setup(self):
+        # the caller's buffer stays attached between requests until it grows
+        self.shm = None
+
+    def _buffer(self, name: str):
+        if self.shm is None or self.shm.name != name:
+            if self.shm is not None:
+                self.shm.close()
+            self.shm = model_client.attach_shm(name)
+        return self.shm
+
+    def _batch(self, op: str, msg: dict, dim: int) -> dict:
+        # the array views must not outlive this call, the buffer can only be closed without them
+        texts = msg["texts"]
+        needed = len(texts) * (dim + N_FEATURES) * np.dtype(model_client.DTYPE).itemsize
+        if msg["size"] < needed:
+            raise ValueError(f"buffer of {msg['size']} bytes, {needed} needed")
+        embeddings, features = _arrays(self._buffer(msg["shm"]), len(texts), dim)
+        with _inference_lock:
+            if op == "classify_batch":
+                return _classify_batch(texts, msg.get("options") or {}, embeddings, features)
+            return _embed(texts, embeddings)
+
+    def handle(self):
+        dim = self.server.dim
+        while True:
+            try:
+                msg = model_client.recv_msg(self.request)
+            except (OSError, ValueError) as e:
+                logger.warning("Dropping client: %s", e)
+                return
+            if msg is None:
+                return
+            op = msg.get("op")
+            start = time.perf_counter()
+            try:
+                if op == "hello":
+                    reply = {"dim": dim, "features": N_FEATURES, "pid": os.getpid()}
+                elif op == "stats":
+                    reply = {"pid": os.getpid(), **model_manager.stats()}
+                elif op in ("classify_batch", "embed"):
+                    reply = self._batch(op, msg, dim)
+                    logger.info("%s: %d texts in %.2fs", op, len(msg["texts"]), time.perf_counter() - start)
+                else:
+                    raise ValueError(f"unknown op {op!r}")
+            except Exception as e:
+                logger.exception("%s failed", op)
+                reply = {"error": str(e)}
+            try:
+                model_client.send_msg(self.request, reply)
+            except OSError as e:
+                logger.warning("Client went away: %s", e)
+                return
+
+    def finish(self):
+        if self.shm is not None:
+            self.shm.close()
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--socket", default=os.environ.get("MODEL_SERVER_SOCKET") or str(DEFAULT_SOCKET))
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    start = time.perf_counter()
+    sentiment_analysis.warm_up()
+    sentiment_analysis.init_anchors()
+    logger.info("Models loaded in %.1fs", time.perf_counter() - start)
+
+    path = Path(args.socket)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        # a live server still answers; a stale socket file from a crash is replaced
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(path))
+            sys.exit(f"A model server is already listening on {path}")
+        except OSError:
+            path.unlink()
+        finally:
+            probe.close()
+
+    server = ModelServer(str(path), Handler)
+    server.dim = _dim()
+    # same-user clients only
+    os.chmod(path, 0o600)
+    logger.info("Model server listening on %s (pid %d, embedding dim %d)", path, os.getpid(), server.dim)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        path.unlink(missing_ok=True)
+
+if __name__ == "__main__":
+    main()
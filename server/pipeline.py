@@ -0,0 +1,155 @@
+"""
+Streaming scrape -> classify pipeline.
+Three stages connected by a bounded queue:
+  1. scrape_reddit_to_csv writes scraped_input.csv as before and hands every row to on_row
+  2. a batcher thread groups rows into micro-batches (full batch, or whatever arrived once the
+     scraper has been quiet for BATCH_MAX_WAIT_S)
+  3. each micro-batch goes through sentiment_analysis.classify_batch immediately
+so inference runs while the network is still busy and a rerun takes ~max(scrape, classify)
+instead of their sum. The predictions are handed to processor.generate_reports_from_csv,
+which reuses them instead of classifying again.
+Rows that are near-duplicates of an already submitted row (src/near_duplicates.py) are not queued;
+they get their representative's prediction when the stream finishes.
+With a run_budget.RunBudget, every batch reports its throughput and the batches follow the
+budget's degradations (skip the zero-shot context model, shorter max_length).
+Expose: scrape_and_classify(input_csv, per_query, total, budget=None)
+        -> {reference: (clean_text, label, score, features, stage, embedding)}
+"""
+
+import os,time,queue,logging,threading
+
+import processor
+import sentiment_analysis
+from src.near_duplicates import NearDuplicateIndex
+from reddit_scrapper import scrape_reddit_to_csv, CSV_HEADER
+
+logger = logging.getLogger("pipeline")
+
+BATCH_SIZE = int(os.environ.get("PIPELINE_BATCH_SIZE", 16))
+# bounded so a fast scraper blocks (backpressure) instead of buffering the whole run in memory
+QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", 256))
+BATCH_MAX_WAIT_S = float(os.environ.get("PIPELINE_BATCH_MAX_WAIT_S", 1.0))
+
+_COL = {name: i for i, name in enumerate(CSV_HEADER)}
+_DONE = object()
+
+class StreamingClassifier:
+    def __init__(self, batch_size: int = BATCH_SIZE, queue_size: int = QUEUE_SIZE,
+                 max_wait: float = BATCH_MAX_WAIT_S, budget=None, expected_rows: int = 0):
+        self.batch_size = batch_size
+        self.budget = budget
+        # upper bound on rows the scraper will hand over (its total limit), for budget projections
+        self.expected_rows = expected_rows
+        self.classified_rows = 0
+        self.max_wait = max_wait
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.results = {}
+        self.batches = 0
+        self.busy_s = 0.0
+        self.failed = False
+        # near-duplicate index over submitted texts; aliases: reference -> (clean_text, representative reference)
+        self.dedup = NearDuplicateIndex() if processor.DEDUP_ENABLED else None
+        self.references = []
+        self.aliases = {}
+        self._thread = threading.Thread(target=self._run, name="stream-classifier", daemon=True)
+
+    def start(self) -> "StreamingClassifier":
+        self._thread.start()
+        return self
+
+    def submit(self, row: list) -> None:
+        """on_row callback for the scraper; blocks while the queue is full."""
+        if self.failed:
+            # classifier is gone, the processor classifies everything after the scrape
+            return
+        reference = str(row[_COL["Reference"]])
+        text = processor.clean_text(processor.row_text_for_analysis(row[_COL["Title"]], row[_COL["Comments"]],
+                                                                    row[_COL["Description"]]))
+        if self.dedup is not None:
+            self.references.append(reference)
+            rep = self.dedup.add(text)
+            if rep != len(self.references) - 1:
+                self.aliases[reference] = (text, self.references[rep])
+                return
+        self.queue.put((reference, text))
+
+    def finish(self) -> dict:
+        self.queue.put(_DONE)
+        self._thread.join()
+        for reference, (text, rep) in self.aliases.items():
+            if rep in self.results:
+                # no feature row of its own: the store keeps only posts that were classified
+                _, label, score, _, _, _ = self.results[rep]
+                self.results[reference] = (text, label, score, None, None, None)
+        if self.aliases:
+            logger.info("Streaming classifier: %d near-duplicate rows reused their representative's label",
+                        len(self.aliases))
+        logger.info("Streaming classifier: %d rows in %d batches, %.1fs busy, cascade skip rate %.2f",
+                    len(self.results), self.batches, self.busy_s, sentiment_analysis.cascade.skip_rate())
+        return self.results
+
+    def _run(self) -> None:
+        try:
+            self._consume()
+        except Exception as e:
+            logger.exception("Streaming classifier failed: %s", e)
+            self.failed = True
+            # keep draining so the scraper never blocks on a full queue
+            while self.queue.get() is not _DONE:
+                pass
+
+    def _consume(self) -> None:
+        # anchors load here so model warm-up also overlaps the first scrape requests
+        sentiment_analysis.init_anchors()
+        done = False
+        while not done:
+            batch = []
+            item = self.queue.get()
+            if item is _DONE:
+                break
+            batch.append(item)
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get(timeout=self.max_wait)
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+            self._classify(batch)
+
+    def _classify(self, batch: list) -> None:
+        start = time.perf_counter()
+        options = self.budget.classify_options() if self.budget else {}
+        try:
+            outs = sentiment_analysis.classify_batch([text for _, text in batch], **options)
+        except Exception as e:
+            # rows left out here are classified again by the processor
+            logger.exception("Batch classification failed (%d rows): %s", len(batch), e)
+            return
+        finally:
+            self.busy_s += time.perf_counter() - start
+            self.batches += 1
+        self.classified_rows += len(batch)
+        if self.budget:
+            self.budget.observe(len(batch), time.perf_counter() - start)
+            remaining = max(self.expected_rows - self.classified_rows - len(self.aliases), self.queue.qsize())
+            self.budget.check(remaining)
+        for (reference, text), out in zip(batch, outs):
+            label, score = processor.prediction_from_result(out)
+            features, stage = processor.features_from_result(out)
+            self.results[reference] = (text, label, score, features, stage, out.get("embedding"))
+
+def scrape_and_classify(input_csv: str, per_query: int, total: int, budget=None, **scrape_kwargs) -> dict:
+    """Scrape into input_csv while classifying rows as they arrive."""
+    classifier = StreamingClassifier(budget=budget, expected_rows=total).start()
+    start = time.perf_counter()
+    try:
+        written = scrape_reddit_to_csv(input_csv, per_query, total, on_row=classifier.submit, **scrape_kwargs)
+    finally:
+        scrape_s = time.perf_counter() - start
+        results = classifier.finish()
+    logger.info("Scrape+classify: %d rows, scrape %.1fs, end-to-end %.1fs, classify busy %.1fs",
+                written, scrape_s, time.perf_counter() - start, classifier.busy_s)
+    return results
@@ -0,0 +1,84 @@
+"""
+Rule-based post labels shared by the batch report (processor.py) and the live endpoints
+(/classify): text cleaning, the India-specific nature and the dangerous flag.
+Plain regexes only, so importing it does not pull in pandas / plotting / the models.
+Expose: clean_text(text), row_text_for_analysis(title, comment, description),
+determine_nature(text, sentiment_label), is_dangerous(text, sentiment)
+"""
+
+import re
+
+def clean_text(text: str) -> str:
+    if not isinstance(text, str): return ""
+    text = re.sub(r"http\S+", "", text)
+    text = re.sub(r"@\w+", "", text)
+    text = re.sub(r"#\w+", "", text)
+    text = re.sub(r"[^A-Za-z\s]", " ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.lower().strip()
+
+def row_text_for_analysis(title, comment, description) -> str:
+    """Text analysed for one scraped row, same as processor's text_for_analysis column."""
+    return f"{title} {comment} {description}".strip()
+
+def compile_list(lst): return [re.compile(pat, flags=re.IGNORECASE) for pat in lst]
+
+
+# ---------------- India-specific nature detection ----------------
+PRO_INDIA = [r"\bjai hind\b", r"\bvande mataram\b", r"\bpro india\b", r"\bpro-india\b", r"\bsupport (?:india|modi|bjp)\b", r"\bproud of india\b", r"\bindia is great\b"]
+ANTI_INDIA = [r"\banti[- ]?india\b", r"\banti national\b", r"\btraitor\b", r"\banti-india\b", r"\bkill india\b", r"\bboycott india\b"]
+CRITICAL_GOVT = [r"\bmodi sucks\b", r"\bcorrupt government\b", r"\bgovernment (?:is )?failing\b", r"\b(criticis|criticize|criticising) (?:government|modi|bjp)\b", r"\bpolicy (?:failure|fail)\b", r"\banti-corruption\b", r"\bmisgovern(ance|ing)\b", r"\bgovernment (?:policy|policies)"]
+SUPPORT_OPPOSITION = [r"\bsupport (?:congress|aam aadmi|aap|opposition)\b", r"\bvot(e|ing) for .*opposition\b"]
+SEPARATIST = [r"\bazadi\b", r"\bseparatist\b", r"\bsecede\b", r"\bindependence for\b"]
+COMMUNAL = [r"\bcommunal\b", r"\breligious (?:tension|hatred)\b", r"\breligious\b", r"\bminority\b"]
+CALL_TO_ACTION = [r"\bprotest\b", r"\bboycott\b", r"\bjoin (?:the )?protest\b", r"\bstrike\b", r"\brally\b", r"\baction\b"]
+CONSPIRACY = [r"\bforeign funded\b", r"\bdeep state\b", r"\bconspiracy\b", r"\bwestern plot\b", r"\bcia\b", r"\bsecret agenda\b"]
+
+PRO_INDIA_RE = compile_list(PRO_INDIA); ANTI_INDIA_RE = compile_list(ANTI_INDIA)
+CRITICAL_GOVT_RE = compile_list(CRITICAL_GOVT); SUPPORT_OPPOSITION_RE = compile_list(SUPPORT_OPPOSITION)
+SEPARATIST_RE = compile_list(SEPARATIST); COMMUNAL_RE = compile_list(COMMUNAL)
+CALL_TO_ACTION_RE = compile_list(CALL_TO_ACTION); CONSPIRACY_RE = compile_list(CONSPIRACY)
+
+
+def text_matches_any(text, patterns):
+    for pat in patterns:
+        if pat.search(text or ""): return True
+    return False
+
+def determine_nature(text, sentiment_label):
+    t = (text or "").lower()
+    # 1. High-priority flags (dangerous or specific categories)
+    if text_matches_any(t, SEPARATIST_RE): return "separatist"
+    if text_matches_any(t, CALL_TO_ACTION_RE): return "call-to-action"
+    if text_matches_any(t, COMMUNAL_RE): return "communal"
+    if text_matches_any(t, CONSPIRACY_RE): return "conspiratorial"
+
+    # 2. Trust the advanced model's label if available
+    s = str(sentiment_label)
+    if s == "Pro-India": return "pro-india"
+    if s == "Anti-India": return "anti-india"
+    if s == "Pro-Government": return "pro-government"
+    if s == "Anti-Government": return "anti-government"
+
+    # 3. Fallback to Regex for other cases or if model was Neutral
+    if text_matches_any(t, ANTI_INDIA_RE): return "anti-india"
+    if text_matches_any(t, PRO_INDIA_RE): return "pro-india"
+    if text_matches_any(t, CRITICAL_GOVT_RE): return "critical-of-government"
+    if text_matches_any(t, SUPPORT_OPPOSITION_RE): return "supportive-of-opposition"
+
+    # 4. Fallback to generic POS/NEG (legacy)
+    s_upper = s.upper()
+    if "POS" in s_upper: return "supportive"
+    if "NEG" in s_upper: return "critical"
+    
+    return "neutral"
+
+# ---------------- DANGEROUS FLAG ----------------
+danger_keywords = ["kill","attack","bomb","violence","terror","terrorist","militant",
+                   "insurgency","boycott","protest","call to action"]
+pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, danger_keywords)) + r')\b',
+                      flags=re.IGNORECASE)
+
+def is_dangerous(text, sentiment):
+    # if pattern.search(text or ""): return True
+    return (str(sentiment).upper() == "ANTI-INDIA" and text.strip() != "")
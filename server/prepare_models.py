@@ -0,0 +1,40 @@
+"""
+Populate the local model snapshot cache (src/model_snapshots.py) ahead of time, e.g. in the
+image build or before starting the API / model server, so no process ever resolves a hub id or
+unpickles a checkpoint at start-up.
+
+Usage (from server/):
+  python prepare_models.py                       # every model, skips up-to-date snapshots
+  python prepare_models.py --only sentiment sarcasm --force
+  MODEL_SNAPSHOT_DIR=/srv/snapshots python prepare_models.py
+"""
+
+import sys,logging,argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from src import model_snapshots
+# importing the model modules registers their hub ids (no model is loaded)
+import src.embeddings, src.sentiment, src.sarcasm, src.context_llm  # noqa: F401
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--only", nargs="+", choices=sorted(model_snapshots.registered()), default=None)
+    ap.add_argument("--force", action="store_true", help="rebuild snapshots that are already up to date")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    names = args.only or sorted(model_snapshots.registered())
+    failed = []
+    for name in names:
+        try:
+            path = model_snapshots.prepare(name, force=args.force)
+            print(f"{name:<10} {path}")
+        except Exception as e:
+            print(f"{name:<10} FAILED: {e}")
+            failed.append(name)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
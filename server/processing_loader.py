@@ -0,0 +1,81 @@
+"""
+Lazy loading of the processing stack for the API server.
+processor / pipeline pull in pandas, sklearn, matplotlib, wordcloud, reportlab, praw and
+sentiment_analysis (torch, transformers and the models on first use). main.py only loads them
+when a rerun (or /posts/similar with text) needs them, so the file-serving and metadata
+endpoints start in well under a second (benchmarks/import_time.py).
+PREWARM_MODELS=1 loads the stack and the models in a background thread after startup instead.
+/classify only needs the classifier: load_classifier() imports sentiment_analysis on its own,
+without the report / scraping modules.
+Expose: load() -> namespace(processor, pipeline, sentiment_analysis, scrape_reddit_to_csv),
+load_classifier() -> sentiment_analysis, prewarm(), status()
+"""
+
+import os,time,logging,threading
+from types import SimpleNamespace
+from typing import Optional
+
+logger = logging.getLogger("processing-loader")
+
+PREWARM_MODELS = os.environ.get("PREWARM_MODELS", "0").lower() in ("1", "true", "yes")
+
+_lock = threading.Lock()
+_modules: Optional[SimpleNamespace] = None
+_state = {"modules": "cold", "models": "cold", "import_s": None, "models_s": None, "error": None}
+
+def load() -> SimpleNamespace:
+    """Import the processing modules once (thread-safe); later calls return the cached namespace."""
+    global _modules
+    if _modules is not None:
+        return _modules
+    with _lock:
+        if _modules is None:
+            _state["modules"] = "loading"
+            start = time.perf_counter()
+            try:
+                import processor
+                import pipeline
+                from reddit_scrapper import scrape_reddit_to_csv
+            except Exception as e:
+                _state.update(modules="failed", error=str(e))
+                raise RuntimeError(f"Failed to import processor.py: {e}")
+            _state.update(modules="ready", import_s=round(time.perf_counter() - start, 2), error=None)
+            logger.info("Processing modules imported in %.1fs", _state["import_s"])
+            _modules = SimpleNamespace(processor=processor, pipeline=pipeline,
+                                       sentiment_analysis=processor.sentiment_analysis,
+                                       scrape_reddit_to_csv=scrape_reddit_to_csv)
+    return _modules
+
+def load_classifier():
+    """sentiment_analysis (the model stack behind classify()), without processor / pipeline."""
+    if _modules is not None:
+        return _modules.sentiment_analysis
+    try:
+        import sentiment_analysis
+    except Exception as e:
+        raise RuntimeError(f"Failed to import sentiment_analysis.py: {e}")
+    return sentiment_analysis
+
+def _prewarm() -> None:
+    try:
+        modules = load()
+        _state["models"] = "loading"
+        start = time.perf_counter()
+        modules.sentiment_analysis.warm_up()
+        _state.update(models="ready", models_s=round(time.perf_counter() - start, 2))
+        logger.info("Models prewarmed in %.1fs", _state["models_s"])
+    except Exception as e:
+        # the first rerun retries the import and reports the error to its caller
+        _state.update(models="failed", error=str(e))
+        logger.warning("Prewarm failed: %s", e)
+
+def prewarm() -> Optional[threading.Thread]:
+    """Start loading modules + models in a daemon thread; None when PREWARM_MODELS is off."""
+    if not PREWARM_MODELS:
+        return None
+    thread = threading.Thread(target=_prewarm, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+def status() -> dict:
+    return dict(_state)
@@ -2,19 +2,31 @@
 Updated: supports large tables using LongTable + docx export.
 Processor module.
 Expose: generate_reports_from_csv(input_csv: str, out_dir: str) -> dict
-Produces: out_dir/analysis_output.csv, out_dir/report.pdf, out_dir/report.docx (optional)
+Produces: out_dir/analysis_output.csv, out_dir/report.pdf, out_dir/report.docx (optional),
+out_dir/topic_model.joblib (when there was enough text for topics)
+The input is read and classified in chunks (PROCESSOR_CHUNK_ROWS), so memory stays bounded
+for any input size; topics are fitted on a bounded sample and the report tables are capped.
 """
 
-import os,re,sys,csv,logging
+import os,re,csv,time,random,logging
 from datetime import datetime
 from pathlib import Path
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
+import joblib
 import matplotlib.pyplot as plt
 from wordcloud import WordCloud, STOPWORDS
-from transformers import pipeline
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.decomposition import LatentDirichletAllocation
+
+# pyarrow (optional): streaming CSV reader + Arrow-backed string columns
+ARROW_AVAILABLE = True
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except Exception:
+    ARROW_AVAILABLE = False
   
 # reportlab platypus
 from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, PageBreak,
@@ -38,6 +50,10 @@ try:
 except Exception as e:
     raise RuntimeError(f"Failed to import sentiment_analysis.py: {e}")
 
+from src.near_duplicates import NearDuplicateIndex
+# rule-based labels live in post_labels so /classify can use them without this module's imports
+from post_labels import clean_text, row_text_for_analysis, determine_nature, is_dangerous
+
 logger = logging.getLogger("processor")
 logger.setLevel(logging.INFO)
 
@@ -45,10 +61,64 @@ logger.setLevel(logging.INFO)
 CSV_ENCODING = "utf-8"
 MAX_ROWS = None          # None => all rows
 TOPIC_COUNT = 3
+# (vectorizer, lda) of the run, read back by ingest.py
+TOPIC_MODEL_FILE = "topic_model.joblib"
+# classify one representative per near-duplicate group (crossposts, copy-pastes)
+DEDUP_ENABLED = os.environ.get("DEDUP_ENABLED", "1").lower() in ("1", "true", "yes")
+# posts a new one is matched against (about 4 KB of index each); copies further apart are
+# grouped separately (0 = all, unbounded)
+DEDUP_WINDOW = int(os.environ.get("DEDUP_WINDOW", 20000))
+
+# rows per chunk read from the input CSV (0 = whole file at once)
+CHUNK_ROWS = int(os.environ.get("PROCESSOR_CHUNK_ROWS", 5000))
+# topic model is fitted on a uniform sample of at most this many posts
+TOPIC_SAMPLE_ROWS = int(os.environ.get("TOPIC_SAMPLE_ROWS", 20000))
+# rows shown in the PDF "all posts" / "dangerous posts" tables (first N, the CSV has them all)
+REPORT_MAX_TABLE_ROWS = int(os.environ.get("REPORT_MAX_TABLE_ROWS", 5000))
+DOCX_SAMPLE_ROWS = 200
+WORDCLOUD_MAX_CHARS = 2_000_000
+# near-duplicate groups whose embedding is kept for later copies (most recent groups)
+EMBEDDING_CACHE_GROUPS = 20000
 
 # Table teaser length to avoid massive single-cell height in PDF tables
 TEASER_CHAR_LIMIT = 900
 
+# ---------------- SCHEMA ----------------
+# Arrow strings store one buffer per column instead of a Python object per cell;
+# low-cardinality columns are categoricals (codes + one copy of each value).
+TEXT = pd.StringDtype("pyarrow") if ARROW_AVAILABLE else object
+
+# scraped input (reddit_scrapper.py): every known column is read as text, parsing happens in
+# normalize_chunk; other columns are not read at all
+INPUT_SCHEMA = {
+    "Title": TEXT, "Reference": TEXT, "Subreddit": TEXT, "Score": TEXT, "Comments": TEXT,
+    "Time": TEXT, "Author": TEXT, "Description": TEXT, "Url": TEXT,
+}
+TEXT_COLUMNS = ["Title", "Comments", "Description"]
+
+# analysis frame == analysis_output.csv, in column order
+#   orig_index         row number in the input CSV
+#   title .. url       input columns (empty string / "N/A" when missing)
+#   text_for_analysis  title + comment + description
+#   clean_text         lower-cased letters only, what the models see
+#   score              integer part of the scraped score (missing when unparseable)
+#   created_at         absolute or relative ("3 hours ago", against the input file mtime) time
+#   dup_group          near-duplicate group number, in order of first appearance
+#   sentiment, sentiment_score   stance label + confidence
+#   nature, topic, dangerous     rule-based nature, LDA topic (missing without topics), danger flag
+#   created_at_str     created_at as "%Y-%m-%d %H:%M:%S"
+ANALYSIS_SCHEMA = {
+    "orig_index": TEXT, "title": TEXT, "reference": TEXT, "subreddit": "category", "comment": TEXT,
+    "username": "category", "description": TEXT, "url": TEXT, "text_for_analysis": TEXT, "clean_text": TEXT,
+    # created_at: datetime64, object only when the input mixes time zones
+    "score": "Int64", "created_at": None, "dup_group": "int32", "sentiment": "category",
+    "sentiment_score": "float64", "nature": "category", "topic": "Int8", "dangerous": "bool",
+    "created_at_str": TEXT,
+}
+# the spill file between pass 1 and pass 2 is read back as exact strings (topic is added in pass 2)
+SPILL_SCHEMA = {col: ("category" if dtype in ("category", "bool") else TEXT)
+                for col, dtype in ANALYSIS_SCHEMA.items() if col != "topic"}
+
 # ---------------- UTIL ----------------
 RELATIVE_TIME_RE = re.compile(
     r'(?:(\d+)\s*(second|sec|s|minute|min|m|hour|hr|h|day|d|week|w|month|mo|year|yr|y)s?\s*ago)|\b(yesterday|today|just now|now)\b',
@@ -97,15 +167,6 @@ def parse_relative_time(s: str, ref: pd.Timestamp):
     if unit in ("year","yr","y"): return ref - pd.Timedelta(days=qty * 365)
     return pd.NaT
 
-def clean_text(text: str) -> str:
-    if not isinstance(text, str): return ""
-    text = re.sub(r"http\S+", "", text)
-    text = re.sub(r"@\w+", "", text)
-    text = re.sub(r"#\w+", "", text)
-    text = re.sub(r"[^A-Za-z\s]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.lower().strip()
-
 def chunked(iterable, size):
     for i in range(0, len(iterable), size):
         yield iterable[i:i+size]
@@ -136,196 +197,485 @@ def parse_time_value(v,ref_ts):
     if pd.notna(rt): return pd.to_datetime(rt)
     return pd.NaT
 
-def compile_list(lst): return [re.compile(pat, flags=re.IGNORECASE) for pat in lst]
-
-
-# ---------------- India-specific nature detection ----------------
-PRO_INDIA = [r"\bjai hind\b", r"\bvande mataram\b", r"\bpro india\b", r"\bpro-india\b", r"\bsupport (?:india|modi|bjp)\b", r"\bproud of india\b", r"\bindia is great\b"]
-ANTI_INDIA = [r"\banti[- ]?india\b", r"\banti national\b", r"\btraitor\b", r"\banti-india\b", r"\bkill india\b", r"\bboycott india\b"]
-CRITICAL_GOVT = [r"\bmodi sucks\b", r"\bcorrupt government\b", r"\bgovernment (?:is )?failing\b", r"\b(criticis|criticize|criticising) (?:government|modi|bjp)\b", r"\bpolicy (?:failure|fail)\b", r"\banti-corruption\b", r"\bmisgovern(ance|ing)\b", r"\bgovernment (?:policy|policies)"]
-SUPPORT_OPPOSITION = [r"\bsupport (?:congress|aam aadmi|aap|opposition)\b", r"\bvot(e|ing) for .*opposition\b"]
-SEPARATIST = [r"\bazadi\b", r"\bseparatist\b", r"\bsecede\b", r"\bindependence for\b"]
-COMMUNAL = [r"\bcommunal\b", r"\breligious (?:tension|hatred)\b", r"\breligious\b", r"\bminority\b"]
-CALL_TO_ACTION = [r"\bprotest\b", r"\bboycott\b", r"\bjoin (?:the )?protest\b", r"\bstrike\b", r"\brally\b", r"\baction\b"]
-CONSPIRACY = [r"\bforeign funded\b", r"\bdeep state\b", r"\bconspiracy\b", r"\bwestern plot\b", r"\bcia\b", r"\bsecret agenda\b"]
-
-PRO_INDIA_RE = compile_list(PRO_INDIA); ANTI_INDIA_RE = compile_list(ANTI_INDIA)
-CRITICAL_GOVT_RE = compile_list(CRITICAL_GOVT); SUPPORT_OPPOSITION_RE = compile_list(SUPPORT_OPPOSITION)
-SEPARATIST_RE = compile_list(SEPARATIST); COMMUNAL_RE = compile_list(COMMUNAL)
-CALL_TO_ACTION_RE = compile_list(CALL_TO_ACTION); CONSPIRACY_RE = compile_list(CONSPIRACY)
-
-
-def text_matches_any(text, patterns):
-    for pat in patterns:
-        if pat.search(text or ""): return True
-    return False
-
-def determine_nature(text, sentiment_label):
-    t = (text or "").lower()
-    # 1. High-priority flags (dangerous or specific categories)
-    if text_matches_any(t, SEPARATIST_RE): return "separatist"
-    if text_matches_any(t, CALL_TO_ACTION_RE): return "call-to-action"
-    if text_matches_any(t, COMMUNAL_RE): return "communal"
-    if text_matches_any(t, CONSPIRACY_RE): return "conspiratorial"
-
-    # 2. Trust the advanced model's label if available
-    s = str(sentiment_label)
-    if s == "Pro-India": return "pro-india"
-    if s == "Anti-India": return "anti-india"
-    if s == "Pro-Government": return "pro-government"
-    if s == "Anti-Government": return "anti-government"
-
-    # 3. Fallback to Regex for other cases or if model was Neutral
-    if text_matches_any(t, ANTI_INDIA_RE): return "anti-india"
-    if text_matches_any(t, PRO_INDIA_RE): return "pro-india"
-    if text_matches_any(t, CRITICAL_GOVT_RE): return "critical-of-government"
-    if text_matches_any(t, SUPPORT_OPPOSITION_RE): return "supportive-of-opposition"
-
-    # 4. Fallback to generic POS/NEG (legacy)
-    s_upper = s.upper()
-    if "POS" in s_upper: return "supportive"
-    if "NEG" in s_upper: return "critical"
-    
-    return "neutral"
-
-# ---------------- DANGEROUS FLAG ----------------
-danger_keywords = ["kill","attack","bomb","violence","terror","terrorist","militant",
-                   "insurgency","boycott","protest","call to action"]
-pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, danger_keywords)) + r')\b',
-                      flags=re.IGNORECASE)
-
-def is_dangerous(text, sentiment):
-    # if pattern.search(text or ""): return True
-    return (str(sentiment).upper() == "ANTI-INDIA" and text.strip() != "")
-
-def generate_reports_from_csv(input_csv:str, out_dir:str) -> dict:
+def prediction_from_result(out: dict):
+    """sentiment_analysis.classify() result -> (label, score)."""
+    # Handle error or valid result
+    if "error" in out:
+        return ("NEUTRAL", 0.0)
+    return (out.get("label", "NEUTRAL"), float(out.get("confidence", 0.0)))
+
+def features_from_result(out: dict):
+    """sentiment_analysis.classify() result -> (13-dim feature vector or None, cascade stage)."""
+    if "error" in out or "features" not in out:
+        return (None, None)
+    return (np.asarray(out["features"], dtype=np.float32), int(out.get("stage", 2)))
+
+# ---------------- STAGES ----------------
+# generate_reports_from_csv streams the input through these in chunks of CHUNK_ROWS rows:
+#   pass 1: read chunk -> normalize_chunk -> classify_chunk -> annotate_chunk -> spill CSV
+#           (+ bounded reservoir sample of clean_text for the topic model)
+#   topics: fit_topic_model on the sample
+#   pass 2: spill chunk -> assign_topics -> analysis_output.csv + ReportSummary
+#   report: render_visuals / build_pdf / build_docx from the ReportSummary only
+# so peak memory is a couple of chunks plus the bounded summary, whatever the input size.
+
+def _input_columns(input_csv: str) -> list:
+    with open(input_csv, "r", encoding=CSV_ENCODING, newline="") as f:
+        header = next(csv.reader(f), [])
+    return [c for c in header if c in INPUT_SCHEMA]
+
+def read_input_chunks(input_csv: str, chunk_rows: int = CHUNK_ROWS):
     """
-    Runs full analysis pipeline. Returns dict: {'pdf':..., 'csv':..., 'docx':...}
+    DataFrames of at most chunk_rows raw rows (one frame with everything when chunk_rows is 0),
+    INPUT_SCHEMA columns only, all text: dtypes can't differ from one chunk to the next.
+    The index continues across chunks (row number in the file).
     """
-    logger.info("Running processing pipeline on %s",input_csv)
-    out_dir= Path(out_dir)
-    out_dir.mkdir(parents=True,exist_ok=True)
+    columns = _input_columns(input_csv)
+    if not ARROW_AVAILABLE:
+        opts = dict(encoding=CSV_ENCODING, usecols=columns, dtype=str, nrows=MAX_ROWS)
+        if chunk_rows:
+            yield from pd.read_csv(input_csv, chunksize=chunk_rows, **opts)
+        else:
+            yield pd.read_csv(input_csv, **opts)
+        return
+    # pyarrow's streaming reader parses in parallel blocks; batches are regrouped into chunk_rows
+    reader = pa_csv.open_csv(
+        input_csv,
+        read_options=pa_csv.ReadOptions(encoding=CSV_ENCODING),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(include_columns=columns,
+                                              column_types={c: pa.string() for c in columns},
+                                              strings_can_be_null=True, quoted_strings_can_be_null=False),
+    )
+    limit = MAX_ROWS if MAX_ROWS else float("inf")
+    start = 0
+    pending, pending_rows = [], 0
+
+    def to_frame(batches, n):
+        nonlocal start
+        table = pa.Table.from_batches(batches, schema=reader.schema).slice(0, n)
+        df = table.to_pandas(types_mapper={pa.string(): TEXT}.get)
+        df.index = pd.RangeIndex(start, start + len(df))
+        start += len(df)
+        return df
+
+    for batch in reader:
+        batch = batch.slice(0, max(0, min(len(batch), limit - start - pending_rows)))
+        pending.append(batch)
+        pending_rows += len(batch)
+        while chunk_rows and pending_rows >= chunk_rows:
+            table = pa.Table.from_batches(pending, schema=reader.schema)
+            yield to_frame(table.slice(0, chunk_rows).to_batches(), chunk_rows)
+            pending = table.slice(chunk_rows).to_batches()
+            pending_rows -= chunk_rows
+        if start + pending_rows >= limit:
+            break
+    if pending_rows or start == 0:
+        yield to_frame(pending, pending_rows)
 
-    # ---------------- READ CSV ----------------
-    if not os.path.exists(input_csv):
-        print("CSV file not found:", input_csv); sys.exit(1)
+def parse_scores(raw: pd.Series) -> pd.Series:
+    """Vectorised parse_score: first integer in the text (thousands separators ignored)."""
+    digits = raw.astype(TEXT).str.replace(",", "", regex=False).str.extract(r"(-?\d+)", expand=False)
+    return pd.to_numeric(digits, errors="coerce").astype("Int64")
 
-    print("Loading CSV:", input_csv)
+def parse_times(raw: pd.Series, ref_ts) -> pd.Series:
+    """
+    Vectorised parse_time_value: absolute timestamps in one pass, relative ones ("3 hours ago")
+    per value for the rows that didn't parse.
+    """
     try:
-        df_raw = pd.read_csv(input_csv, encoding=CSV_ENCODING, low_memory=False)
-    except Exception as e:
-        print("Error reading CSV:", e); sys.exit(1)
-
-    if MAX_ROWS:
-        df_raw = df_raw.head(MAX_ROWS)
-
-    title_col = "Title"
-    reference_col = "Reference"
-    subreddit_col = "Subreddit"
-    score_col = "Score"
-    comment_col = "Comments"
-    time_col = "Time"
-    author_col = "Author"
-    desc_col = "Description"
-    url_col = "Url"
-
-    if not any(c in df_raw.columns for c in [title_col, comment_col, desc_col]):
-        print("No text column detected. CSV columns:", list(df_raw.columns)); sys.exit(1)
+        parsed = pd.to_datetime(raw, errors="coerce", format="mixed")
+    except (ValueError, TypeError):
+        # mixed time zones etc.: the per-value path copes with those
+        return raw.astype(object).apply(lambda x: parse_time_value(x, ref_ts))
+    rest = parsed.isna() & raw.notna()
+    if rest.any():
+        relative = raw[rest].astype(object).apply(lambda x: parse_relative_time(str(x).strip(), ref_ts))
+        parsed = parsed.astype(object)
+        parsed[rest] = relative
+        parsed = pd.to_datetime(parsed)
+    return parsed
+
+def normalize_chunk(df_raw: pd.DataFrame, ref_ts) -> pd.DataFrame:
+    """Raw scraped columns -> the normalized analysis columns (text, clean_text, score, created_at)."""
+    title_col, reference_col, subreddit_col = "Title", "Reference", "Subreddit"
+    score_col, comment_col, time_col = "Score", "Comments", "Time"
+    author_col, desc_col, url_col = "Author", "Description", "Url"
 
 # if title is None(not provided) entire column is filled with "" strings
 # if title is provided but for some it is NaN after astype(str) they become "nan" not empty string
     # normalized df
-    df = pd.DataFrame()
+    df = pd.DataFrame(index=df_raw.index)
     df["orig_index"] = df_raw.index.astype(str)
-    df["title"] = df_raw[title_col].fillna("").astype(str) if title_col else ""
-    df["reference"] = df_raw[reference_col].astype(str) if reference_col else ""
-    df["subreddit"] = df_raw[subreddit_col] if subreddit_col else "N/A"
-    df["raw_score"] = df_raw[score_col] if score_col else np.nan
-    df["comment"] = df_raw[comment_col].fillna("").astype(str) if comment_col else ""
-    df["time_raw"] = df_raw[time_col] if time_col else ""
-    df["username"] = df_raw[author_col] if author_col else "N/A"
-    df["description"] = df_raw[desc_col].fillna("").astype(str) if desc_col else ""
-    df["url"] = df_raw[url_col] if url_col else ""
-  
+    df["title"] = df_raw[title_col].fillna("") if title_col in df_raw else ""
+    df["reference"] = df_raw[reference_col].fillna("nan") if reference_col in df_raw else ""
+    df["subreddit"] = df_raw[subreddit_col] if subreddit_col in df_raw else "N/A"
+    df["raw_score"] = df_raw[score_col] if score_col in df_raw else None
+    df["comment"] = df_raw[comment_col].fillna("") if comment_col in df_raw else ""
+    df["time_raw"] = df_raw[time_col] if time_col in df_raw else None
+    df["username"] = df_raw[author_col] if author_col in df_raw else "N/A"
+    df["description"] = df_raw[desc_col].fillna("") if desc_col in df_raw else ""
+    df["url"] = df_raw[url_col] if url_col in df_raw else ""
+    df = df.astype({c: TEXT for c in ("orig_index", "title", "reference", "comment", "description", "url",
+                                      "raw_score", "time_raw")})
+
     df["text_for_analysis"] = (df["title"] + " " + df["comment"] + " " + df["description"]).str.strip()
-    df.loc[df["text_for_analysis"].str.strip() == "", "text_for_analysis"] = df.loc[df["text_for_analysis"].str.strip() == "", :].apply(
-        lambda r: " ".join([str(v) for v in r.values if isinstance(v, str) and v.strip() != ""]), axis=1
-    )
-    df["clean_text"] = df["text_for_analysis"].apply(clean_text)
-    df["score"] = df["raw_score"].apply(parse_score)
+    empty = df["text_for_analysis"] == ""
+    if empty.any():
+        df.loc[empty, "text_for_analysis"] = df.loc[empty, :].astype(object).apply(
+            lambda r: " ".join([str(v) for v in r.values if isinstance(v, str) and v.strip() != ""]), axis=1
+        )
+    df["clean_text"] = df["text_for_analysis"].apply(clean_text).astype(TEXT)
+    # nullable ints: every chunk writes "12" / "" whatever mix of missing scores it holds
+    df["score"] = parse_scores(df["raw_score"])
+    df["created_at"] = parse_times(df["time_raw"], ref_ts)
+    # raw score / time are parsed now and not part of the output
+    df = df.drop(columns=["raw_score", "time_raw"])
+    return df.astype({c: ANALYSIS_SCHEMA[c] for c in ("subreddit", "username")})
+
+class ChunkClassifier:
+    """
+    Sentiment for one chunk at a time. Near-duplicate state (src/near_duplicates) spans chunks:
+    a representative is always the earliest copy, so its label is known when later copies arrive.
+    Groups are forgotten once the index's window (DEDUP_WINDOW posts) has moved past them, only
+    their size is kept for the cluster summary, so the state stays bounded too.
+    With a run_budget.RunBudget, throughput is reported after every post and the classify
+    options follow the budget's degradations.
+    """
 
-    # parse times
-    try:
-        ref_ts = pd.to_datetime(os.path.getmtime(input_csv), unit='s')
-    except Exception:
-        ref_ts = pd.Timestamp.now()
-    
-    df["created_at"] = df["time_raw"].apply(lambda x: parse_time_value(x,ref_ts))
-
-    # ---------------- SENTIMENT ----------------
-    print("Loading sentiment model...")
-    # Initialize anchors (required for classification)
-    sentiment_analysis.init_anchors()
-
-    texts = df["clean_text"].tolist()
-    preds = []
-    
-    for text in texts:
-        out = sentiment_analysis.classify(text)
-        
-        # Handle error or valid result
-        if "error" in out:
-            preds.append(("NEUTRAL", 0.0))
+    def __init__(self, precomputed: dict = None, budget=None, total_rows: int = 0):
+        self.precomputed = precomputed or {}
+        self.budget = budget
+        self.total_rows = total_rows
+        self.rows = 0
+        self.dedup = NearDuplicateIndex(window=DEDUP_WINDOW) if DEDUP_ENABLED else None
+        self.groups = 0
+        # per open group (keyed by representative): dup_group number, prediction, size
+        self.group_ids = {}
+        self.group_pred = {}
+        self.group_size = {}
+        # near-duplicate clusters (groups of 2+) already closed: count, posts, largest
+        self.closed_clusters = [0, 0, 0]
+        self.group_emb = OrderedDict()
+        self.anchors_ready = False
+        self.classified = 0
+        self.reused = 0
+        self.propagated = 0
+
+    def _group_id(self, rep: int) -> int:
+        self.group_size[rep] = self.group_size.get(rep, 0) + 1
+        group = self.group_ids.get(rep)
+        if group is None:
+            group = self.group_ids[rep] = self.groups
+            self.groups += 1
+        return group
+
+    def _merge(self, merged: list) -> None:
+        """Fold groups the index merged (a post bridged them) into the surviving representative."""
+        for other, root in merged:
+            self.group_size[root] = self.group_size.get(root, 0) + self.group_size.pop(other, 0)
+            # rows already numbered keep other's dup_group, later ones get root's
+            self.group_ids.pop(other, None)
+            pred = self.group_pred.pop(other, None)
+            if pred is not None:
+                self.group_pred.setdefault(root, pred)
+            emb = self.group_emb.pop(other, None)
+            if emb is not None and root not in self.group_emb:
+                self.group_emb[root] = emb
+        merged.clear()
+
+    def _close(self, reps: list) -> None:
+        """Forget groups no later post can join."""
+        for r in reps:
+            self.group_ids.pop(r, None)
+            self.group_pred.pop(r, None)
+            self.group_emb.pop(r, None)
+            self._count_cluster(self.group_size.pop(r, 0))
+        if self.dedup is not None:
+            self.dedup.closed.clear()
+
+    def _count_cluster(self, size: int) -> None:
+        if size > 1:
+            self.closed_clusters[0] += 1
+            self.closed_clusters[1] += size
+            self.closed_clusters[2] = max(self.closed_clusters[2], size)
+
+    def clusters(self) -> tuple:
+        """(near-duplicate clusters, posts in them, largest cluster) over every chunk so far."""
+        sizes = [size for size in self.group_size.values() if size > 1]
+        count, posts, largest = self.closed_clusters
+        return count + len(sizes), posts + sum(sizes), max([largest] + sizes)
+
+    def classify_chunk(self, df: pd.DataFrame):
+        """
+        Adds sentiment, sentiment_score, dup_group. Returns (features, embeddings) blocks for the
+        stores: features for posts classified here, embeddings for every post.
+        """
+        texts = df["clean_text"].tolist()
+        n = len(texts)
+        preds = [None] * n
+        feats = [(None, None)] * n
+        embs = [None] * n
+
+        # rows already classified upstream (pipeline.py classifies while scraping);
+        # only reused when the text matches exactly what this pass would analyse
+        for i, (ref, text) in enumerate(zip(df["reference"], texts)):
+            hit = self.precomputed.get(ref)
+            if hit is not None and hit[0] == text:
+                preds[i] = (hit[1], hit[2])
+                if len(hit) > 4:
+                    feats[i] = (hit[3], hit[4])
+                if len(hit) > 5:
+                    embs[i] = hit[5]
+        self.reused += sum(p is not None for p in preds)
+
+        # near-duplicate groups: dup_group numbers groups in order of first appearance
+        if self.dedup is not None:
+            reps = [self.dedup.add(text) for text in texts]
         else:
-            label = out.get("label", "NEUTRAL")
-            score = float(out.get("confidence", 0.0))
-            preds.append((label, score))
-
-    df["sentiment"] = [p[0] for p in preds]
-    df["sentiment_score"] = [p[1] for p in preds]
-    
+            reps = list(range(self.rows, self.rows + n))
+        df["dup_group"] = [self._group_id(r) for r in reps]
+        offset = self.dedup.added - n if self.dedup is not None else self.rows
+
+        # a group member already classified upstream stands in for the whole group
+        for i, r in enumerate(reps):
+            if preds[i] is not None:
+                self.group_pred.setdefault(r, preds[i])
+        todo = [i for i, r in enumerate(reps) if preds[i] is None and r not in self.group_pred and r == offset + i]
+        if todo and not self.anchors_ready:
+            print("Loading sentiment model...")
+            # Initialize anchors (required for classification)
+            sentiment_analysis.init_anchors()
+            self.anchors_ready = True
+        self.rows += n
+        # share of rows that needed the models so far, to extrapolate over the rows still unread
+        classify_share = (self.classified + len(todo)) / max(self.rows, 1)
+        options = self.budget.classify_options() if self.budget else {}
+        for k, i in enumerate(todo):
+            start = time.perf_counter()
+            out = sentiment_analysis.classify(texts[i], **options)
+            preds[i] = self.group_pred[reps[i]] = prediction_from_result(out)
+            feats[i] = features_from_result(out)
+            embs[i] = out.get("embedding")
+            if self.budget:
+                self.budget.observe(1, time.perf_counter() - start)
+                left = len(todo) - k - 1 + max(self.total_rows - self.rows, 0) * classify_share
+                if self.budget.check(left):
+                    options = self.budget.classify_options()
+        self.classified += len(todo)
+        for i, r in enumerate(reps):
+            if preds[i] is None:
+                preds[i] = self.group_pred[r]
+                self.propagated += 1
+            if embs[i] is not None and r not in self.group_emb:
+                self.group_emb[r] = embs[i]
+                if len(self.group_emb) > EMBEDDING_CACHE_GROUPS:
+                    self.group_emb.popitem(last=False)
+        embs = [e if e is not None else self.group_emb.get(r) for e, r in zip(embs, reps)]
+        if self.dedup is not None:
+            self._merge(self.dedup.merged)
+        self._close(self.dedup.closed if self.dedup is not None else reps)
+
+        df["sentiment"] = [p[0] for p in preds]
+        df["sentiment_score"] = [p[1] for p in preds]
+
+        refs, labels = df["reference"].tolist(), df["sentiment"].tolist()
+        stored = [i for i, (f, _) in enumerate(feats) if f is not None]
+        features = {
+            "post_ids": [refs[i] for i in stored],
+            "features": np.stack([feats[i][0] for i in stored]) if stored else np.zeros((0, 13), dtype=np.float32),
+            "labels": [labels[i] for i in stored],
+            "stages": [feats[i][1] for i in stored],
+        }
+        embedded = [i for i, e in enumerate(embs) if e is not None]
+        subreddits, titles, urls, times = (df[c].tolist() for c in ("subreddit", "title", "url", "created_at"))
+        embeddings = {
+            "embeddings": np.stack([embs[i] for i in embedded]) if embedded else np.zeros((0, 0), dtype=np.float32),
+            "posts": [{
+                "post_id": refs[i],
+                "subreddit": str(subreddits[i]) if pd.notna(subreddits[i]) else None,
+                "title": titles[i],
+                "label": labels[i],
+                "url": str(urls[i]) if pd.notna(urls[i]) else None,
+                "time": times[i].strftime("%Y-%m-%d %H:%M:%S") if pd.notna(times[i]) else None,
+            } for i in embedded],
+        }
+        return features, embeddings
+
+def annotate_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Row-local labels derived from sentiment: nature, dangerous (+ schema dtypes for the new columns)."""
     df["nature"] = [
         determine_nature(text, sentiment)
         for text, sentiment in zip(df["clean_text"], df["sentiment"])
     ]
+    df["dangerous"] = [is_dangerous(text, sentiment) for text, sentiment in zip(df["clean_text"], df["sentiment"])]
+    return df.astype({c: ANALYSIS_SCHEMA[c] for c in ("dup_group", "sentiment", "nature", "dangerous")})
+
+class TextReservoir:
+    """Uniform fixed-size sample of a stream (Algorithm R); all rows when the stream is small."""
+
+    def __init__(self, size: int, seed: int = 42):
+        self.size = size
+        self.seen = 0
+        self.sample = []
+        self._rng = random.Random(seed)
+
+    def add(self, texts) -> None:
+        for text in texts:
+            self.seen += 1
+            if len(self.sample) < self.size:
+                self.sample.append(text)
+            else:
+                j = self._rng.randrange(self.seen)
+                if j < self.size:
+                    self.sample[j] = text
 
-    # ---------------- TOPIC MODELING ----------------
-    print("Performing topic modeling...")
-
+def fit_topic_model(texts: list):
+    """(vectorizer, lda) fitted on texts, or None when there is too little text for topics."""
     vectorizer = CountVectorizer(stop_words="english", min_df=2)
     try:
-        X = vectorizer.fit_transform(df["clean_text"])
+        X = vectorizer.fit_transform(texts)
     except Exception as e:
-        print("Topic vectorization failed:", e); X = None
+        print("Topic vectorization failed:", e); return None
+    if X.shape[0] < 3 or len(vectorizer.get_feature_names_out()) < 5:
+        return None
+    n_topics = min(TOPIC_COUNT, X.shape[0])
+    lda = LatentDirichletAllocation(n_components=n_topics, random_state=42)
+    lda.fit(X)
+    return vectorizer, lda
+
+def save_topic_model(topic_model, out_dir: Path) -> None:
+    """Keep the run's topic model next to its CSV so /ingest (ingest.py) assigns the same topics."""
+    path = out_dir / TOPIC_MODEL_FILE
+    if topic_model is None:
+        path.unlink(missing_ok=True)
+        return
+    try:
+        joblib.dump(topic_model, path)
+    except Exception as e:
+        logger.warning("Saving the topic model failed: %s", e)
 
-    if X is None or X.shape[0] < 3 or len(vectorizer.get_feature_names_out()) < 5:
-        df["topic"] = np.nan
-        topic_counts = pd.Series(dtype=int)
-    else:
-        n_topics = min(TOPIC_COUNT, X.shape[0])
-        lda = LatentDirichletAllocation(n_components=n_topics, random_state=42)
-        lda.fit(X)
-        doc_topic = lda.transform(X)
-        df["topic"] = doc_topic.argmax(axis=1)
-        topic_counts = df["topic"].value_counts().sort_index()
-
-    df["dangerous"] = df.apply(lambda r: is_dangerous(r["clean_text"], r["sentiment"]), axis=1)
-    dangerous_tweets = df[df["dangerous"]].copy()
-    print(f"Flagged {len(dangerous_tweets)} potentially dangerous posts.")
-
-    # ---------------- VISUALS ----------------
+def assign_topics(clean_texts, topic_model):
+    if topic_model is None:
+        return pd.array([None] * len(clean_texts), dtype=ANALYSIS_SCHEMA["topic"])
+    vectorizer, lda = topic_model
+    return pd.array(lda.transform(vectorizer.transform(clean_texts)).argmax(axis=1), dtype=ANALYSIS_SCHEMA["topic"])
+
+class ReportSummary:
+    """
+    Everything the PDF/DOCX/plots need, accumulated chunk by chunk: counts plus capped row
+    samples (REPORT_MAX_TABLE_ROWS per table, first rows in input order).
+    """
+
+    def __init__(self, max_rows: int = REPORT_MAX_TABLE_ROWS):
+        self.max_rows = max_rows
+        self.total = 0
+        self.sentiment = {}
+        self.nature = {}
+        self.topics = {}
+        self.subreddits = {}
+        # (clusters, posts in them, largest), from ChunkClassifier.clusters()
+        self.dup_clusters = (0, 0, 0)
+        self.dangerous_total = 0
+        self.dangerous_rows = []
+        self.all_rows = []
+        self.docx_rows = []
+        self.wordcloud_text = []
+        self.wordcloud_chars = 0
+
+    @staticmethod
+    def _count(counter: dict, values) -> None:
+        for v in values:
+            counter[v] = counter.get(v, 0) + 1
+
+    def add(self, df: pd.DataFrame) -> None:
+        """df: pass-2 chunk (CSV strings, plus topic)."""
+        self.total += len(df)
+        self._count(self.sentiment, df["sentiment"])
+        self._count(self.nature, df["nature"])
+        self._count(self.topics, (int(t) for t in df["topic"] if pd.notna(t)))
+        self._count(self.subreddits, df["subreddit"])
+        dangerous = df[df["dangerous"] == "True"]
+        self.dangerous_total += len(dangerous)
+        self.all_rows.extend(self._rows(df, self.max_rows - len(self.all_rows)))
+        self.docx_rows.extend(self._rows(df, DOCX_SAMPLE_ROWS - len(self.docx_rows)))
+        self.dangerous_rows.extend(self._rows(dangerous, self.max_rows - len(self.dangerous_rows)))
+        for text in dangerous["clean_text"]:
+            if self.wordcloud_chars >= WORDCLOUD_MAX_CHARS:
+                break
+            self.wordcloud_text.append(text)
+            self.wordcloud_chars += len(text)
+
+    def rollups(self) -> dict:
+        """Post counts per dimension for the cross-run trend store (trend_store.py)."""
+        return {
+            "posts": self.total,
+            "counts": {
+                "sentiment": dict(self.sentiment),
+                "nature": dict(self.nature),
+                "subreddit": {k: v for k, v in self.subreddits.items() if k},
+                "topic": {str(k): v for k, v in self.topics.items()},
+                "dangerous": {"True": self.dangerous_total, "False": self.total - self.dangerous_total},
+            },
+        }
+
+    @staticmethod
+    def _rows(df: pd.DataFrame, n: int) -> list:
+        """Table cells of the first n rows."""
+        return [{
+            "text": row["text_for_analysis"],
+            "subreddit": row["subreddit"] or "N/A",
+            "username": row["username"] or "N/A",
+            "score": row["score"] or "N/A",
+            "sentiment": row["sentiment"],
+            "nature": row["nature"],
+            "topic": str(int(row["topic"])) if pd.notna(row["topic"]) else "N/A",
+            "date": row["created_at_str"][:16] or "N/A",
+        } for _, row in df.head(max(n, 0)).iterrows()]
+
+    def ordered(self, counter: dict) -> list:
+        # value_counts order: most frequent first
+        return sorted(counter.items(), key=lambda kv: -kv[1])
+
+class FrameMemory:
+    """Largest in-memory size of the analysis frame per stage (deep: string buffers included)."""
+
+    def __init__(self):
+        self.peak = {}
+
+    def record(self, stage: str, df: pd.DataFrame) -> None:
+        size = int(df.memory_usage(deep=True, index=False).sum())
+        self.peak[stage] = max(self.peak.get(stage, 0), size)
+
+    def report(self) -> str:
+        return ", ".join(f"{stage} {size / 1e6:.1f} MB" for stage, size in self.peak.items())
+
+def _write_csv_chunk(df: pd.DataFrame, path: Path, first: bool) -> None:
+    for attempt in range(3):
+        try:
+            # fixed date format: pandas otherwise picks one per frame (fractional seconds or not)
+            df.to_csv(path, index=False, encoding="utf-8", mode="w" if first else "a", header=first,
+                      date_format="%Y-%m-%d %H:%M:%S")
+            return
+        except PermissionError:
+            if attempt < 2:
+                print(f"⚠️ Permission denied saving CSV (file locked?). Retrying {attempt+1}/3 in 1s...")
+                time.sleep(1)
+            else:
+                raise
+
+def render_visuals(summary: ReportSummary, out_dir: Path) -> None:
     try:
         # sentiment plot
-        sent_counts = df["sentiment"].value_counts()
         plt.figure(figsize=(6,4))
-        sent_counts.plot(kind="bar")
+        pd.Series(dict(summary.ordered(summary.sentiment))).plot(kind="bar")
         plt.title("Sentiment Distribution")
         plt.tight_layout()
         plt.savefig(out_dir / "sentiment.png", dpi=150)
         plt.close()
         # topic plot
-        if "topic" in df and df["topic"].notna().any():
-            topic_counts = df["topic"].value_counts().sort_index()
+        if summary.topics:
+            topic_counts = pd.Series(dict(sorted(summary.topics.items())))
             plt.figure(figsize=(6,4))
             topic_counts.plot(kind="bar")
             plt.title("Topic Distribution")
@@ -333,9 +683,8 @@ def generate_reports_from_csv(input_csv:str, out_dir:str) -> dict:
             plt.savefig(out_dir / "topics.png", dpi=150)
             plt.close()
         # danger wordcloud
-        dangerous_df = df[df["dangerous"]]
-        if not dangerous_df.empty:
-            wc_text = " ".join(dangerous_df["clean_text"].tolist())
+        if summary.wordcloud_text:
+            wc_text = " ".join(summary.wordcloud_text)
             wc = WordCloud(width=1000, height=400, background_color="white", stopwords=set(STOPWORDS)).generate(wc_text)
             plt.figure(figsize=(12,5))
             plt.imshow(wc, interpolation="bilinear")
@@ -346,8 +695,11 @@ def generate_reports_from_csv(input_csv:str, out_dir:str) -> dict:
     except Exception as e:
         logger.warning("Visuals generation failed: %s", e)
 
+def _table_note(shown: int, total: int):
+    return f"Showing the first {shown} of {total} posts." if shown < total else None
 
-    # ---------------- BUILD PDF ----------------
+def build_pdf(summary: ReportSummary, out_dir: Path, appendix_rows: int = None) -> Path:
+    """appendix_rows: cap on the "All Collected Posts" table (default: every collected summary row)."""
     print("Building PDF report (LongTable for large tables)...")
     pdf_out= out_dir/"report.pdf"
     styles = getSampleStyleSheet()
@@ -356,36 +708,38 @@ def generate_reports_from_csv(input_csv:str, out_dir:str) -> dict:
     title_style = styles["Title"]
     tweet_paragraph_style = ParagraphStyle("TweetStyle", parent=styles["BodyText"], fontSize=9, leading=11, spaceAfter=6, alignment=TA_LEFT)
 
-    doc = SimpleDocTemplate(pdf_out, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
     elements = []
     elements.append(Paragraph("Reddit Posts Report (CSV Source) — India-specific Nature", title_style))
     elements.append(Spacer(1, 8))
-    elements.append(Paragraph(f"Total Posts Processed: {len(df)}", styleN))
+    elements.append(Paragraph(f"Total Posts Processed: {summary.total}", styleN))
+    clusters, clustered, largest = summary.dup_clusters
+    if clusters:
+        elements.append(Paragraph(f"Near-duplicate clusters: {clusters} "
+                                  f"({clustered} posts, largest {largest})", styleN))
     elements.append(Spacer(1, 8))
 
     # Sentiment summary
     elements.append(Paragraph("Sentiment Analysis Summary", styleH))
-    total = len(df)
-    for label, count in sent_counts.items():
+    total = summary.total
+    for label, count in summary.ordered(summary.sentiment):
         pct = count / total * 100 if total > 0 else 0
         elements.append(Paragraph(f"{label}: {count} posts ({pct:.1f}%)", styleN))
     elements.append(Spacer(1, 6))
-    if os.path.exists("sentiment.png"):
-        elements.append(Image("sentiment.png", width=5.5*inch, height=3*inch))
+    if (out_dir / "sentiment.png").exists():
+        elements.append(Image(str(out_dir / "sentiment.png"), width=5.5*inch, height=3*inch))
     elements.append(Spacer(1, 12))
 
     # Topic & Nature summary
-    if not topic_counts.empty:
+    if summary.topics:
         elements.append(Paragraph("Topic Modeling Summary", styleH))
-        for idx, val in topic_counts.items():
+        for idx, val in sorted(summary.topics.items()):
             elements.append(Paragraph(f"Topic {int(idx)}: {int(val)} posts", styleN))
         elements.append(Spacer(1, 6))
-        if os.path.exists("topics.png"): elements.append(Image("topics.png", width=5.5*inch, height=3*inch))
+        if (out_dir / "topics.png").exists(): elements.append(Image(str(out_dir / "topics.png"), width=5.5*inch, height=3*inch))
         elements.append(Spacer(1, 12))
 
     elements.append(Paragraph("Nature (India-specific) Summary", styleH))
-    nature_counts = df["nature"].value_counts()
-    for label, count in nature_counts.items():
+    for label, count in summary.ordered(summary.nature):
         pct = count / total * 100 if total > 0 else 0
         elements.append(Paragraph(f"{label}: {count} posts ({pct:.1f}%)", styleN))
     elements.append(Spacer(1, 12))
@@ -393,22 +747,24 @@ def generate_reports_from_csv(input_csv:str, out_dir:str) -> dict:
     # Dangerous posts table (LongTable)
     elements.append(Paragraph("Flagged Potentially Dangerous Posts", styleH))
     elements.append(Spacer(1, 6))
-    if dangerous_tweets.empty:
+    if not summary.dangerous_rows:
         elements.append(Paragraph("No dangerous posts detected.", styleN))
     else:
+        note = _table_note(len(summary.dangerous_rows), summary.dangerous_total)
+        if note:
+            elements.append(Paragraph(note, styleN))
         # prepare LongTable data (header + rows)
         header = ["Post (teaser)", "Subreddit", "Author", "Sentiment", "Nature", "Topic", "Date"]
         lt_data = [header]
-        for _, row in dangerous_tweets.iterrows():
-            date_str = row["created_at"].strftime("%Y-%m-%d %H:%M") if pd.notna(row["created_at"]) else "N/A"
+        for row in summary.dangerous_rows:
             lt_data.append([
-                Paragraph(teaser(row["text_for_analysis"], TEASER_CHAR_LIMIT), tweet_paragraph_style),
-                row["subreddit"] if pd.notna(row["subreddit"]) else "N/A",
-                row["username"] if pd.notna(row["username"]) else "N/A",
+                Paragraph(teaser(row["text"], TEASER_CHAR_LIMIT), tweet_paragraph_style),
+                row["subreddit"],
+                row["username"],
                 row["sentiment"],
                 row["nature"],
-                str(int(row["topic"])) if not pd.isna(row["topic"]) else "N/A",
-                date_str
+                row["topic"],
+                row["date"]
             ])
         col_widths = [3.0*inch, 0.7*inch, 0.8*inch, 0.6*inch, 0.8*inch, 0.5*inch, 1.0*inch]
         lt = LongTable(lt_data, colWidths=col_widths, repeatRows=1)
@@ -427,24 +783,27 @@ def generate_reports_from_csv(input_csv:str, out_dir:str) -> dict:
         lt.setStyle(lt_style)
         elements.append(lt)
         elements.append(Spacer(1, 12))
-        if os.path.exists("danger_wc.png"):
-            elements.append(Paragraph("Word Cloud of Flagged Posts", styleH)); elements.append(Image("danger_wc.png", width=5.5*inch, height=2.6*inch))
+        if (out_dir / "danger_wc.png").exists():
+            elements.append(Paragraph("Word Cloud of Flagged Posts", styleH)); elements.append(Image(str(out_dir / "danger_wc.png"), width=5.5*inch, height=2.6*inch))
 
     elements.append(PageBreak())
 
-    # All collected posts (LongTable) - include full dataset but use teaser to avoid huge cells
+    # All collected posts (LongTable) - use teaser to avoid huge cells
     elements.append(Paragraph("All Collected Posts", styles['Heading2']))
+    appendix = summary.all_rows[:appendix_rows]
+    note = _table_note(len(appendix), summary.total)
+    if note:
+        elements.append(Paragraph(note, styleN))
     all_header = ["Date", "Subreddit", "Author", "Score", "Nature", "Post (teaser)"]
     all_lt_data = [all_header]
-    for idx, row in df.iterrows():
-        date_str = row["created_at"].strftime("%Y-%m-%d %H:%M") if pd.notna(row["created_at"]) else "N/A"
+    for row in appendix:
         all_lt_data.append([
-            date_str,
-            row["subreddit"] if pd.notna(row["subreddit"]) else "N/A",
-            row["username"] if pd.notna(row["username"]) else "N/A",
-            str(row["score"]) if not pd.isna(row["score"]) else "N/A",
+            row["date"],
+            row["subreddit"],
+            row["username"],
+            row["score"],
             row["nature"],
-            Paragraph(teaser(row["text_for_analysis"], TEASER_CHAR_LIMIT), tweet_paragraph_style)
+            Paragraph(teaser(row["text"], TEASER_CHAR_LIMIT), tweet_paragraph_style)
         ])
 
     all_col_widths = [1.0*inch, 1.0*inch, 1.0*inch, 0.7*inch, 0.9*inch, 2.8*inch]
@@ -464,79 +823,158 @@ def generate_reports_from_csv(input_csv:str, out_dir:str) -> dict:
     doc = SimpleDocTemplate(str(pdf_out))
     doc.build(elements)
     print("✅ PDF saved as:", pdf_out)
+    return pdf_out
 
-    # ---------------- SAVE CSV (full enriched) ----------------
-    csv_out = out_dir/"analysis_output.csv"
-    df_out = df.copy()
-    df_out["created_at_str"] = df_out["created_at"].apply(lambda x: x.strftime("%Y-%m-%d %H:%M:%S") if pd.notna(x) else "")
-    
-    import time
-    for attempt in range(3):
-        try:
-            df_out.to_csv(csv_out, index=False, encoding="utf-8")
-            print("✅ Enriched CSV saved as:", csv_out)
-            break
-        except PermissionError:
-            if attempt < 2:
-                print(f"⚠️ Permission denied saving CSV (file locked?). Retrying {attempt+1}/3 in 1s...")
-                time.sleep(1)
-            else:
-                print("❌ FAILED to save CSV. The file is likely open in another program (Excel/VS Code).")
-                # We don't raise here to allow PDF generation/return to complete, 
-                # but the CSV won't be updated.
+def build_docx(summary: ReportSummary, out_dir: Path) -> str:
+    """Returns the DOCX path, or "" when python-docx is missing or the export failed."""
+    if not DOCX_AVAILABLE:
+        print("python-docx not installed — skipping DOCX export. Install via: pip install python-docx")
+        return ""
+    DOCX_OUTPUT= out_dir/"report.docx"
+    try:
+        print("Building DOCX report...")
+        docx = Document()
+        docx.add_heading("Reddit Posts Report (India-specific Nature)", level=1)
+        docx.add_paragraph(f"Total Posts Processed: {summary.total}")
+        docx.add_heading("Sentiment Analysis Summary", level=2)
+        total = summary.total
+        for label, count in summary.ordered(summary.sentiment):
+            pct = count / total * 100 if total > 0 else 0
+            docx.add_paragraph(f"{label}: {count} posts ({pct:.1f}%)")
+
+        docx.add_heading("Nature Summary", level=2)
+        for label, count in summary.ordered(summary.nature):
+            pct = count / total * 100 if total > 0 else 0
+            docx.add_paragraph(f"{label}: {count} posts ({pct:.1f}%)")
+
+        # add small sample table (first DOCX_SAMPLE_ROWS rows or less)
+        sample_n = len(summary.docx_rows)
+        docx.add_heading(f"Sample of First {sample_n} Posts", level=2)
+        table = docx.add_table(rows=1, cols=6)
+        hdr_cells = table.rows[0].cells
+        hdr_cells[0].text = "Date"
+        hdr_cells[1].text = "Subreddit"
+        hdr_cells[2].text = "Author"
+        hdr_cells[3].text = "Score"
+        hdr_cells[4].text = "Nature"
+        hdr_cells[5].text = "Post (teaser)"
+        for row in summary.docx_rows:
+            row_cells = table.add_row().cells
+            row_cells[0].text = row["date"]
+            row_cells[1].text = row["subreddit"]
+            row_cells[2].text = row["username"]
+            row_cells[3].text = row["score"]
+            row_cells[4].text = str(row["nature"])
+            row_cells[5].text = teaser(row["text"], 300)
+
+        docx.save(DOCX_OUTPUT)
+        print("✅ DOCX saved as:", DOCX_OUTPUT)
+        return str(DOCX_OUTPUT)
+    except Exception as e:
+        logger.exception("DOCX creation failed: %s", e)
+        if DOCX_OUTPUT.exists():
+            try:
+                DOCX_OUTPUT.unlink(missing_ok=True)
+            except Exception:
+                pass
+        return ""
+
+def _count_rows(input_csv: str) -> int:
+    with open(input_csv, "r", encoding=CSV_ENCODING, newline="") as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+def generate_reports_from_csv(input_csv:str, out_dir:str, precomputed:dict=None, on_classified=None,
+                              budget=None) -> dict:
+    """
+    Runs full analysis pipeline. Returns dict: {'pdf':..., 'csv':..., 'docx':..., 'rollups':...}
+    rollups: post counts per sentiment / nature / subreddit / topic / dangerous (trend_store.py)
+    precomputed: optional {reference: (clean_text, label, score, features, stage, embedding)} from pipeline.py
+    on_classified: optional callback(features, embeddings) called once per chunk with
+      features   {'post_ids', 'features' (N x 13), 'labels', 'stages'} for the posts classified in
+                 this pass (near-duplicates that only inherited a label are left out), see feature_store
+      embeddings {'embeddings' (N x dim), 'posts'} for every post, near-duplicates sharing their
+                 representative's embedding, see embedding_store
+    budget: optional run_budget.RunBudget; classification and the reports degrade to fit it
+      (the steps taken are in budget.degradations)
+    Raises FileNotFoundError / ValueError for a missing or unreadable input CSV.
+    """
+    logger.info("Running processing pipeline on %s",input_csv)
+    out_dir= Path(out_dir)
+    out_dir.mkdir(parents=True,exist_ok=True)
+
+    # ---------------- READ CSV ----------------
+    if not os.path.exists(input_csv):
+        raise FileNotFoundError(f"CSV file not found: {input_csv}")
 
+    print("Loading CSV:", input_csv)
+    try:
+        ref_ts = pd.to_datetime(os.path.getmtime(input_csv), unit='s')
+    except Exception:
+        ref_ts = pd.Timestamp.now()
 
+    # ---------------- PASS 1: CLASSIFY + ANNOTATE (per chunk) ----------------
+    spill = out_dir / "analysis_output.partial.csv"
+    total_rows = _count_rows(input_csv) if budget else 0
+    if MAX_ROWS:
+        total_rows = min(total_rows, MAX_ROWS)
+    classifier = ChunkClassifier(precomputed, budget, total_rows)
+    topic_sample = TextReservoir(TOPIC_SAMPLE_ROWS)
+    memory = FrameMemory()
+    try:
+        chunks = read_input_chunks(input_csv)
+        for n_chunk, df_raw in enumerate(chunks):
+            if n_chunk == 0 and not any(c in df_raw.columns for c in TEXT_COLUMNS):
+                raise ValueError(f"No text column detected. CSV columns: {list(df_raw.columns)}")
+            memory.record("read", df_raw)
+            df = normalize_chunk(df_raw, ref_ts)
+            del df_raw
+            memory.record("normalize", df)
+            features, embeddings = classifier.classify_chunk(df)
+            if on_classified is not None:
+                on_classified(features, embeddings)
+            memory.record("classify", df)
+            df = annotate_chunk(df)
+            memory.record("annotate", df)
+            topic_sample.add(df["clean_text"])
+            df["created_at_str"] = df["created_at"].apply(lambda x: x.strftime("%Y-%m-%d %H:%M:%S") if pd.notna(x) else "")
+            _write_csv_chunk(df, spill, first=(n_chunk == 0))
+            del df
+    except Exception as e:
+        if isinstance(e, (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError)):
+            raise ValueError(f"Error reading CSV: {e}") from e
+        raise
+    print(f"Classified {classifier.classified} posts, reused {classifier.reused} precomputed predictions, "
+          f"propagated labels to {classifier.propagated} near-duplicates ({classifier.groups} groups).")
+
+    # ---------------- TOPIC MODELING (bounded sample) ----------------
+    print(f"Performing topic modeling on {len(topic_sample.sample)} of {topic_sample.seen} posts...")
+    topic_model = fit_topic_model(topic_sample.sample)
+    del topic_sample
+    save_topic_model(topic_model, out_dir)
+
+    # ---------------- PASS 2: TOPICS + SUMMARY -> analysis_output.csv ----------------
+    csv_out = out_dir/"analysis_output.csv"
+    summary = ReportSummary()
+    summary.dup_clusters = classifier.clusters()
+    if spill.exists():
+        # every column as the exact string pass 1 wrote, so the output matches a single-frame write
+        spilled = pd.read_csv(spill, dtype=SPILL_SCHEMA, keep_default_na=False, encoding="utf-8",
+                              chunksize=CHUNK_ROWS or None)
+        for n_chunk, df in enumerate(spilled if CHUNK_ROWS else [spilled]):
+            df.insert(df.columns.get_loc("dangerous"), "topic", assign_topics(df["clean_text"], topic_model))
+            memory.record("output", df)
+            summary.add(df)
+            _write_csv_chunk(df, csv_out, first=(n_chunk == 0))
+            del df
+        spill.unlink(missing_ok=True)
+        print("✅ Enriched CSV saved as:", csv_out)
+    print(f"Flagged {summary.dangerous_total} potentially dangerous posts.")
+    logger.info("Analysis frame memory (largest chunk per stage): %s", memory.report())
+
+    # ---------------- VISUALS / REPORTS ----------------
+    render_visuals(summary, out_dir)
+    pdf_out = build_pdf(summary, out_dir, budget.appendix_rows(len(summary.all_rows)) if budget else None)
+    docx_out = build_docx(summary, out_dir) if budget is None or budget.allow_docx() else ""
 
-    # ---------------- DOCX EXPORT (optional) ----------------
-    if not DOCX_AVAILABLE:
-        print("python-docx not installed — skipping DOCX export. Install via: pip install python-docx")
-    else:
-        try:
-            print("Building DOCX report...")
-            DOCX_OUTPUT= out_dir/"report.docx"
-            docx = Document()
-            docx.add_heading("Reddit Posts Report (India-specific Nature)", level=1)
-            docx.add_paragraph(f"Total Posts Processed: {len(df)}")
-            docx.add_heading("Sentiment Analysis Summary", level=2)
-            for label, count in sent_counts.items():
-                pct = count / total * 100 if total > 0 else 0
-                docx.add_paragraph(f"{label}: {count} posts ({pct:.1f}%)")
-
-            docx.add_heading("Nature Summary", level=2)
-            for label, count in nature_counts.items():
-                pct = count / total * 100 if total > 0 else 0
-                docx.add_paragraph(f"{label}: {count} posts ({pct:.1f}%)")
-
-            # add small sample table (first 200 rows or less)
-            sample_n = min(200, len(df))
-            docx.add_heading(f"Sample of First {sample_n} Posts", level=2)
-            table = docx.add_table(rows=1, cols=6)
-            hdr_cells = table.rows[0].cells
-            hdr_cells[0].text = "Date"
-            hdr_cells[1].text = "Subreddit"
-            hdr_cells[2].text = "Author"
-            hdr_cells[3].text = "Score"
-            hdr_cells[4].text = "Nature"
-            hdr_cells[5].text = "Post (teaser)"
-            for idx, row in df.head(sample_n).iterrows():
-                row_cells = table.add_row().cells
-                date_str = row["created_at"].strftime("%Y-%m-%d %H:%M") if pd.notna(row["created_at"]) else "N/A"
-                row_cells[0].text = date_str
-                row_cells[1].text = str(row["subreddit"]) if pd.notna(row["subreddit"]) else "N/A"
-                row_cells[2].text = str(row["username"]) if pd.notna(row["username"]) else "N/A"
-                row_cells[3].text = str(row["score"]) if not pd.isna(row["score"]) else "N/A"
-                row_cells[4].text = str(row["nature"])
-                row_cells[5].text = teaser(row["text_for_analysis"], 300)
-
-            docx.save(DOCX_OUTPUT)
-            print("✅ DOCX saved as:", DOCX_OUTPUT)
-        except Exception as e:
-            logger.exception("DOCX creation failed: %s", e)
-            if DOCX_OUTPUT.exists():
-                try:
-                    DOCX_OUTPUT.unlink(missing_ok=True)
-                except Exception:
-                    pass
     logger.info("Processor: finished, files at %s", out_dir)
-    return {"pdf": str(pdf_out), "csv": str(csv_out), "docx": str(DOCX_OUTPUT) if DOCX_OUTPUT.exists() else ""}
-    
+    return {"pdf": str(pdf_out), "csv": str(csv_out), "docx": docx_out, "rollups": summary.rollups()}
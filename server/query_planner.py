@@ -0,0 +1,156 @@
+"""
+Query planner for reddit_scrapper.
+Turns the flat political_queries list into fewer r/all searches:
+  1. subsumption: Reddit ANDs the words of a query, so "india farmers protest" only returns a
+     subset of "india protest"; such queries are folded into the broader one
+  2. packing: the remaining queries are OR-ed together ("(a b) OR (c d) ...") up to
+     MAX_QUERY_CHARS / MAX_CLAUSES per search
+  3. budgets: each group gets the per-query budget of its members, scaled by the members'
+     historical yield (useful rows / fetched rows, persisted in storage/query_stats.json)
+  4. ordering: groups with the best expected yield go first so total_limit fills with useful posts;
+     members that keep yielding nothing are merged into one trailing low-budget group
+Expose: QueryPlanner().plan(queries, per_query_limit) -> List[PlannedQuery], .observe(...), .save()
+"""
+
+import os,json,logging,threading
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+logger = logging.getLogger("query_planner")
+
+STATS_PATH = Path(__file__).resolve().parent / "storage" / "query_stats.json"
+# Reddit rejects search queries over 512 characters
+MAX_QUERY_CHARS = 512
+MAX_CLAUSES = int(os.environ.get("PLANNER_MAX_CLAUSES", 6))
+# one search call returns at most 100 posts; groups may page a few times
+MAX_GROUP_LIMIT = int(os.environ.get("PLANNER_MAX_GROUP_LIMIT", 300))
+LOW_YIELD = float(os.environ.get("PLANNER_LOW_YIELD", 0.05))
+MIN_RUNS_FOR_YIELD = 2
+# exponential moving average weight of the newest run
+EMA_ALPHA = 0.5
+
+@dataclass
+class PlannedQuery:
+    expression: str               # what is sent to Reddit
+    limit: int                    # posts to request for this search
+    members: List[str]            # original political_queries covered
+    keywords: List[str] = field(default_factory=list)   # relevance filter, union of members' words
+
+def _terms(query: str) -> List[str]:
+    return [t.lower() for t in query.split() if t.strip()]
+
+def _clause(query: str) -> str:
+    return f"({query})"
+
+class QueryPlanner:
+    def __init__(self, stats_path: Path = STATS_PATH):
+        self.stats_path = Path(stats_path)
+        self.stats: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        try:
+            with open(self.stats_path, "r", encoding="utf-8") as f:
+                self.stats = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Ignoring unreadable planner stats %s: %s", self.stats_path, e)
+
+    # ---- yield bookkeeping ----
+    def query_yield(self, query: str):
+        s = self.stats.get(query)
+        if not s or s.get("runs", 0) < MIN_RUNS_FOR_YIELD:
+            return None
+        return s.get("yield", 0.0)
+
+    def observe(self, planned: PlannedQuery, fetched: int, kept_payloads: List[dict]) -> None:
+        """Record one executed search: fetched rows and the rows that survived dedup + relevance."""
+        with self._lock:
+            # split each useful row between the members whose keywords it matches, so member
+            # yields add up to the group's kept/fetched ratio
+            useful = {m: 0.0 for m in planned.members}
+            for p in kept_payloads:
+                text = f"{p.get('title', '')} {p.get('selftext', '')}".lower()
+                matched = [m for m in planned.members if any(kw in text for kw in _terms(m))] or planned.members
+                for m in matched:
+                    useful[m] += 1 / len(matched)
+            share = fetched / max(len(planned.members), 1)
+            for m in planned.members:
+                s = self.stats.setdefault(m, {"runs": 0, "yield": 0.0, "fetched": 0, "useful": 0})
+                run_yield = useful[m] / share if share else 0.0
+                s["yield"] = run_yield if s["runs"] == 0 else (1 - EMA_ALPHA) * s["yield"] + EMA_ALPHA * run_yield
+                s["runs"] += 1
+                s["fetched"] += int(share)
+                s["useful"] = round(s["useful"] + useful[m], 2)
+
+    def save(self) -> None:
+        with self._lock:
+            self.stats_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.stats_path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.stats, f, indent=1)
+            os.replace(tmp, self.stats_path)
+
+    # ---- planning ----
+    def _weight(self, query: str, mean_yield: float) -> float:
+        y = self.query_yield(query)
+        if y is None or mean_yield <= 0:
+            return 1.0
+        return min(max(y / mean_yield, 0.25), 2.0)
+
+    def plan(self, queries: List[str], per_query_limit: int) -> List[PlannedQuery]:
+        # 1. subsumption: fold queries whose words are a superset of a broader query's words
+        term_sets = {q: frozenset(_terms(q)) for q in queries}
+        roots: Dict[str, List[str]] = {}
+        for q in sorted(queries, key=lambda q: len(term_sets[q])):
+            parent = next((r for r in roots if term_sets[r] <= term_sets[q]), None)
+            if parent is None:
+                roots[q] = [q]
+            else:
+                roots[parent].append(q)
+
+        known = [y for y in (self.query_yield(q) for q in queries) if y is not None]
+        mean_yield = sum(known) / len(known) if known else 0.0
+
+        # members that consistently yield nothing are merged into one trailing group
+        low = [r for r in roots if (self.query_yield(r) is not None and self.query_yield(r) < LOW_YIELD)]
+        normal = [r for r in roots if r not in low]
+        # keep roots that share a distinctive word ("kashmir ...", "boycott ...") in the same search;
+        # words most queries contain ("india") say nothing about relatedness
+        counts: Dict[str, int] = {}
+        for r in roots:
+            for t in term_sets[r]:
+                counts[t] = counts.get(t, 0) + 1
+        common = {t for t, c in counts.items() if c > len(roots) / 2}
+        normal.sort(key=lambda r: sorted(term_sets[r] - common, key=lambda t: (-counts[t], t)) or [r])
+
+        plans: List[PlannedQuery] = []
+        def pack(root_list: List[str], budget_scale: float):
+            current: List[str] = []
+            def flush():
+                if not current:
+                    return
+                members = [m for r in current for m in roots[r]]
+                budget = sum(per_query_limit * self._weight(m, mean_yield) for m in members) * budget_scale
+                expression = current[0] if len(current) == 1 else " OR ".join(_clause(r) for r in current)
+                keywords = sorted({t for m in members for t in _terms(m)})
+                plans.append(PlannedQuery(expression, max(1, min(int(budget), MAX_GROUP_LIMIT)), members, keywords))
+                current.clear()
+            for r in root_list:
+                candidate = " OR ".join(_clause(x) for x in current + [r])
+                if current and (len(current) >= MAX_CLAUSES or len(candidate) > MAX_QUERY_CHARS):
+                    flush()
+                current.append(r)
+            flush()
+
+        def expected_yield(p: PlannedQuery) -> float:
+            ys = [self.query_yield(m) for m in p.members]
+            return sum(y if y is not None else (mean_yield or 1.0) for y in ys) / len(ys)
+
+        pack(normal, 1.0)
+        # best expected yield first so total_limit is spent on productive searches
+        plans.sort(key=expected_yield, reverse=True)
+        pack(low, 0.25)
+
+        logger.info("Planned %d searches for %d queries", len(plans), len(queries))
+        return plans
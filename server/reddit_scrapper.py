@@ -1,9 +1,13 @@
 import os
 import csv
+import gzip
+import json
 import time
 import logging
+import threading
 from pathlib import Path
 from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 from typing import Iterable, List, Optional
 from dotenv import load_dotenv
 
@@ -11,6 +15,8 @@ import praw
 import prawcore
 import pytz
 
+from query_planner import PlannedQuery, QueryPlanner
+
 logger = logging.getLogger("reddit_scraper")
 logger.setLevel(logging.INFO)
 
@@ -59,24 +65,461 @@ def _format_time(created_utc: Optional[float]) -> str:
     dt = datetime.fromtimestamp(created_utc, tz=timezone.utc)
     return dt.strftime("%Y-%m-%d %H:%M:%S")
 
+CSV_HEADER = ["Title", "Reference", "Score", "Comments", "Time", "Author", "Subreddit", "Description", "Url"]
+
+# ---- Submission payloads ----
+# Both fetch paths (PRAW objects, raw JSON listings) are normalised to the same flat dict
+# so filtering and CSV writing are shared.
+def _submission_payload(sub) -> dict:
+    """Flatten a PRAW Submission into the fields the CSV needs."""
+    return {
+        "id": getattr(sub, "id", None),
+        "title": getattr(sub, "title", "") or "",
+        "score": getattr(sub, "score", 0) or 0,
+        "num_comments": getattr(sub, "num_comments", 0) or 0,
+        "created_utc": getattr(sub, "created_utc", None),
+        "author": getattr(sub.author, "name", "deleted") if getattr(sub, "author", None) else "deleted",
+        "subreddit": getattr(sub.subreddit, "display_name", "") or "",
+        "selftext": getattr(sub, "selftext", "") or "",
+        "url": getattr(sub, "url", "") or "",
+    }
+
+def _listing_payload(data: dict) -> dict:
+    """Flatten the 'data' of a t3 child from Reddit's JSON search listing."""
+    return {
+        "id": data.get("id"),
+        "title": data.get("title") or "",
+        "score": data.get("score") or 0,
+        "num_comments": data.get("num_comments") or 0,
+        "created_utc": data.get("created_utc"),
+        "author": data.get("author") or "deleted",
+        "subreddit": data.get("subreddit") or "",
+        "selftext": data.get("selftext") or "",
+        "url": data.get("url") or "",
+    }
+
+def _praw_payloads(submissions):
+    for sub in submissions:
+        try:
+            yield _submission_payload(sub)
+        except Exception as e:
+            # don't stop the whole scraper for one failing submission
+            logger.exception("Failed to process submission %s: %s", getattr(sub, "id", "<no-id>"), e)
+
+def _payload_row(payload: dict) -> list:
+    return [payload["title"], payload["id"], payload["score"], payload["num_comments"],
+            _format_time(payload["created_utc"]), payload["author"], payload["subreddit"],
+            payload["selftext"], payload["url"]]
+
+def _query_keywords(query: str) -> List[str]:
+    return [kw.lower() for kw in query.split() if kw.strip()]
+
+def _is_relevant(payload: dict, keywords: List[str]) -> bool:
+    # replicate the original filtering: ensure query keywords appear in title or description
+    text_for_check = f"{payload['title']} {payload['selftext']}".lower()
+    return not keywords or any(kw in text_for_check for kw in keywords)
+
+def _single_query_plan(per_query_limit: int) -> List[PlannedQuery]:
+    """One search per political query, as the scraper always did."""
+    return [PlannedQuery(q, per_query_limit, [q], _query_keywords(q)) for q in political_queries]
+
+def _write_query_results(writer, keywords, payloads, seen_ids, written, total_limit, on_row=None, tally=None) -> int:
+    # tally: optional dict collecting "fetched" (payloads looked at) and "kept" (payloads written)
+    for payload in payloads:
+        if written >= total_limit:
+            break
+        if tally is not None:
+            tally["fetched"] = tally.get("fetched", 0) + 1
+        try:
+            sid = payload.get("id")
+            if not sid:
+                continue
+            if sid in seen_ids:
+                continue
+            seen_ids.add(sid)
+            if not _is_relevant(payload, keywords):
+                # skip items that don't appear relevant
+                continue
+            row = _payload_row(payload)
+            writer.writerow(row)
+            written += 1
+            if tally is not None:
+                tally.setdefault("kept", []).append(payload)
+            if on_row is not None:
+                # streaming consumers (pipeline.py) see each row as soon as it is written
+                on_row(row)
+        except Exception as e:
+            # don't stop the whole scraper for one failing submission
+            logger.exception("Failed to process submission %s: %s", payload.get("id", "<no-id>"), e)
+            continue
+    return written
+
+# ---- Rate limiting ----
+class TokenBucket:
+    """
+    Thread-safe token bucket driven by Reddit's rate-limit headers.
+    Reddit reports X-Ratelimit-Remaining requests until the window resets in X-Ratelimit-Reset
+    seconds. After every response the bucket is resynced to that remaining budget (minus requests
+    still in flight), so workers can burst through whatever the server still allows and only get
+    paced (remaining/reset per second) once the budget runs low; an exhausted budget blocks
+    everyone until the reset instead of producing 429s.
+    """
+
+    def __init__(self, rate: float = 1.0, capacity: float = 5.0):
+        self.rate = rate            # tokens per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.in_flight = 0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    self._cond.wait(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+                self._cond.wait((1 - self.tokens) / self.rate if self.rate > 0 else 1.0)
+
+    def release(self) -> None:
+        """Call instead of update_from_headers when an acquired request never got a response."""
+        with self._cond:
+            self.in_flight = max(self.in_flight - 1, 0)
+            self._cond.notify_all()
+
+    def update_from_headers(self, headers) -> None:
+        """Call once per completed request. headers: mapping with lower-case keys."""
+        with self._cond:
+            self.in_flight = max(self.in_flight - 1, 0)
+            try:
+                remaining = float(headers.get("x-ratelimit-remaining"))
+                reset = float(headers.get("x-ratelimit-reset"))
+            except (TypeError, ValueError):
+                return
+            now = time.monotonic()
+            self.updated = now
+            if remaining < 1:
+                # budget exhausted: nobody sends until the window resets
+                self.blocked_until = now + reset
+                self.tokens = 0
+            else:
+                self.rate = remaining / max(reset, 1.0)
+                self.capacity = remaining
+                self.tokens = max(remaining - self.in_flight, 0)
+            self._cond.notify_all()
+
+    def block_for(self, seconds: float) -> None:
+        with self._cond:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+# ---- Concurrent HTTP fetcher ----
+REDDIT_AUTH_URL = os.environ.get("REDDIT_AUTH_URL", "https://www.reddit.com/api/v1/access_token")
+REDDIT_API_BASE = os.environ.get("REDDIT_API_BASE", "https://oauth.reddit.com")
+REDDIT_MAX_WORKERS = int(os.environ.get("REDDIT_MAX_WORKERS", 4))
+# Reddit search returns at most 100 items per page
+PAGE_LIMIT = 100
+
+class RedditSearchFetcher:
+    """
+    Minimal app-only OAuth client for r/all search that exposes the rate-limit headers PRAW hides.
+    http_client: anything with the requests.Session interface (get/post returning objects with
+    status_code, headers, json()); point REDDIT_API_BASE/REDDIT_AUTH_URL at a local fake server
+    (benchmarks/fake_reddit.py) to test without credentials.
+    """
+
+    def __init__(self, http_client=None, limiter: Optional[TokenBucket] = None,
+                 api_base: Optional[str] = None, auth_url: Optional[str] = None,
+                 max_retries: int = 3, timeout: float = 30):
+        if http_client is None:
+            import requests
+            http_client = requests.Session()
+        self.http = http_client
+        self.limiter = limiter or TokenBucket()
+        self.api_base = (api_base or REDDIT_API_BASE).rstrip("/")
+        self.auth_url = auth_url or REDDIT_AUTH_URL
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.user_agent = os.environ.get("REDDIT_USER_AGENT", "reddit_scraper:v1.0")
+        self.requests_made = 0
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = threading.Lock()
+
+    def _access_token(self) -> str:
+        with self._token_lock:
+            if self._token and time.time() < self._token_expires - 60:
+                return self._token
+            client_id = os.environ.get("REDDIT_CLIENT_ID")
+            client_secret = os.environ.get("REDDIT_CLIENT_SECRET")
+            if not client_id or not client_secret:
+                logger.error("Missing REDDIT_CLIENT_ID or REDDIT_CLIENT_SECRET env vars")
+                raise EnvironmentError(
+                    "REDDIT_CLIENT_ID and REDDIT_CLIENT_SECRET must be set as environment variables."
+                )
+            resp = self.http.post(self.auth_url, data={"grant_type": "client_credentials"},
+                                  auth=(client_id, client_secret),
+                                  headers={"User-Agent": self.user_agent}, timeout=self.timeout)
+            if resp.status_code != 200:
+                raise RuntimeError(f"Reddit token request failed: HTTP {resp.status_code}")
+            body = resp.json()
+            self._token = body["access_token"]
+            self._token_expires = time.time() + float(body.get("expires_in", 3600))
+            return self._token
+
+    def _get(self, path: str, params: dict) -> dict:
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                headers = {"Authorization": f"bearer {self._access_token()}", "User-Agent": self.user_agent}
+                resp = self.http.get(f"{self.api_base}{path}", params=params, headers=headers, timeout=self.timeout)
+            except BaseException:
+                # no response to resync from, but the request is no longer in flight
+                self.limiter.release()
+                raise
+            self.requests_made += 1
+            resp_headers = {k.lower(): v for k, v in resp.headers.items()}
+            self.limiter.update_from_headers(resp_headers)
+            if resp.status_code == 200:
+                return resp.json()
+            if resp.status_code == 401:
+                # token expired early, force refresh
+                self._token = None
+            elif resp.status_code == 429 or resp.status_code >= 500:
+                wait = resp_headers.get("retry-after") or resp_headers.get("x-ratelimit-reset") or 2 ** attempt
+                logger.warning("Reddit HTTP %s, backing off %ss", resp.status_code, wait)
+                self.limiter.block_for(float(wait))
+            else:
+                raise RuntimeError(f"Reddit search failed: HTTP {resp.status_code}")
+        raise RuntimeError(f"Reddit search failed after {self.max_retries + 1} attempts")
+
+    def search(self, query: str, limit: int) -> List[dict]:
+        """Payloads for one r/all query (sort=new), following 'after' pagination up to limit."""
+        payloads: List[dict] = []
+        after = None
+        while len(payloads) < limit:
+            params = {"q": query, "sort": "new", "limit": min(PAGE_LIMIT, limit - len(payloads)),
+                      "type": "link", "raw_json": 1}
+            if after:
+                params["after"] = after
+            listing = self._get("/r/all/search", params).get("data", {})
+            children = listing.get("children", [])
+            payloads.extend(_listing_payload(c.get("data", {})) for c in children if c.get("kind", "t3") == "t3")
+            after = listing.get("after")
+            if not children or not after:
+                break
+        return payloads[:limit]
+
+# ---- Record / replay ----
+# Recording saves the submission payloads each query returned (gzipped JSONL, one line per query)
+# so a scrape can be replayed through the same filtering + CSV writing without network/credentials.
+DEFAULT_RECORDING_PATH = Path(__file__).resolve().parent / "data" / "raw" / "reddit_posts.jsonl.gz"
+
+class ScrapeRecorder:
+    def __init__(self, path, **meta):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = gzip.open(self.path, "wt", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.queries = 0
+        self._write({"meta": {"recorded_at": time.time(), **meta}})
+
+    def _write(self, obj: dict) -> None:
+        with self._lock:
+            self._fh.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+    def record(self, query: str, payloads: List[dict], keywords: Optional[List[str]] = None) -> None:
+        self._write({"query": query, "keywords": keywords if keywords is not None else _query_keywords(query),
+                     "payloads": payloads})
+        self.queries += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._fh.close()
+        logger.info("Recorded %d queries to %s", self.queries, self.path)
+
+class RecordingFetcher:
+    """Wraps a fetcher (anything with search(query, limit)) and records every result set."""
+
+    def __init__(self, inner, recorder: ScrapeRecorder):
+        self.inner = inner
+        self.recorder = recorder
+
+    @property
+    def requests_made(self) -> int:
+        return self.inner.requests_made
+
+    def search(self, query: str, limit: int, keywords: Optional[List[str]] = None) -> List[dict]:
+        payloads = self.inner.search(query, limit)
+        self.recorder.record(query, payloads, keywords)
+        return payloads
+
+class ReplaySource:
+    """Fetcher stand-in serving payloads from a recording; no network, fully deterministic."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.meta = {}
+        self.queries = {}
+        self.keywords = {}
+        self.requests_made = 0
+        opener = gzip.open if self.path.suffix == ".gz" else open
+        with opener(self.path, "rt", encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                obj = json.loads(line)
+                if "meta" in obj:
+                    self.meta = obj["meta"]
+                else:
+                    self.queries[obj["query"]] = obj["payloads"]
+                    self.keywords[obj["query"]] = obj.get("keywords") or _query_keywords(obj["query"])
+        logger.info("Loaded replay %s: %d queries", self.path, len(self.queries))
+
+    def search(self, query: str, limit: int, keywords: Optional[List[str]] = None) -> List[dict]:
+        if query not in self.queries:
+            logger.debug("Replay has no results for query '%s'", query)
+        return list(self.queries.get(query, []))[:limit]
+
+    def plan(self, per_query_limit: int) -> List[PlannedQuery]:
+        """Searches in recorded order, so planned (OR-grouped) recordings replay as they ran."""
+        # concurrent runs record in completion order; the CSV was written in plan order
+        order = self.meta.get("plan") or [q for q in political_queries if q in self.queries]
+        order += [q for q in self.queries if q not in order]
+        # planned searches may have used a bigger limit than per_query_limit
+        return [PlannedQuery(q, max(per_query_limit, len(self.queries.get(q, []))), [q],
+                             self.keywords.get(q) or _query_keywords(q)) for q in order]
+
+def _search(fetcher, pq: PlannedQuery) -> List[dict]:
+    if isinstance(fetcher, RecordingFetcher):
+        # keep the group's keywords in the recording so replay filters exactly like this run
+        return fetcher.search(pq.expression, pq.limit, pq.keywords)
+    return fetcher.search(pq.expression, pq.limit)
+
+def scrape_reddit_concurrent(
+    output_csv_path: str,
+    per_query_limit: int,
+    total_limit: int,
+    max_workers: int = REDDIT_MAX_WORKERS,
+    http_client=None,
+    fetcher: Optional[RedditSearchFetcher] = None,
+    on_row=None,
+    plan: Optional[List[PlannedQuery]] = None,
+    planner: Optional[QueryPlanner] = None,
+) -> int:
+    """
+    Concurrent variant of scrape_reddit_to_csv: queries are fetched by a thread pool paced by a
+    shared TokenBucket instead of fixed sleeps. Rows are still written in plan order (default:
+    political_queries order) so the CSV is deterministic for a given set of responses.
+    planner: when given, every consumed search is reported to planner.observe for yield stats.
+    """
+    fetcher = fetcher or RedditSearchFetcher(http_client=http_client)
+    plan = plan if plan is not None else _single_query_plan(per_query_limit)
+    Path(output_csv_path).parent.mkdir(parents=True, exist_ok=True)
+    logger.info("Running concurrent scraper (%d workers) and saving CSV to %s", max_workers, output_csv_path)
+
+    written = 0
+    seen_ids = set()
+    with open(output_csv_path, "w", newline="", encoding="utf-8") as fh, \
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reddit-fetch") as pool:
+        writer = csv.writer(fh)
+        writer.writerow(CSV_HEADER)
+        futures = [(pq, pool.submit(_search, fetcher, pq)) for pq in plan]
+        for pq, future in futures:
+            if written >= total_limit:
+                logger.info("Reached total_limit=%s, stopping.", total_limit)
+                break
+            try:
+                payloads = future.result()
+            except Exception as e:
+                logger.warning("Search failed for '%s': %s", pq.expression, e)
+                continue
+            tally = {}
+            written = _write_query_results(writer, pq.keywords, payloads, seen_ids, written, total_limit,
+                                           on_row, tally)
+            if planner is not None:
+                planner.observe(pq, tally.get("fetched", 0), tally.get("kept", []))
+        # queries not started yet are no longer needed
+        for _, future in futures:
+            future.cancel()
+
+    logger.info("Concurrent scraper finished: wrote %d rows to %s (%d API requests)",
+                written, output_csv_path, fetcher.requests_made)
+    return written
+
 def scrape_reddit_to_csv(
     output_csv_path: str,
     per_query_limit: int,
     total_limit: int,
-    delay_between_queries: float = 1.5
+    delay_between_queries: float = 1.5,
+    concurrent: Optional[bool] = None,
+    http_client=None,
+    on_row=None,
+    record_path: Optional[str] = None,
+    replay_path: Optional[str] = None,
+    plan_queries: Optional[bool] = None,
 ) -> int:
     """
     Scrape reddit using PRAW and save results to output_csv_path.
     - per_query_limit: max results to request per query (PRAW will respect rate limits)
     - total_limit: overall cap on number of rows written
+    - concurrent: use scrape_reddit_concurrent instead (default: REDDIT_CONCURRENT env var)
+    - on_row: optional callback(row) called for every row written, in CSV_HEADER order
+    - record_path: also save every query's payloads there (default: REDDIT_RECORD_PATH env var)
+    - replay_path: read payloads from a recording instead of Reddit (default: REDDIT_REPLAY_PATH env var)
+    - plan_queries: merge political_queries into fewer OR-grouped searches via query_planner
+      (default: REDDIT_QUERY_PLANNER env var)
     - returns: number of rows written
     """
+    replay_path = replay_path or os.environ.get("REDDIT_REPLAY_PATH")
+    if replay_path:
+        logger.info("Replaying recorded scrape from %s", replay_path)
+        source = ReplaySource(replay_path)
+        return scrape_reddit_concurrent(output_csv_path, per_query_limit, total_limit, max_workers=1,
+                                        fetcher=source, on_row=on_row, plan=source.plan(per_query_limit))
+
+    if plan_queries is None:
+        plan_queries = os.environ.get("REDDIT_QUERY_PLANNER", "0").lower() in ("1", "true", "yes")
+    planner = QueryPlanner() if plan_queries else None
+    plan = planner.plan(political_queries, per_query_limit) if planner else _single_query_plan(per_query_limit)
+
+    record_path = record_path or os.environ.get("REDDIT_RECORD_PATH")
+    recorder = ScrapeRecorder(record_path, per_query_limit=per_query_limit,
+                              plan=[pq.expression for pq in plan]) if record_path else None
+
+    if concurrent is None:
+        concurrent = os.environ.get("REDDIT_CONCURRENT", "0").lower() in ("1", "true", "yes")
+    if concurrent:
+        fetcher = RedditSearchFetcher(http_client=http_client)
+        if recorder:
+            fetcher = RecordingFetcher(fetcher, recorder)
+        try:
+            return scrape_reddit_concurrent(output_csv_path, per_query_limit, total_limit,
+                                            fetcher=fetcher, on_row=on_row, plan=plan, planner=planner)
+        finally:
+            if recorder:
+                recorder.close()
+            if planner:
+                planner.save()
 
     try:
         reddit = _init_reddit()
         logger.info(f"Reddit instance created. Read-only: {reddit.read_only}")
     except Exception as e:
         logger.exception(f"Failed to init reddit: {e}")
+        if recorder:
+            recorder.close()
         raise
 
     Path(output_csv_path).parent.mkdir(parents=True, exist_ok=True)
@@ -85,24 +528,23 @@ def scrape_reddit_to_csv(
     written = 0
     seen_ids = set()
 
-    header = ["Title", "Reference", "Score", "Comments", "Time", "Author", "Subreddit", "Description", "Url"]
-
     with open(output_csv_path, "w", newline="", encoding="utf-8") as fh:
         writer = csv.writer(fh)
-        writer.writerow(header)
+        writer.writerow(CSV_HEADER)
 
         try:
-            for query in political_queries:
+            for pq in plan:
+                query = pq.expression
                 if written >= total_limit:
                     logger.info("Reached total_limit=%s, stopping.", total_limit)
                     break
 
-                logger.info("Searching Reddit for query: %s (limit=%s)", query, per_query_limit)
+                logger.info("Searching Reddit for query: %s (limit=%s)", query, pq.limit)
                 try:
                     # search on r/all
-                    submissions = reddit.subreddit("all").search(query, sort="new", limit=per_query_limit)
+                    submissions = reddit.subreddit("all").search(query, sort="new", limit=pq.limit)
                     # Force a generator fetch to check for immediate auth errors
-                    # submissions = list(submissions) 
+                    # submissions = list(submissions)
                 except prawcore.exceptions.RequestException as e:
                     logger.warning("Network error during PRAW search for '%s': %s", query, e)
                     time.sleep(2)
@@ -112,43 +554,16 @@ def scrape_reddit_to_csv(
                     time.sleep(2)
                     continue
 
-                keywords = [kw.lower() for kw in query.split() if kw.strip()]
-
-                for sub in submissions:
-                    if written >= total_limit:
-                        break
-
-                    try:
-                        sid = getattr(sub, "id", None)
-                        if not sid:
-                            continue
-                        if sid in seen_ids:
-                            continue
-                        seen_ids.add(sid)
-
-                        title = getattr(sub, "title", "") or ""
-                        reference = sid
-                        score = getattr(sub, "score", 0) or 0
-                        comments = getattr(sub, "num_comments", 0) or 0
-                        created = _format_time(getattr(sub, "created_utc", None))
-                        author = getattr(sub.author, "name", "deleted") if getattr(sub, "author", None) else "deleted"
-                        subreddit = getattr(sub.subreddit, "display_name", "") or ""
-                        description = getattr(sub, "selftext", "") or ""
-                        url = getattr(sub, "url", "") or ""
-
-                        # replicate the original filtering: ensure query keywords appear in title or description
-                        text_for_check = f"{title} {description}".lower()
-                        if keywords and not any(kw in text_for_check for kw in keywords):
-                            # skip items that don't appear relevant
-                            continue
-
-                        writer.writerow([title, reference, score, comments, created, author, subreddit, description, url])
-                        written += 1
-
-                    except Exception as e:
-                        # don't stop the whole scraper for one failing submission
-                        logger.exception("Failed to process submission %s: %s", getattr(sub, "id", "<no-id>"), e)
-                        continue
+                payloads = _praw_payloads(submissions)
+                if recorder:
+                    # materialise so the recording holds everything the query returned
+                    payloads = list(payloads)
+                    recorder.record(query, payloads, pq.keywords)
+                tally = {}
+                written = _write_query_results(writer, pq.keywords, payloads, seen_ids, written, total_limit,
+                                               on_row, tally)
+                if planner:
+                    planner.observe(pq, tally.get("fetched", 0), tally.get("kept", []))
 
                 # respectful delay between queries to reduce risk of rate limiting
                 time.sleep(delay_between_queries)
@@ -157,7 +572,11 @@ def scrape_reddit_to_csv(
             logger.warning("Scraper interrupted by user.")
         except Exception as e:
             logger.exception("Unhandled exception during scraping: %s", e)
+        finally:
+            if recorder:
+                recorder.close()
+            if planner:
+                planner.save()
 
     logger.info("Scraper finished: wrote %d rows to %s", written, output_csv_path)
     return written
-
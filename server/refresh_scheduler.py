@@ -0,0 +1,129 @@
+"""
+Scheduled background refresh (stale-while-revalidate).
+/report always answers from the last published run; this scheduler keeps that run fresh by
+submitting a rerun through the RerunCoordinator every REFRESH_INTERVAL_S seconds, counted from
+when the last run completed, plus a random 0..REFRESH_JITTER_S so several instances pointed at
+the same storage do not all scrape at once.
+- no overlap: a tick that finds a rerun in flight is skipped (the running job resets the clock)
+- failures back off exponentially from REFRESH_RETRY_S, capped at the interval
+- viewers never trigger or wait on processing, they only read freshness()
+Expose: RefreshScheduler(coordinator, completed_at, interval_s, intent, jitter_s)
+"""
+
+import os,time,random,asyncio,logging
+from typing import Callable,Optional
+from starlette.concurrency import run_in_threadpool
+
+from rerun_coordinator import INTENT_RANK
+
+logger = logging.getLogger("refresh-scheduler")
+
+# ---- Configuration (env) ----
+# seconds between refreshes, 0 disables the scheduler
+REFRESH_INTERVAL_S = float(os.environ.get("REFRESH_INTERVAL_S", 0))
+REFRESH_INTENT = os.environ.get("REFRESH_INTENT", "light")
+# random extra delay per refresh, defaults to 10% of the interval
+REFRESH_JITTER_S = float(os.environ.get("REFRESH_JITTER_S", REFRESH_INTERVAL_S * 0.1))
+# first retry after a failed refresh, doubled per consecutive failure
+REFRESH_RETRY_S = float(os.environ.get("REFRESH_RETRY_S", 300))
+# recheck delay when a tick was skipped because a rerun was already in flight
+BUSY_RECHECK_S = 30.0
+# age after which /report flags a run as stale when the scheduler is disabled
+REPORT_STALE_AFTER_S = float(os.environ.get("REPORT_STALE_AFTER_S", 24 * 3600))
+
+class RefreshScheduler:
+    def __init__(self, coordinator, completed_at: Callable[[], Optional[float]],
+                 interval_s: float = REFRESH_INTERVAL_S, intent: str = REFRESH_INTENT,
+                 jitter_s: float = REFRESH_JITTER_S):
+        if intent not in INTENT_RANK:
+            raise ValueError(f"Unknown refresh intent {intent!r}, expected one of {list(INTENT_RANK)}")
+        self.coordinator = coordinator
+        # completed_at() -> epoch seconds the published run finished, None when there is none
+        self.completed_at = completed_at
+        self.interval_s = interval_s
+        self.intent = intent
+        self.jitter_s = max(jitter_s, 0.0)
+        self.next_refresh_at: Optional[float] = None
+        self.last_attempt: Optional[dict] = None
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval_s > 0
+
+    @property
+    def stale_after_s(self) -> float:
+        # a run is stale once a scheduled refresh should have replaced it
+        return self.interval_s + self.jitter_s if self.enabled else REPORT_STALE_AFTER_S
+
+    def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        logger.info("Refresh scheduler: intent=%s every %.0fs (+0..%.0fs jitter)",
+                    self.intent, self.interval_s, self.jitter_s)
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.next_refresh_at = None
+
+    def _next_delay(self) -> float:
+        if self.failures:
+            delay = min(REFRESH_RETRY_S * 2 ** (self.failures - 1), self.interval_s)
+        else:
+            completed = self.completed_at()
+            age = time.time() - completed if completed is not None else self.interval_s
+            delay = max(self.interval_s - age, 0.0)
+        return delay + random.uniform(0, self.jitter_s)
+
+    async def _loop(self):
+        # completed_at() pins the published run, which can wait on compaction: keep it off the loop
+        delay = await run_in_threadpool(self._next_delay)
+        while True:
+            self.next_refresh_at = time.time() + delay
+            await asyncio.sleep(delay)
+            if self.coordinator.active is not None:
+                logger.info("Scheduled refresh skipped: rerun job %s already running", self.coordinator.active.job_id)
+                delay = max(await run_in_threadpool(self._next_delay), BUSY_RECHECK_S)
+                continue
+            started = time.time()
+            self.next_refresh_at = None
+            try:
+                result, coalescing = await self.coordinator.submit(self.intent)
+                self.failures = 0
+                self.last_attempt = {"at": started, "ok": True, "run_id": result.get("run_id"),
+                                     "job_id": coalescing["job_id"], "duration_s": round(time.time() - started, 1)}
+                logger.info("Scheduled refresh published run %s", result.get("run_id"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                self.last_attempt = {"at": started, "ok": False, "error": str(getattr(e, "detail", e)),
+                                     "duration_s": round(time.time() - started, 1)}
+                logger.warning("Scheduled refresh failed (%d in a row): %s", self.failures, e)
+            delay = await run_in_threadpool(self._next_delay)
+
+    def freshness(self, completed_at: float, now: Optional[float] = None) -> dict:
+        """Staleness fields for /report, from the served run's completion time."""
+        now = time.time() if now is None else now
+        stale_at = completed_at + self.stale_after_s
+        return {
+            "completed_at": completed_at,
+            "stale_at": stale_at,
+            "stale": now >= stale_at,
+            "refreshing": self.coordinator.active is not None,
+            "next_refresh_at": self.next_refresh_at,
+        }
+
+    def status(self) -> dict:
+        return {"enabled": self.enabled, "intent": self.intent, "interval_s": self.interval_s,
+                "jitter_s": self.jitter_s, "next_refresh_at": self.next_refresh_at,
+                "consecutive_failures": self.failures, "last_attempt": self.last_attempt}
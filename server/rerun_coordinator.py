@@ -0,0 +1,112 @@
+"""
+Single-flight coalescing for /rerun.
+At most one pipeline runs at a time plus at most one queued behind it:
+- nothing running              -> "started"
+- running intent >= requested  -> "attached"  (caller shares the in-flight result)
+- running intent <  requested  -> "queued" (new queued job), "attached_queued" (queued job already
+                                   covers the intent) or "superseded_queued" (queued job upgraded
+                                   to the higher intent; its earlier callers get the bigger run too)
+Expose: RerunCoordinator(run_fn).submit(intent) -> (result, coalescing_info)
+"""
+
+import asyncio,logging,time,itertools
+from typing import Callable,Optional
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger("rerun-coordinator")
+
+INTENT_RANK = {"light": 0, "medium": 1, "deep": 2}
+
+class RerunJob:
+    _ids = itertools.count(1)
+
+    def __init__(self, intent: str):
+        self.job_id = next(self._ids)
+        self.intent = intent
+        self.requested = []
+        self.waiters = 0
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+class RerunCoordinator:
+    def __init__(self, run_fn: Callable[[str], dict]):
+        # run_fn(intent) is the blocking scrape+process+publish pipeline, executed in a worker thread
+        self.run_fn = run_fn
+        self.active: Optional[RerunJob] = None
+        self.queued: Optional[RerunJob] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, intent: str):
+        async with self._lock:
+            if self.active is None:
+                job = self.active = RerunJob(intent)
+                decision = "started"
+                self._task = asyncio.create_task(self._drive(job))
+            elif INTENT_RANK[self.active.intent] >= INTENT_RANK[intent]:
+                job = self.active
+                decision = "attached"
+            elif self.queued is None:
+                job = self.queued = RerunJob(intent)
+                decision = "queued"
+            elif INTENT_RANK[self.queued.intent] >= INTENT_RANK[intent]:
+                job = self.queued
+                decision = "attached_queued"
+            else:
+                job = self.queued
+                logger.info("Queued rerun %s superseded: %s -> %s", job.job_id, job.intent, intent)
+                job.intent = intent
+                decision = "superseded_queued"
+            job.requested.append(intent)
+            job.waiters += 1
+        logger.info("Rerun request intent=%s -> %s (job %s, intent %s)", intent, decision, job.job_id, job.intent)
+
+        # shield: a client disconnecting must not cancel the run other callers are waiting on
+        result = await asyncio.shield(job.future)
+        info = {
+            "decision": decision,
+            "requested_intent": intent,
+            "executed_intent": job.intent,
+            "job_id": job.job_id,
+            "coalesced_callers": job.waiters,
+            # every intent folded into this run, e.g. ["light", "deep"] after a supersede
+            "coalesced_intents": sorted(set(job.requested), key=INTENT_RANK.get),
+        }
+        return result, info
+
+    async def _drive(self, job: RerunJob):
+        try:
+            while job is not None:
+                job.started = time.time()
+                try:
+                    result = await run_in_threadpool(self.run_fn, job.intent)
+                except Exception as e:
+                    job.future.set_exception(e)
+                    # avoid "exception was never retrieved" when every caller disconnected
+                    job.future.exception()
+                else:
+                    job.future.set_result(result)
+                async with self._lock:
+                    job = self.active = self.queued
+                    self.queued = None
+        except BaseException as e:
+            # cancelled (shutdown) or worse: fail the in-flight and queued jobs instead of leaving their
+            # callers waiting forever, and free the slots so the next submit starts a fresh run
+            for pending in (job, self.queued):
+                if pending is not None and not pending.future.done():
+                    error = RuntimeError(f"Rerun {pending.job_id} interrupted: {type(e).__name__}")
+                    error.__cause__ = e
+                    pending.future.set_exception(error)
+                    pending.future.exception()
+            self.active = self.queued = None
+            raise
+
+    def status(self) -> dict:
+        def describe(job):
+            if job is None:
+                return None
+            return {"job_id": job.job_id, "intent": job.intent, "waiters": job.waiters,
+                    "started": job.started, "created": job.created}
+        return {"active": describe(self.active), "queued": describe(self.queued)}
@@ -0,0 +1,116 @@
+"""
+Wall-clock budget for one rerun.
+Every intent gets a time budget (main.INTENT_LIMITS "budget_s", from the start of the run). The
+classifiers report their throughput as they go; when the posts still to classify would not
+fit in what is left (minus REPORT_RESERVE of the budget kept for topics + report), the run
+steps down a degradation ladder, cheapest quality loss first:
+  skip_context      no zero-shot NLI context model, stage one decides every post (src/cascade.py)
+  short_max_length  sentiment / sarcasm models truncate at SHORT_MAX_LENGTH tokens instead of 128
+and at report time:
+  cap_appendix      the PDF "All Collected Posts" table gets only the rows that fit
+  drop_docx         no report.docx
+Every step taken is recorded (name, seconds into the run, reason) and ends up in meta.json.
+Expose: RunBudget(seconds, intent)
+"""
+
+import time,logging,threading
+from typing import List, Optional
+
+logger = logging.getLogger("run_budget")
+
+CLASSIFY_LADDER = ("skip_context", "short_max_length")
+SHORT_MAX_LENGTH = 64
+# share of the budget kept for topic modelling, the CSV and the reports
+REPORT_RESERVE = 0.15
+# classify posts (or seconds) observed since the last step before projecting again
+MIN_SAMPLE_ITEMS = 8
+MIN_SAMPLE_S = 2.0
+# report costs: LongTable rows with a Paragraph each, one DOCX with a 200-row table
+PDF_ROW_S = 0.004
+DOCX_S = 5.0
+MIN_APPENDIX_ROWS = 100
+
+class RunBudget:
+    def __init__(self, seconds: float, intent: Optional[str] = None):
+        self.seconds = seconds
+        self.intent = intent
+        self.started = time.monotonic()
+        self.degradations: List[dict] = []
+        self._window_items = 0
+        self._window_s = 0.0
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> float:
+        return self.seconds - self.elapsed()
+
+    def active(self, name: str) -> bool:
+        return any(d["name"] == name for d in self.degradations)
+
+    def degrade(self, name: str, reason: str) -> bool:
+        """Record a degradation once; False when it was already active."""
+        with self._lock:
+            if self.active(name):
+                return False
+            entry = {"name": name, "at_s": round(self.elapsed(), 1), "reason": reason}
+            self.degradations.append(entry)
+        logger.warning("Run budget (%s, %.0fs): %s at %.1fs, %s", self.intent, self.seconds, name,
+                       entry["at_s"], reason)
+        return True
+
+    # ---- classification ----
+    def classify_options(self) -> dict:
+        """Keyword arguments for sentiment_analysis.classify / classify_batch."""
+        return {"skip_context": self.active("skip_context"),
+                "max_length": SHORT_MAX_LENGTH if self.active("short_max_length") else None}
+
+    def observe(self, items: int, seconds: float) -> None:
+        with self._lock:
+            self._window_items += items
+            self._window_s += seconds
+
+    def check(self, remaining_items: float) -> Optional[str]:
+        """
+        Project the time for remaining_items posts at the throughput observed since the last
+        step; take the next classify step when it overshoots. Returns the step taken, if any.
+        """
+        with self._lock:
+            items, spent = self._window_items, self._window_s
+        if remaining_items <= 0 or (items < MIN_SAMPLE_ITEMS and spent < MIN_SAMPLE_S) or items == 0:
+            return None
+        projected = remaining_items * spent / items
+        available = self.remaining() - self.seconds * REPORT_RESERVE
+        if projected <= available:
+            return None
+        for name in CLASSIFY_LADDER:
+            if not self.active(name):
+                self.degrade(name, f"{remaining_items:.0f} posts left at {spent / items:.2f}s/post "
+                                   f"= {projected:.0f}s, {max(available, 0):.0f}s available")
+                # the next projection measures the degraded throughput
+                with self._lock:
+                    self._window_items, self._window_s = 0, 0.0
+                return name
+        return None
+
+    # ---- report ----
+    def appendix_rows(self, wanted: int) -> int:
+        """PDF appendix rows that fit in the time left (keeping room for the DOCX)."""
+        fit = int((self.remaining() - DOCX_S) / PDF_ROW_S)
+        if fit >= wanted:
+            return wanted
+        rows = max(fit, MIN_APPENDIX_ROWS)
+        if rows < wanted:
+            self.degrade("cap_appendix", f"{wanted} rows wanted, {rows} fit in {max(self.remaining(), 0):.0f}s left")
+        return min(rows, wanted)
+
+    def allow_docx(self) -> bool:
+        if self.remaining() >= DOCX_S:
+            return True
+        self.degrade("drop_docx", f"{max(self.remaining(), 0):.0f}s left, DOCX needs ~{DOCX_S:.0f}s")
+        return False
+
+    def summary(self) -> dict:
+        return {"intent": self.intent, "budget_s": self.seconds, "elapsed_s": round(self.elapsed(), 1),
+                "degradations": list(self.degradations)}
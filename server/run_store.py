@@ -0,0 +1,337 @@
+"""
+Versioned run directories.
+Each rerun writes into storage/runs/<run_id>/ and is published by atomically replacing the
+storage/LATEST pointer file (os.replace, works on Windows where symlinks need admin rights).
+A published run is never modified again, so readers only have to pin the run they resolved
+for the length of their request; retention/compaction skips pinned runs.
+Pins are shared flocks on <run_dir>/.pin, so they hold across worker processes
+(uvicorn --workers N); compaction takes the exclusive lock before touching a run and keeps it
+until the run is deleted or compacted, without holding the in-process lock across that I/O. Without fcntl (Windows) pins are per process.
+Expose: create_run(), publish(run_id), current_run(), acquire()/release(), pinned(), compact()
+"""
+
+import os,gzip,json,time,uuid,shutil,logging,threading
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+from pathlib import Path
+from typing import Optional,Tuple
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+logger = logging.getLogger("run_store")
+
+BASE_DIR = Path(__file__).resolve().parent
+STORAGE_DIR = BASE_DIR / "storage"
+RUNS_DIR = STORAGE_DIR / "runs"
+POINTER_FILE = STORAGE_DIR / "LATEST"
+# pre-versioning layout, served until the first versioned run is published
+LEGACY_DIR = STORAGE_DIR / "latest"
+LEGACY_RUN_ID = "latest"
+# present while a run is being written, removed on publish
+INCOMPLETE_MARKER = ".incomplete"
+# readers hold a shared flock on it, compaction an exclusive one
+PIN_FILE = ".pin"
+
+# ---- Retention policy (env configurable) ----
+# newest N published runs keep every artifact
+KEEP_FULL_RUNS = int(os.environ.get("RUN_KEEP_FULL", 3))
+# older runs are compacted (meta + gzipped analysis CSV only) up to this many runs in total
+KEEP_MAX_RUNS = int(os.environ.get("RUN_KEEP_MAX", 20))
+# runs older than this are deleted regardless of count (0 disables)
+KEEP_MAX_DAYS = float(os.environ.get("RUN_KEEP_DAYS", 30))
+# hard cap on storage/runs size in MB, oldest non-pinned runs go first (0 disables)
+MAX_STORAGE_MB = float(os.environ.get("RUN_MAX_STORAGE_MB", 0))
+# an unpublished run older than this is assumed to be from a crashed process
+INCOMPLETE_TTL_S = float(os.environ.get("RUN_INCOMPLETE_TTL_S", 6 * 3600))
+# files kept by compaction
+COMPACT_KEEP = {"meta.json", "manifest.json", "analysis_output.csv.gz", PIN_FILE}
+
+_lock = threading.Lock()
+_pins: dict = {}
+# run_id -> open PIN_FILE holding this process's shared flock while _pins[run_id] > 0
+_pin_files: dict = {}
+# runs compaction is deleting/compacting right now, see _claimed()
+_doomed: set = set()
+_pointer_cache: Tuple[Optional[int], Optional[str]] = (None, None)
+
+def new_run_id() -> str:
+    # sortable by creation time, unique across concurrent writers
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ") + "-" + uuid.uuid4().hex[:6]
+
+def run_dir(run_id: str) -> Path:
+    if run_id == LEGACY_RUN_ID:
+        return LEGACY_DIR
+    return RUNS_DIR / os.path.basename(run_id)
+
+def create_run() -> Tuple[str, Path]:
+    """Allocate a fresh, unpublished run directory."""
+    RUNS_DIR.mkdir(parents=True, exist_ok=True)
+    run_id = new_run_id()
+    path = RUNS_DIR / run_id
+    path.mkdir(parents=True, exist_ok=False)
+    (path / INCOMPLETE_MARKER).touch()
+    return run_id, path
+
+def publish(run_id: str) -> None:
+    """Atomically make run_id the run served as 'latest'."""
+    path = run_dir(run_id)
+    if not path.is_dir():
+        raise FileNotFoundError(f"Run directory missing: {path}")
+    (path / INCOMPLETE_MARKER).unlink(missing_ok=True)
+    tmp = STORAGE_DIR / f"LATEST.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(run_id)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, POINTER_FILE)
+    logger.info("Published run %s", run_id)
+
+def discard(run_id: str) -> None:
+    """Drop a run that failed before publishing."""
+    path = run_dir(run_id)
+    if path != LEGACY_DIR and (path / INCOMPLETE_MARKER).exists():
+        _remove_run(path)
+
+def current_run_id() -> str:
+    global _pointer_cache
+    try:
+        mtime = POINTER_FILE.stat().st_mtime_ns
+    except OSError:
+        return LEGACY_RUN_ID
+    cached_mtime, cached_id = _pointer_cache
+    if cached_mtime == mtime and cached_id:
+        return cached_id
+    try:
+        run_id = POINTER_FILE.read_text(encoding="utf-8").strip()
+    except OSError:
+        return LEGACY_RUN_ID
+    if not run_id or not run_dir(run_id).is_dir():
+        logger.warning("LATEST points at missing run %r, falling back to legacy dir", run_id)
+        return LEGACY_RUN_ID
+    _pointer_cache = (mtime, run_id)
+    return run_id
+
+def current_run() -> Tuple[str, Path]:
+    run_id = current_run_id()
+    return run_id, run_dir(run_id)
+
+# ---- Reader pinning ----
+def _open_pin(path: Path):
+    try:
+        return open(path / PIN_FILE, "a+b")
+    except OSError:
+        # already gone
+        return None
+
+def _lock_shared(path: Path):
+    """Open the run's pin file with a shared flock; None when compaction removed the run meanwhile."""
+    f = _open_pin(path)
+    if f is None:
+        return None
+    # waits while compaction holds the exclusive lock, i.e. until it is done with the run
+    fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+    if not path.is_dir() or (path / ".compacted").exists():
+        f.close()
+        return None
+    return f
+
+def acquire() -> Tuple[str, Path]:
+    """
+    Resolve and pin the current run. Pair with release(run_id) when the response is done.
+    May wait for compaction to finish with the run, so call it from a worker thread.
+    """
+    while True:
+        with _lock:
+            run_id = current_run_id()
+            path = run_dir(run_id)
+            if _pins.get(run_id, 0) > 0 or run_id == LEGACY_RUN_ID or (fcntl is None and run_id not in _doomed):
+                _pins[run_id] = _pins.get(run_id, 0) + 1
+                return run_id, path
+        if fcntl is None:
+            # compaction claimed it before LATEST moved on, resolve again once it is done
+            time.sleep(0.01)
+            continue
+        # the blocking flock happens outside _lock so compaction of other runs never stalls readers
+        f = _lock_shared(path)
+        if f is None:
+            # removed between resolving and locking: LATEST has moved on, resolve again
+            continue
+        with _lock:
+            if run_id in _pin_files:
+                f.close()
+            else:
+                _pin_files[run_id] = f
+            _pins[run_id] = _pins.get(run_id, 0) + 1
+            return run_id, path
+
+def release(run_id: str) -> None:
+    with _lock:
+        n = _pins.get(run_id, 0) - 1
+        if n > 0:
+            _pins[run_id] = n
+            return
+        _pins.pop(run_id, None)
+        f = _pin_files.pop(run_id, None)
+        if f is not None:
+            f.close()
+
+@contextmanager
+def pinned():
+    run_id, path = acquire()
+    try:
+        yield run_id, path
+    finally:
+        release(run_id)
+
+@contextmanager
+def _claimed(run_id: str, path: Path):
+    """
+    Yields True when no process pins run_id and it is not the current run. The run is then
+    marked doomed under _lock and its exclusive flock held until exit, so the caller can delete
+    or compact it without holding _lock; readers resolving it meanwhile wait and re-resolve.
+    Yields False otherwise.
+    """
+    f = None
+    with _lock:
+        if _pins.get(run_id, 0) > 0 or run_id in _doomed or run_id == current_run_id():
+            claimed = False
+        elif fcntl is None:
+            claimed = True
+        else:
+            f = _open_pin(path)
+            claimed = False
+            if f is not None:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    claimed = True
+                except OSError:
+                    f.close()
+                    f = None
+        if claimed:
+            _doomed.add(run_id)
+    try:
+        yield claimed
+    finally:
+        if claimed:
+            with _lock:
+                _doomed.discard(run_id)
+        if f is not None:
+            f.close()
+
+def is_pinned(run_id: str) -> bool:
+    with _lock:
+        if _pins.get(run_id, 0) > 0:
+            return True
+    if fcntl is None:
+        return False
+    f = _open_pin(run_dir(run_id))
+    if f is None:
+        return False
+    with f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return False
+        except OSError:
+            return True
+
+# ---- Retention / compaction ----
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+def _remove_run(path: Path) -> bool:
+    try:
+        shutil.rmtree(path)
+        return True
+    except Exception as e:
+        # e.g. a file still open by another process on Windows, retried next compaction
+        logger.warning("Could not remove run %s: %s", path.name, e)
+        return False
+
+def compact_run(path: Path) -> None:
+    """Strip a run down to its metadata and a gzipped analysis CSV."""
+    csv_path = path / "analysis_output.csv"
+    gz_path = path / "analysis_output.csv.gz"
+    if csv_path.exists() and not gz_path.exists():
+        with open(csv_path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+    for p in path.iterdir():
+        if p.name in COMPACT_KEEP:
+            continue
+        try:
+            shutil.rmtree(p) if p.is_dir() else p.unlink()
+        except Exception as e:
+            logger.warning("Compaction skipped %s: %s", p, e)
+    (path / ".compacted").touch()
+
+def compact() -> dict:
+    """Apply the retention policy. Never touches the current run, pinned runs or runs still being written."""
+    if not RUNS_DIR.exists():
+        return {"deleted": [], "compacted": []}
+    current = current_run_id()
+    now = time.time()
+    deleted, compacted = [], []
+    published = []
+    for path in sorted(RUNS_DIR.iterdir(), reverse=True):
+        if not path.is_dir():
+            continue
+        if (path / INCOMPLETE_MARKER).exists():
+            if now - path.stat().st_mtime > INCOMPLETE_TTL_S and _remove_run(path):
+                deleted.append(path.name)
+            continue
+        published.append(path)
+
+    kept = []
+    for idx, path in enumerate(published):
+        run_id = path.name
+        # a claimed run cannot be pinned until it is deleted or compacted
+        with _claimed(run_id, path) as free:
+            if not free or run_id == current:
+                kept.append(path)
+                continue
+            too_old = KEEP_MAX_DAYS > 0 and now - path.stat().st_mtime > KEEP_MAX_DAYS * 86400
+            if idx >= KEEP_MAX_RUNS or too_old:
+                if _remove_run(path):
+                    deleted.append(run_id)
+                continue
+            if idx >= KEEP_FULL_RUNS and not (path / ".compacted").exists():
+                compact_run(path)
+                compacted.append(run_id)
+        kept.append(path)
+
+    if MAX_STORAGE_MB > 0:
+        budget = MAX_STORAGE_MB * 1024 * 1024
+        sizes = {p: _dir_size(p) for p in kept}
+        total = sum(sizes.values())
+        # oldest first
+        for path in reversed(kept):
+            if total <= budget:
+                break
+            with _claimed(path.name, path) as free:
+                if not free or path.name == current:
+                    continue
+                if _remove_run(path):
+                    deleted.append(path.name)
+                    total -= sizes[path]
+
+    if deleted or compacted:
+        logger.info("Retention: deleted=%s compacted=%s", deleted, compacted)
+    return {"deleted": deleted, "compacted": compacted}
+
+def list_runs() -> list:
+    if not RUNS_DIR.exists():
+        return []
+    runs = []
+    for path in sorted(RUNS_DIR.iterdir(), reverse=True):
+        if not path.is_dir() or (path / INCOMPLETE_MARKER).exists():
+            continue
+        meta = {}
+        try:
+            with open(path / "meta.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except Exception:
+            pass
+        runs.append({"run_id": path.name, "generated_at": meta.get("generated_at", ""),
+                     "compacted": (path / ".compacted").exists()})
+    return runs
@@ -1,5 +1,7 @@
 import sys
 import os
+import time
+import numpy as np
 
 # ---- PERMANENT IMPORT FIX ----
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -7,14 +9,17 @@ sys.path.insert(0, ROOT_DIR)
 
 from src.language_detection import detect_language
 from src.preprocessing import clean_text
-from src.predict import predict
-from src.feature_builder import build_features
+from src.predict import predict, predict_batch
+from src.feature_builder import build_features, build_feature_matrix
 from src.anchor_similarity import compute_similarity
-from src.embeddings import embedder
-from src.sarcasm import sarcasm_score
-from src.sentiment import sentiment_scores
+from src.embeddings import get_embedder, encode as encode_texts
+from src.sarcasm import sarcasm_score, load_model as load_sarcasm_model
+from src.sentiment import sentiment_scores, load_model as load_sentiment_model
 from src.translation import translate_to_english
-from src.context_llm import get_context_probs
+from src.context_llm import get_context_probs, load_context_model
+from src import cascade
+from src import model_client
+from src import student
 
 # ---- SUPPORTED LANGUAGES ----
 SUPPORTED_LANGS = {"en", "hi", "ta", "ur", "bn", "te", "ml", "gu", "kn", "mr"}
@@ -27,10 +32,36 @@ LABELS = [
     "Neutral"
 ]
 
+# "teachers": embedder + anchors, sentiment, irony and NLI models (cascade applies)
+# "student": every feature from the distilled student in one pass (src/student.py, src/distill.py);
+# falls back to the teachers while models/student.pkl does not exist
+FEATURE_BACKEND = os.environ.get("FEATURE_BACKEND", "teachers").lower()
+
+# local anchors loaded (init_anchors); not needed while a model server does the classifying
+_anchors_ready = False
+
+def _use_student() -> bool:
+    global FEATURE_BACKEND
+    if FEATURE_BACKEND != "student":
+        return False
+    if not student.available():
+        print(f"[WARNING] FEATURE_BACKEND=student but {student.STUDENT_MODEL_PATH} is missing, using the teachers")
+        FEATURE_BACKEND = "teachers"
+        return False
+    return True
+
 def init_anchors():
     """
     Load anchor text from data/anchors/, encode them, and inject into anchor_similarity module.
+    Skipped while a model server (src/model_client.py) is reachable, it has its own, and with
+    the student backend, which does not use them.
     """
+    if _use_student() or model_client.get() is not None:
+        return
+    _init_local_anchors()
+
+def _init_local_anchors():
+    global _anchors_ready
     print("[INIT] Loading anchor embeddings...")
     anchor_dir = os.path.join(ROOT_DIR, "data", "anchors")
     
@@ -52,22 +83,61 @@ def init_anchors():
             continue
 
         # Encode (batch)
-        # embedder is from src.embeddings
-        embeddings_matrix = embedder.encode(lines)
+        # embedder from src.embeddings, loaded on first use (src/model_manager.py)
+        embeddings_matrix = encode_texts(lines)
         loaded_anchors[key] = embeddings_matrix
         print(f"   - Loaded {key}: {len(lines)} examples")
 
     # Inject into module
     from src.anchor_similarity import load_anchor_embeddings
     load_anchor_embeddings(loaded_anchors)
+    _anchors_ready = True
     print("[INIT] Anchor embeddings initialized.\n")
 
-def classify(text: str):
+def warm_up():
+    """
+    Load every model classify() uses up front (they otherwise load on first use), so the first
+    classification does not pay for them; used by the API server's background prewarm.
+    A no-op while a model server is reachable.
+    """
+    if model_client.get() is not None:
+        return
+    get_embedder()
+    load_sentiment_model()
+    load_sarcasm_model()
+    load_context_model()
+
+def _remote(call, *args, **kwargs):
+    """
+    Run call(client, ...) on the model server; None when there is none, or it just went away and
+    MODEL_SERVER_FALLBACK is on: the caller then uses the local models (loading the anchors
+    first if it has to). Without the fallback ModelServerUnavailable reaches the caller.
+    """
+    client = model_client.get()
+    if client is not None:
+        try:
+            return call(client, *args, **kwargs)
+        except model_client.ModelServerUnavailable:
+            if not model_client.FALLBACK:
+                raise
+    if not _anchors_ready:
+        _init_local_anchors()
+    return None
+
+def _record_remote(results: list) -> list:
+    # keep this process's cascade stats (skip_rate) meaningful when the server classified
+    for result in results:
+        if "stage" in result:
+            cascade.record(result["stage"])
+    return results
+
+def _prepare(text: str):
+    """Clean, detect language and translate. Returns (text, lang, processing_text) or None if empty."""
     # 1. Clean text
     text = clean_text(text)
 
     if len(text.strip()) == 0:
-        return {"error": "Empty input text"}
+        return None
 
     # 2. Language detection
     lang, prob = detect_language(text)
@@ -85,10 +155,10 @@ def classify(text: str):
         translated = translate_to_english(text, source=lang)
         print(f"       -> {translated}")
         processing_text = translated
+    return text, lang, processing_text
 
-    # 3. Sentence embedding
-    text_embedding = embedder.encode(processing_text, normalize_embeddings=True)
-
+def _classify_embedded(text: str, lang: str, processing_text: str, text_embedding,
+                       skip_context: bool = False, max_length: int = None):
     # 4. Cosine similarity with anchors
     similarity_scores = compute_similarity(
         text_embedding=text_embedding,
@@ -96,36 +166,191 @@ def classify(text: str):
     )
 
     # 5. Sentiment + sarcasm
-    sentiment = sentiment_scores(processing_text)     # [neg, neutral, pos]
-    sarcasm = sarcasm_score(processing_text)           # float 0–1
+    sentiment = sentiment_scores(processing_text, max_length=max_length)     # [neg, neutral, pos]
+    sarcasm = sarcasm_score(processing_text, max_length=max_length)           # float 0–1
 
-    # 5.5 LLM Context Analysis
-    context_probs = get_context_probs(processing_text)
+    # 5.2 Cascade stage one: skip the zero-shot model when the cheap signals are decisive
+    # (skip_context: always, whatever the confidence; run_budget degradation)
+    stage = 2
+    if cascade.enabled() or skip_context:
+        stage_one_features = build_features(
+            similarity=similarity_scores,
+            sentiment=sentiment,
+            sarcasm=sarcasm,
+            context_probs=cascade.NEUTRAL_CONTEXT
+        )
+        label_idx, confidence, decisive = cascade.stage_one(stage_one_features, 0.0 if skip_context else None)
+        if decisive:
+            stage = 1
+            features = stage_one_features
 
-    # 6. Feature vector
-    features = build_features(
-        similarity=similarity_scores,
-        sentiment=sentiment,
-        sarcasm=sarcasm,
-        context_probs=context_probs
-    )
+    if stage == 2:
+        # 5.5 LLM Context Analysis
+        context_probs = get_context_probs(processing_text)
+
+        # 6. Feature vector
+        features = build_features(
+            similarity=similarity_scores,
+            sentiment=sentiment,
+            sarcasm=sarcasm,
+            context_probs=context_probs
+        )
+
+        # 7. Final prediction
+        label_idx, confidence = predict(features)
+    cascade.record(stage)
 
-    # 7. Final prediction
-    label_idx, confidence = predict(features)
+    return _result(text, lang, label_idx, confidence, stage, sarcasm, sentiment, features, text_embedding)
 
+def _result(text, lang, label_idx, confidence, stage, sarcasm, sentiment, features, embedding) -> dict:
     return {
         "text": text,
         "label": LABELS[label_idx],
-        "confidence": round(confidence, 3),
+        "confidence": round(float(confidence), 3),
+        "stage": stage,
         "language": lang,
-        "sarcasm_score": round(sarcasm, 3),
+        "sarcasm_score": round(float(sarcasm), 3),
         "sentiment": {
-            "negative": round(sentiment[0], 3),
-            "neutral": round(sentiment[1], 3),
-            "positive": round(sentiment[2], 3),
-        }
+            "negative": round(float(sentiment[0]), 3),
+            "neutral": round(float(sentiment[1]), 3),
+            "positive": round(float(sentiment[2]), 3),
+        },
+        # 13-dim vector the label came from (feature_store); context is neutral when stage == 1
+        "features": [float(v) for v in features],
+        # normalized sentence embedding (embedding_store); numpy array, drop it before serializing;
+        # None from the student backend, which has no sentence embedding
+        "embedding": None if embedding is None else np.asarray(embedding, dtype=np.float32),
     }
-  
+
+def _classify_student(texts: list) -> list:
+    """classify_batch with the student backend: one student pass for all 13 features, no cascade."""
+    results = [{"error": "Empty input text"} for _ in texts]
+    prepared = [(i, p) for i, p in ((i, _prepare(t)) for i, t in enumerate(texts)) if p is not None]
+    if not prepared:
+        return results
+    X = student.predict_features([p[2] for _, p in prepared])
+    labels, confidence = predict_batch(X)
+    for j, (i, (text, lang, _)) in enumerate(prepared):
+        results[i] = _result(text, lang, int(labels[j]), confidence[j], 2, X[j, 8], X[j, 5:8], X[j], None)
+        results[i]["backend"] = "student"
+    return results
+
+def classify(text: str, skip_context: bool = False, max_length: int = None):
+    """
+    skip_context: never run the zero-shot context model (stage one decides every post)
+    max_length: token limit of the sentiment / sarcasm models (default 128)
+    Neither applies to the student backend (FEATURE_BACKEND=student).
+    """
+    if _use_student():
+        return _classify_student([text])[0]
+    remote = _remote(model_client.ModelClient.classify_batch, [text], skip_context=skip_context, max_length=max_length)
+    if remote is not None:
+        return _record_remote(remote)[0]
+    prepared = _prepare(text)
+    if prepared is None:
+        return {"error": "Empty input text"}
+    text, lang, processing_text = prepared
+
+    # 3. Sentence embedding
+    text_embedding = encode_texts(processing_text, normalize_embeddings=True)
+    return _classify_embedded(text, lang, processing_text, text_embedding, skip_context, max_length)
+
+def classify_batch(texts: list, batch_size: int = 32, skip_context: bool = False, max_length: int = None) -> list:
+    """
+    classify() for many texts; the sentence embeddings are computed in one batched encode call
+    and the stage outputs are scored as one N x 13 feature matrix (no per-row sklearn calls).
+    Returns one result dict per input, in order. skip_context / max_length as in classify().
+    """
+    if _use_student():
+        return _classify_student(list(texts))
+    remote = _remote(model_client.ModelClient.classify_batch, list(texts), batch_size=batch_size,
+                     skip_context=skip_context, max_length=max_length)
+    if remote is not None:
+        return _record_remote(remote)
+    results = [{"error": "Empty input text"} for _ in texts]
+    prepared = []
+    for i, text in enumerate(texts):
+        p = _prepare(text)
+        if p is not None:
+            prepared.append((i, p))
+    if not prepared:
+        return results
+
+    # 3. Sentence embedding (batched)
+    embeddings = encode_texts([p[2] for _, p in prepared], normalize_embeddings=True, batch_size=batch_size)
+
+    # 4-5. Anchor similarity, sentiment, sarcasm per post
+    similarity = [compute_similarity(text_embedding=e, anchor_embeddings=None) for e in embeddings]
+    sentiment = np.array([sentiment_scores(p[2], max_length=max_length) for _, p in prepared], dtype=np.float32)
+    sarcasm = np.array([sarcasm_score(p[2], max_length=max_length) for _, p in prepared], dtype=np.float32)
+
+    # 5.2 Cascade stage one on the whole batch
+    n = len(prepared)
+    stage = np.full(n, 2)
+    use_stage_one = cascade.enabled() or skip_context
+    if use_stage_one:
+        X1 = build_feature_matrix(similarity, sentiment, sarcasm, cascade.NEUTRAL_CONTEXT)
+        labels1, conf1, decisive = cascade.stage_one_batch(X1, 0.0 if skip_context else None)
+        stage[decisive] = 1
+
+    # 5.5 LLM Context Analysis, only where stage one was not decisive
+    context = np.tile(np.asarray(cascade.NEUTRAL_CONTEXT, dtype=np.float32), (n, 1))
+    for j in np.flatnonzero(stage == 2):
+        context[j] = get_context_probs(prepared[j][1][2])
+
+    # 6-7. Feature matrix + vectorised prediction
+    X = build_feature_matrix(similarity, sentiment, sarcasm, context)
+    labels, confidence = predict_batch(X)
+    if use_stage_one:
+        labels = np.where(stage == 1, labels1, labels)
+        confidence = np.where(stage == 1, conf1, confidence)
+
+    for j, (i, (text, lang, _)) in enumerate(prepared):
+        cascade.record(int(stage[j]))
+        results[i] = _result(text, lang, int(labels[j]), confidence[j], int(stage[j]), sarcasm[j], sentiment[j], X[j],
+                             embeddings[j])
+    return results
+
+def full_features(text: str, return_text: bool = False):
+    """
+    13-feature vector with the zero-shot context always computed (no cascade), plus the seconds
+    spent in get_context_probs. Used to train and evaluate the cascade and as the student's
+    teacher targets (return_text: also the cleaned / translated text the models saw).
+    None for empty text. Always computed locally with the teachers (not the model server).
+    """
+    if not _anchors_ready:
+        _init_local_anchors()
+    prepared = _prepare(text)
+    if prepared is None:
+        return None
+    _, _, processing_text = prepared
+    text_embedding = encode_texts(processing_text, normalize_embeddings=True)
+    similarity_scores = compute_similarity(text_embedding=text_embedding, anchor_embeddings=None)
+    sentiment = sentiment_scores(processing_text)
+    sarcasm = sarcasm_score(processing_text)
+    start = time.perf_counter()
+    context_probs = get_context_probs(processing_text)
+    context_s = time.perf_counter() - start
+    features = build_features(
+        similarity=similarity_scores,
+        sentiment=sentiment,
+        sarcasm=sarcasm,
+        context_probs=context_probs
+    )
+    if return_text:
+        return features, context_s, processing_text
+    return features, context_s
+
+def embed_text(text: str):
+    """Normalized embedding of text as classify() computes it (cleaned, translated); None if empty."""
+    remote = _remote(model_client.ModelClient.embed, [text])
+    if remote is not None:
+        return remote[0]
+    prepared = _prepare(text)
+    if prepared is None:
+        return None
+    return encode_texts(prepared[2], normalize_embeddings=True)
+
 # ---- ENTRY POINT ----
 if __name__ == "__main__":
     init_anchors()
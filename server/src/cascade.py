@@ -0,0 +1,76 @@
+import os
+import joblib
+import numpy as np
+
+from src.predict import clf as final_clf, model as final_model, margin_confidence
+from src.fast_predict import margin_confidence_batch
+
+# Stage one: anchor similarity + sentiment + sarcasm (features 0-8), no zero-shot NLI.
+# Stage two (the full 13-feature pipeline) only runs when stage one is not confident enough.
+STAGE_ONE_MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "stage_one_classifier.pkl")
+STAGE_ONE_FEATURES = 9
+# margin confidence (see predict.margin_confidence) needed to skip stage two
+CASCADE_THRESHOLD = float(os.environ.get("CASCADE_THRESHOLD", 0.6))
+# "auto": cascade only when a trained stage-one model exists, "1": always (falls back to the
+# final classifier with uninformative context), "0": never
+CASCADE_MODE = os.environ.get("CASCADE", "auto").lower()
+# what get_context_probs returns when it has no opinion
+NEUTRAL_CONTEXT = [0.25, 0.25, 0.25, 0.25]
+
+stage_one_clf = None
+if os.path.exists(STAGE_ONE_MODEL_PATH):
+    stage_one_clf = joblib.load(STAGE_ONE_MODEL_PATH)
+    print(f"[CASCADE] Loaded stage-one model from {STAGE_ONE_MODEL_PATH}")
+
+stats = {"stage_one": 0, "stage_two": 0}
+
+def enabled() -> bool:
+    if CASCADE_MODE in ("0", "false", "no", "off"):
+        return False
+    if CASCADE_MODE in ("1", "true", "yes", "on"):
+        return True
+    return stage_one_clf is not None
+
+def stage_one_proba(features: np.ndarray) -> np.ndarray:
+    """
+    Class probabilities from the first 9 features only
+    """
+    features = np.asarray(features, dtype=np.float32)[:STAGE_ONE_FEATURES]
+    if stage_one_clf is not None:
+        # the stage-one model may not have seen every class; keep LABELS indexing
+        probs = np.zeros(len(final_clf.classes_))
+        probs[stage_one_clf.classes_] = stage_one_clf.predict_proba([features])[0]
+        return probs
+    # no trained stage-one model: final classifier with the NLI features held neutral
+    full = np.concatenate([features, np.asarray(NEUTRAL_CONTEXT, dtype=np.float32)])
+    return final_model.predict_proba(full.reshape(1, -1))[0]
+
+def stage_one(features: np.ndarray, threshold: float = None):
+    """
+    Returns (label_idx, confidence, decisive); decisive means stage two can be skipped
+    """
+    threshold = CASCADE_THRESHOLD if threshold is None else threshold
+    label_idx, confidence = margin_confidence(stage_one_proba(features))
+    return label_idx, confidence, confidence >= threshold
+
+def stage_one_batch(X: np.ndarray, threshold: float = None):
+    """
+    stage_one for an N x 9 (or N x 13) feature matrix: (label indices, confidences, decisive mask)
+    """
+    threshold = CASCADE_THRESHOLD if threshold is None else threshold
+    X = np.asarray(X, dtype=np.float32)[:, :STAGE_ONE_FEATURES]
+    if stage_one_clf is not None:
+        probs = np.zeros((len(X), len(final_clf.classes_)))
+        probs[:, stage_one_clf.classes_] = stage_one_clf.predict_proba(X)
+    else:
+        full = np.hstack([X, np.tile(np.asarray(NEUTRAL_CONTEXT, dtype=np.float32), (len(X), 1))])
+        probs = final_model.predict_proba(full)
+    labels, confidence = margin_confidence_batch(probs)
+    return labels, confidence, confidence >= threshold
+
+def record(stage: int) -> None:
+    stats["stage_one" if stage == 1 else "stage_two"] += 1
+
+def skip_rate() -> float:
+    total = stats["stage_one"] + stats["stage_two"]
+    return stats["stage_one"] / total if total else 0.0
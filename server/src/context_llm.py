@@ -1,35 +1,41 @@
-from transformers import pipeline
-import torch
+from src import model_manager, model_snapshots
 
 print("context_llm module loaded (Zero-Shot BART)")
 
-# Global pipeline variable
-classifier = None
+MODEL_NAME = "valhalla/distilbart-mnli-12-3"
+model_snapshots.register("context", MODEL_NAME, "sequence_classification")
+
+def _load():
+    import torch
+    from transformers import pipeline
+    # Use CPU by default to be safe on Windows, or cuda if available
+    device = 0 if torch.cuda.is_available() else -1
+
+    print(f"[LLM] Loading {MODEL_NAME} (Distilled) for context analysis...")
+    # local safetensors snapshot when prepare_models.py made one (src/model_snapshots.py)
+    source = model_snapshots.source("context")
+    classifier = pipeline(
+        "zero-shot-classification",
+        model=source,
+        tokenizer=source,
+        device=device
+    )
+    print("[LLM] Context model loaded successfully.")
+    return classifier
+
+# loaded on first use and unloaded under memory pressure / when idle (src/model_manager.py)
+model_manager.register("context", _load, est_mb=1020)
 
 def load_context_model():
     """
     Lazy load the Zero-Shot Classification pipeline.
-    Uses facebook/bart-large-mnli.
+    Uses valhalla/distilbart-mnli-12-3.
     """
-    global classifier
-    if classifier is not None:
-        return
-
     try:
-        # Use CPU by default to be safe on Windows, or cuda if available
-        device = 0 if torch.cuda.is_available() else -1
-        
-        print("[LLM] Loading valhalla/distilbart-mnli-12-3 (Distilled) for context analysis...")
-        classifier = pipeline(
-            "zero-shot-classification",
-            model="valhalla/distilbart-mnli-12-3",
-            device=device
-        )
-        print("[LLM] Context model loaded successfully.")
+        model_manager.get("context")
     except Exception as e:
         print(f"[LLM] CRITICAL ERROR: {e}")
         # non-fatal, will just return neutral scores
-        pass
 
 def get_context_probs(text: str) -> list:
     """
@@ -42,14 +48,6 @@ def get_context_probs(text: str) -> list:
       3: "National Praise" (Pro-India)
     ]
     """
-    # Lazy load
-    if classifier is None:
-        load_context_model()
-
-    if classifier is None:
-        # Fallback if model failed to load
-        return [0.25, 0.25, 0.25, 0.25]
-
     labels = [
         "criticism of the government",   # 0
         "criticism of the country",      # 1
@@ -58,7 +56,9 @@ def get_context_probs(text: str) -> list:
     ]
 
     try:
-        result = classifier(text, candidate_labels=labels, multi_label=False)
+        # Lazy load
+        with model_manager.use("context") as classifier:
+            result = classifier(text, candidate_labels=labels, multi_label=False)
         
         # Result has 'labels' and 'scores' sorted by score descending.
         # We need to map them back to our fixed order [0, 1, 2, 3]
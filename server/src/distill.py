@@ -0,0 +1,188 @@
+"""
+Distil the four teacher models into the multi-task student (src/student.py).
+
+  targets  run the teachers (sentiment_analysis.full_features, context always computed) over a
+           corpus and cache text + 13 features + teacher seconds per post to an .npz; resumable,
+           re-running continues where the cache stops
+  train    fit the student on the cached targets (CPU, minutes), report fidelity on a held-out
+           split, refit on everything and save models/student.pkl with the held-out metrics
+  eval     fidelity of a saved student against any targets file
+
+Fidelity per head (MAE; Pearson r for similarity; argmax agreement for sentiment / nli;
+agreement at 0.5 for irony) and end to end: how often the final classifier (src/predict.py)
+gives the same stance from student features as from teacher features.
+Enable the student with FEATURE_BACKEND=student (sentiment_analysis.py).
+
+Usage (from server/):
+  python -m src.distill targets --corpus storage/latest/scraped_input.csv --out storage/distill/targets.npz
+  python -m src.distill train --targets storage/distill/targets.npz
+  python -m src.distill eval --targets storage/distill/other_targets.npz
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import joblib
+from sklearn.pipeline import make_pipeline, make_union
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import StandardScaler
+from sklearn.neural_network import MLPRegressor
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.student import STUDENT_MODEL_PATH, HEADS, encode_targets, features_from
+from src.train_stage_one import load_corpus_texts
+
+DEFAULT_TARGETS = os.path.join(os.path.dirname(__file__), "..", "storage", "distill", "targets.npz")
+# targets are saved every SAVE_EVERY posts so an interrupted run loses little
+SAVE_EVERY = 200
+
+# ---- targets ----
+def _load_targets(path: str):
+    data = np.load(path, allow_pickle=False)
+    return list(data["source"]), list(data["text"]), data["Y"], data["teacher_s"]
+
+def _save_targets(path: str, source, text, Y, teacher_s) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, source=np.asarray(source, dtype=str), text=np.asarray(text, dtype=str),
+             Y=np.asarray(Y, dtype=np.float32).reshape(-1, 13), teacher_s=np.asarray(teacher_s, dtype=np.float64))
+    os.replace(tmp, path)
+
+def record_targets(texts: list, out: str) -> None:
+    """
+    Teacher features for every text. source: the corpus text; text: what the models saw
+    (cleaned, translated), which is what the student is trained on.
+    """
+    source, seen, Y, teacher_s = [], [], [], []
+    if os.path.exists(out):
+        source, seen, Y, teacher_s = _load_targets(out)
+        Y, teacher_s = list(Y), list(teacher_s)
+    done = set(source)
+    todo = [t for t in texts if t not in done]
+    print(f">>> {len(done)} posts cached, {len(todo)} to run through the teachers")
+
+    import sentiment_analysis
+    sentiment_analysis.init_anchors()
+    for i, text in enumerate(todo):
+        start = time.perf_counter()
+        result = sentiment_analysis.full_features(text, return_text=True)
+        elapsed = time.perf_counter() - start
+        if result is not None:
+            features, _, processing_text = result
+            source.append(text)
+            seen.append(processing_text)
+            Y.append(features)
+            teacher_s.append(elapsed)
+        if (i + 1) % SAVE_EVERY == 0 or i + 1 == len(todo):
+            _save_targets(out, source, seen, Y, teacher_s)
+            print(f"  targets: {i + 1}/{len(todo)}")
+    print(f"Saved {len(source)} teacher targets to {out}")
+
+# ---- student ----
+def build_encoder(components: int):
+    tfidf = make_union(
+        TfidfVectorizer(analyzer="word", ngram_range=(1, 2), min_df=2, max_features=50000, sublinear_tf=True),
+        TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), min_df=2, max_features=50000, sublinear_tf=True),
+    )
+    return make_pipeline(tfidf, TruncatedSVD(n_components=components, random_state=0), StandardScaler())
+
+def train_student(texts: list, Y: np.ndarray, components: int = 256, hidden: int = 256) -> dict:
+    # the SVD cannot have more components than the smaller side of the TF-IDF matrix
+    components = max(2, min(components, len(texts) - 1))
+    encoder = build_encoder(components)
+    H = encoder.fit_transform(texts)
+    target_scaler = StandardScaler()
+    T = target_scaler.fit_transform(encode_targets(Y))
+    head = MLPRegressor(hidden_layer_sizes=(hidden,), alpha=1e-3, early_stopping=len(texts) >= 50,
+                        max_iter=300, random_state=0)
+    head.fit(H, T)
+    return {"encoder": encoder, "head": head, "target_scaler": target_scaler,
+            "heads": {k: [s.start, s.stop] for k, s in HEADS.items()}}
+
+def fidelity(X_student: np.ndarray, Y_teacher: np.ndarray) -> dict:
+    """Per-head and end-to-end agreement of student features with teacher features."""
+    from src.predict import predict_batch
+
+    metrics = {"posts": int(len(Y_teacher))}
+    for name, cols in HEADS.items():
+        s, t = X_student[:, cols], Y_teacher[:, cols]
+        head = {"mae": round(float(np.abs(s - t).mean()), 4)}
+        if name == "similarity":
+            r = [np.corrcoef(s[:, j], t[:, j])[0, 1] for j in range(s.shape[1]) if t[:, j].std() > 0]
+            head["pearson_r"] = round(float(np.mean(r)), 4) if r else None
+        elif name == "irony":
+            head["agreement"] = round(float(((s[:, 0] >= 0.5) == (t[:, 0] >= 0.5)).mean()), 4)
+        else:
+            head["argmax_agreement"] = round(float((s.argmax(1) == t.argmax(1)).mean()), 4)
+        metrics[name] = head
+    student_labels, _ = predict_batch(X_student)
+    teacher_labels, _ = predict_batch(Y_teacher)
+    metrics["stance_agreement"] = round(float((student_labels == teacher_labels).mean()), 4)
+    return metrics
+
+def cmd_targets(args):
+    texts = []
+    for path in args.corpus:
+        texts.extend(load_corpus_texts(path))
+    # dedupe, keep corpus order
+    texts = list(dict.fromkeys(texts))[:args.limit]
+    record_targets(texts, args.out)
+
+def cmd_train(args):
+    _, texts, Y, teacher_s = _load_targets(args.targets)
+    print(f">>> Training the student on {len(texts)} posts")
+    idx_train, idx_test = train_test_split(np.arange(len(texts)), test_size=0.2, random_state=0)
+    student = train_student([texts[i] for i in idx_train], Y[idx_train], args.components, args.hidden)
+
+    start = time.perf_counter()
+    X_test = features_from(student, [texts[i] for i in idx_test])
+    student_s = (time.perf_counter() - start) / max(len(idx_test), 1)
+    metrics = fidelity(X_test, Y[idx_test])
+    metrics["student_ms_per_post"] = round(student_s * 1000, 3)
+    metrics["teacher_ms_per_post"] = round(float(np.mean(teacher_s)) * 1000, 1)
+    print("Held-out fidelity:", json.dumps(metrics, indent=2))
+
+    # refit on everything for the saved model; the held-out numbers describe it
+    student = train_student(texts, Y, args.components, args.hidden)
+    student["fidelity"] = metrics
+    student["trained_on"] = len(texts)
+    student["trained_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    joblib.dump(student, args.out)
+    print(f"Saved student to {args.out}")
+
+def cmd_eval(args):
+    _, texts, Y, _ = _load_targets(args.targets)
+    student = joblib.load(args.model)
+    metrics = fidelity(features_from(student, texts), Y)
+    print(json.dumps(metrics, indent=2))
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("targets", help="run the teachers over a corpus")
+    p.add_argument("--corpus", required=True, action="append", help="CSV of posts (repeatable)")
+    p.add_argument("--limit", type=int, default=None)
+    p.add_argument("--out", default=DEFAULT_TARGETS)
+    p.set_defaults(func=cmd_targets)
+    p = sub.add_parser("train", help="fit the student on cached targets")
+    p.add_argument("--targets", default=DEFAULT_TARGETS)
+    p.add_argument("--components", type=int, default=256)
+    p.add_argument("--hidden", type=int, default=256)
+    p.add_argument("--out", default=STUDENT_MODEL_PATH)
+    p.set_defaults(func=cmd_train)
+    p = sub.add_parser("eval", help="fidelity of a saved student against targets")
+    p.add_argument("--targets", default=DEFAULT_TARGETS)
+    p.add_argument("--model", default=STUDENT_MODEL_PATH)
+    p.set_defaults(func=cmd_eval)
+    args = ap.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
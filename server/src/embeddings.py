@@ -1,8 +1,24 @@
-from sentence_transformers import SentenceTransformer
+from src import model_manager, model_snapshots
 
 print("embeddings module loaded")
 
 # Multilingual sentence embedding model
 EMBEDDING_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
 
-embedder = SentenceTransformer(EMBEDDING_MODEL_NAME)
+model_snapshots.register("embedder", EMBEDDING_MODEL_NAME, "sentence_transformer")
+
+def _load():
+    from sentence_transformers import SentenceTransformer
+    # local safetensors snapshot when prepare_models.py made one (src/model_snapshots.py)
+    return SentenceTransformer(model_snapshots.source("embedder"))
+
+# loaded on first use and unloaded under memory pressure / when idle (src/model_manager.py)
+model_manager.register("embedder", _load, est_mb=1110)
+
+def get_embedder():
+    return model_manager.get("embedder")
+
+def encode(*args, **kwargs):
+    """embedder.encode, with the model held resident for the call."""
+    with model_manager.use("embedder") as embedder:
+        return embedder.encode(*args, **kwargs)
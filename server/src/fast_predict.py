@@ -0,0 +1,85 @@
+import os
+import sys
+import numpy as np
+from scipy.special import expit
+
+# --------------------------------------------------
+# Logistic regression scoring in plain NumPy
+# --------------------------------------------------
+# Same arithmetic as sklearn's LogisticRegression.predict_proba (decision function, then softmax
+# for multinomial / expit + row normalisation for one-vs-rest), without per-call input validation,
+# so scoring an N x 13 matrix costs one matmul. Results match sklearn bit for bit.
+
+NPZ_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "final_classifier.npz")
+
+class LinearModel:
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray, classes: np.ndarray, mode: str):
+        # keep the fitted dtypes: sklearn scores with them as-is
+        self.coef = np.asarray(coef)
+        self.intercept = np.asarray(intercept)
+        self.classes = np.asarray(classes)
+        self.mode = mode    # "multinomial" | "ovr" | "binary"
+        self._coef_T = self.coef.T
+
+    @classmethod
+    def from_sklearn(cls, clf) -> "LinearModel":
+        if len(clf.classes_) <= 2:
+            mode = "binary"
+        elif getattr(clf, "multi_class", "auto") == "ovr" or getattr(clf, "solver", "") == "liblinear":
+            # older sklearn releases scored these one-vs-rest
+            mode = "ovr"
+        else:
+            mode = "multinomial"
+        return cls(clf.coef_, clf.intercept_, clf.classes_, mode)
+
+    @classmethod
+    def load(cls, path: str = NPZ_PATH) -> "LinearModel":
+        data = np.load(path, allow_pickle=False)
+        return cls(data["coef"], data["intercept"], data["classes"], str(data["mode"]))
+
+    def save(self, path: str = NPZ_PATH) -> None:
+        np.savez(path, coef=self.coef, intercept=self.intercept, classes=self.classes, mode=np.array(self.mode))
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        scores = X @ self._coef_T + self.intercept
+        return scores.reshape(-1) if scores.shape[1] == 1 else scores
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        X: N x n_features (float32 or float64); returns N x n_classes
+        """
+        scores = self.decision_function(X)
+        if self.mode == "multinomial":
+            scores -= scores.max(axis=1).reshape((-1, 1))
+            np.exp(scores, out=scores)
+            scores /= scores.sum(axis=1).reshape((-1, 1))
+            return scores
+        prob = expit(scores)
+        if prob.ndim == 1:
+            return np.stack([1 - prob, prob], axis=1)
+        prob_sum = prob.sum(axis=1)
+        all_zero = prob_sum == 0
+        if all_zero.any():
+            prob[all_zero, :] = 1
+            prob_sum[all_zero] = prob.shape[1]
+        prob /= prob_sum.reshape((prob.shape[0], -1))
+        return prob
+
+def margin_confidence_batch(probs: np.ndarray):
+    """
+    Row-wise predict.margin_confidence: (best index, (best - second) / best)
+    """
+    order = np.argsort(probs, axis=1)[:, ::-1]
+    rows = np.arange(len(probs))
+    best = probs[rows, order[:, 0]]
+    second = probs[rows, order[:, 1]]
+    return order[:, 0], (best - second) / best
+
+# ---- ENTRY POINT: export models/final_classifier.pkl as plain arrays ----
+if __name__ == "__main__":
+    import joblib
+    src = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(NPZ_PATH), "final_classifier.pkl")
+    dst = sys.argv[2] if len(sys.argv) > 2 else NPZ_PATH
+    model = LinearModel.from_sklearn(joblib.load(src))
+    model.save(dst)
+    print(f"Exported {src} -> {dst} ({model.mode}, coef {model.coef.shape})")
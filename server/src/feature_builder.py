@@ -29,3 +29,28 @@ def build_features(similarity: dict, sentiment: list, sarcasm: float, context_pr
     ]
 
     return np.array(features, dtype=np.float32)
+
+
+SIMILARITY_KEYS = ["pro_india", "anti_india", "pro_government", "anti_government", "neutral"]
+
+def build_feature_matrix(similarity, sentiment, sarcasm, context_probs) -> np.ndarray:
+    """
+    Columnar build_features for N posts: one N x 13 float32 matrix, same column order
+
+    similarity: N x 5 array (SIMILARITY_KEYS order) or list of N similarity dicts
+    sentiment: N x 3 [neg, neutral, pos]
+    sarcasm: N
+    context_probs: N x 4, or a single row of 4 shared by all posts
+    """
+    sarcasm = np.asarray(sarcasm, dtype=np.float32).reshape(-1)
+    n = len(sarcasm)
+    X = np.empty((n, 13), dtype=np.float32)
+    if isinstance(similarity, np.ndarray):
+        X[:, 0:5] = similarity
+    else:
+        for j, key in enumerate(SIMILARITY_KEYS):
+            X[:, j] = [s[key] for s in similarity]
+    X[:, 5:8] = sentiment
+    X[:, 8] = sarcasm
+    X[:, 9:13] = context_probs
+    return X
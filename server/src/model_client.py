@@ -0,0 +1,216 @@
+"""
+Client for the local model server (model_server.py).
+One model server process owns the embedder and the transformer models; API workers and CLI
+runs send it batched classify / embed requests over a Unix socket instead of loading their
+own copy. Messages are length-prefixed JSON; the embedding and feature arrays come back through
+a shared-memory buffer owned by the client (one per thread, grown as needed), not the socket.
+Enabled by MODEL_SERVER_SOCKET=<path>. When the server is unreachable the call fails with
+ModelServerUnavailable: loading a private copy of every model in each worker is what the
+server exists to avoid, so falling back to local models is opt-in (MODEL_SERVER_FALLBACK=1).
+With it, a worker that cannot connect uses its local models and retries the server after
+MODEL_SERVER_RETRY_S; a server that accepted the request but timed out is still up and busy,
+so a timeout fails the call instead of falling back.
+Unix sockets only: on platforms without AF_UNIX the client stays disabled.
+Expose: get() -> ModelClient or None, ModelServerUnavailable, send_msg/recv_msg, attach_shm
+"""
+
+import os,json,time,socket,struct,atexit,logging,threading
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("model_client")
+
+SOCKET_PATH = os.environ.get("MODEL_SERVER_SOCKET", "")
+# use the local models while the server is unreachable (off: requests fail instead)
+FALLBACK = os.environ.get("MODEL_SERVER_FALLBACK", "0").lower() in ("1", "true", "yes")
+RETRY_S = float(os.environ.get("MODEL_SERVER_RETRY_S", 30))
+# a deep batch (translation + the context model) can take minutes
+TIMEOUT_S = float(os.environ.get("MODEL_SERVER_TIMEOUT_S", 600))
+DTYPE = np.float32
+MIN_BUFFER_BYTES = 1 << 20
+_HEADER = struct.Struct("!I")
+
+class ModelServerUnavailable(Exception):
+    pass
+
+# ---- wire format (shared with model_server.py) ----
+def send_msg(sock: socket.socket, msg: dict) -> None:
+    data = json.dumps(msg).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+def _recv_exact(sock: socket.socket, n: int) -> Optional[bytes]:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
+
+def recv_msg(sock: socket.socket) -> Optional[dict]:
+    """Next message, None when the peer closed the connection."""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    data = _recv_exact(sock, _HEADER.unpack(header)[0])
+    if data is None:
+        return None
+    return json.loads(data.decode("utf-8"))
+
+def attach_shm(name: str) -> shared_memory.SharedMemory:
+    """Attach to another process's block without taking ownership (no unlink at our exit)."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: attaching registers the block with our resource tracker, undo that
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+class _Connection:
+    def __init__(self, path: str):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(TIMEOUT_S)
+        self.sock.connect(path)
+        hello = self.request({"op": "hello"})
+        self.dim = hello["dim"]
+        self.n_features = hello["features"]
+        self.shm: Optional[shared_memory.SharedMemory] = None
+
+    def request(self, msg: dict) -> dict:
+        send_msg(self.sock, msg)
+        reply = recv_msg(self.sock)
+        if reply is None:
+            raise ConnectionError("model server closed the connection")
+        return reply
+
+    def buffer(self, nbytes: int) -> shared_memory.SharedMemory:
+        if self.shm is None or self.shm.size < nbytes:
+            size = max(nbytes, MIN_BUFFER_BYTES, 2 * self.shm.size if self.shm else 0)
+            self.release()
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        return self.shm
+
+    def release(self) -> None:
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self) -> None:
+        self.release()
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+class ModelClient:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[_Connection] = []
+        self._lock = threading.Lock()
+        self.down_until = 0.0
+        atexit.register(self.close)
+
+    def _conn(self) -> _Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _Connection(self.path)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _drop(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+
+    def _call(self, op: str, texts: list, **options):
+        """(reply, embeddings N x dim, features N x F) for one batched request."""
+        try:
+            conn = self._conn()
+            n = len(texts)
+            emb_bytes = n * conn.dim * np.dtype(DTYPE).itemsize
+            shm = conn.buffer(emb_bytes + n * conn.n_features * np.dtype(DTYPE).itemsize)
+            reply = conn.request({"op": op, "texts": texts, "options": options, "shm": shm.name, "size": shm.size})
+        except socket.timeout as e:
+            # the server took the request and is still working on it: the connection is out of
+            # step now, but the server is up, so this is not a reason to load local models
+            self._drop()
+            raise RuntimeError(f"model server {self.path} timed out after {TIMEOUT_S:.0f}s") from e
+        except (OSError, ValueError) as e:
+            self._drop()
+            if FALLBACK:
+                self.down_until = time.monotonic() + RETRY_S
+                logger.warning("Model server %s unavailable (%s), using local models for %.0fs", self.path, e, RETRY_S)
+            else:
+                logger.warning("Model server %s unavailable: %s", self.path, e)
+            raise ModelServerUnavailable(str(e)) from e
+        if "error" in reply:
+            raise RuntimeError(f"model server: {reply['error']}")
+        # copies: the buffer is reused by the next call on this thread
+        embeddings = np.ndarray((n, conn.dim), dtype=DTYPE, buffer=shm.buf).copy()
+        features = np.ndarray((n, conn.n_features), dtype=DTYPE, buffer=shm.buf, offset=emb_bytes).copy()
+        return reply, embeddings, features
+
+    def classify_batch(self, texts: list, **options) -> list:
+        """sentiment_analysis.classify_batch results, computed by the server."""
+        reply, embeddings, features = self._call("classify_batch", texts, **options)
+        results = reply["results"]
+        for i, result in enumerate(results):
+            if "error" not in result:
+                result["features"] = [float(v) for v in features[i]]
+                result["embedding"] = None if result.pop("no_embedding", False) else embeddings[i]
+        return results
+
+    def embed(self, texts: list) -> list:
+        """sentiment_analysis.embed_text for each text (None for empty text)."""
+        reply, embeddings, _ = self._call("embed", texts)
+        return [embeddings[i] if ok else None for i, ok in enumerate(reply["ok"])]
+
+    def stats(self) -> dict:
+        """The server's model residency (src/model_manager.py stats)."""
+        try:
+            reply = self._conn().request({"op": "stats"})
+        except (OSError, ValueError) as e:
+            self._drop()
+            raise ModelServerUnavailable(str(e)) from e
+        return reply
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+_client: Optional[ModelClient] = None
+
+def get() -> Optional[ModelClient]:
+    """
+    The shared client, None when no model server is configured. With MODEL_SERVER_FALLBACK also
+    None while the server is unreachable or backing off, so the caller uses its local models.
+    """
+    global _client
+    if not SOCKET_PATH or not hasattr(socket, "AF_UNIX"):
+        return None
+    if FALLBACK and not os.path.exists(SOCKET_PATH):
+        return None
+    if _client is None:
+        _client = ModelClient(SOCKET_PATH)
+    if time.monotonic() < _client.down_until:
+        return None
+    return _client
+
+def disable() -> None:
+    """Used by the model server itself: always run the local models."""
+    global SOCKET_PATH
+    SOCKET_PATH = ""
@@ -0,0 +1,199 @@
+"""
+Memory-budgeted model residency.
+Every model (embedder, sentiment, sarcasm, context) is registered with a loader and loaded on
+first use. Models stay resident until
+  - loading another one would exceed MODEL_RAM_BUDGET_MB: least recently used models go first
+  - they were not used for MODEL_IDLE_TIMEOUT_S: a background thread unloads them
+Models in use (inside use()) are never evicted; when only in-use models are left, the load goes
+ahead over budget. A budget below the working set of one classify call (embedder + sentiment +
+sarcasm, + context on stage two) reloads models inside the run; classify_batch uses each model
+once per batch, so it thrashes far less than per-post classify().
+Sizes are measured after loading (parameters + buffers); the registered estimate is only used
+to make room for a model that has not been loaded yet.
+Expose: register(name, loader, est_mb), get(name), use(name), evict(name), evict_idle(), stats()
+"""
+
+import os,gc,time,logging,threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger("model_manager")
+
+# 0 = no budget (models stay until idle)
+RAM_BUDGET_MB = float(os.environ.get("MODEL_RAM_BUDGET_MB", 0))
+# 0 = never unload idle models
+IDLE_TIMEOUT_S = float(os.environ.get("MODEL_IDLE_TIMEOUT_S", 0))
+
+class _Entry:
+    def __init__(self, name: str, loader: Callable[[], object], est_mb: float):
+        self.name = name
+        self.loader = loader
+        self.est_mb = est_mb
+        self.model = None
+        self.size_mb: Optional[float] = None
+        self.last_used = 0.0
+        self.in_use = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_s: Optional[float] = None
+        self.load_lock = threading.Lock()
+
+    @property
+    def mb(self) -> float:
+        return self.size_mb if self.size_mb is not None else self.est_mb
+
+def size_mb(model) -> Optional[float]:
+    """Parameter + buffer bytes of the torch modules in model (a module, pipeline or tuple of them)."""
+    parts = model if isinstance(model, (tuple, list)) else (model,)
+    total, found = 0, False
+    for part in parts:
+        module = getattr(part, "model", part)
+        if hasattr(module, "parameters"):
+            found = True
+            total += sum(t.numel() * t.element_size() for t in module.parameters())
+            total += sum(t.numel() * t.element_size() for t in module.buffers())
+    return total / 1e6 if found else None
+
+def _release_memory() -> None:
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except Exception:
+        pass
+    # glibc keeps freed arenas mapped; hand them back so the RSS actually drops
+    try:
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except Exception:
+        pass
+
+class ModelManager:
+    def __init__(self, budget_mb: float = RAM_BUDGET_MB, idle_timeout_s: float = IDLE_TIMEOUT_S):
+        self.budget_mb = budget_mb
+        self.idle_timeout_s = idle_timeout_s
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+
+    def register(self, name: str, loader: Callable[[], object], est_mb: float) -> None:
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _Entry(name, loader, est_mb)
+
+    def resident_mb(self) -> float:
+        return sum(e.mb for e in self._entries.values() if e.model is not None)
+
+    def get(self, name: str):
+        """The loaded model (loads it when needed). Prefer use() while running inference."""
+        with self.use(name) as model:
+            return model
+
+    @contextmanager
+    def use(self, name: str):
+        """Pin the model for the duration of the block, so no other load evicts it mid-inference."""
+        entry = self._entries[name]
+        with self._lock:
+            entry.in_use += 1
+        try:
+            if entry.model is None:
+                self._load(entry)
+            entry.last_used = time.monotonic()
+            yield entry.model
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    def _load(self, entry: _Entry) -> None:
+        with entry.load_lock:
+            if entry.model is not None:
+                return
+            self._make_room(entry)
+            start = time.perf_counter()
+            model = entry.loader()
+            entry.load_s = round(time.perf_counter() - start, 2)
+            entry.size_mb = size_mb(model) or entry.size_mb
+            with self._lock:
+                entry.model = model
+                entry.loads += 1
+            logger.info("Loaded model %s (%.0f MB) in %.1fs, %.0f MB resident", entry.name, entry.mb,
+                        entry.load_s, self.resident_mb())
+        self._start_reaper()
+
+    def _make_room(self, entry: _Entry) -> None:
+        if self.budget_mb <= 0:
+            return
+        while True:
+            with self._lock:
+                over = self.resident_mb() + entry.mb - self.budget_mb
+                if over <= 0:
+                    return
+                candidates = [e for e in self._entries.values()
+                              if e.model is not None and e.in_use == 0 and e is not entry]
+                if not candidates:
+                    logger.warning("Model %s needs %.0f MB over the %.0f MB budget, every resident model is in use",
+                                   entry.name, over, self.budget_mb)
+                    return
+                victim = min(candidates, key=lambda e: e.last_used)
+            self.evict(victim.name, "budget")
+
+    def evict(self, name: str, reason: str = "manual") -> bool:
+        entry = self._entries[name]
+        with self._lock:
+            if entry.model is None or entry.in_use:
+                return False
+            entry.model = None
+            entry.evictions += 1
+        _release_memory()
+        logger.info("Evicted model %s (%.0f MB, %s), %.0f MB resident", name, entry.mb, reason, self.resident_mb())
+        return True
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        if self.idle_timeout_s <= 0:
+            return 0
+        now = time.monotonic() if now is None else now
+        idle = [e.name for e in list(self._entries.values())
+                if e.model is not None and e.in_use == 0 and now - e.last_used >= self.idle_timeout_s]
+        return sum(self.evict(name, "idle") for name in idle)
+
+    def _start_reaper(self) -> None:
+        if self.idle_timeout_s <= 0 or self._reaper is not None:
+            return
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap, name="model-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap(self) -> None:
+        while True:
+            time.sleep(max(min(self.idle_timeout_s / 4, 30.0), 1.0))
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.warning("Idle eviction failed: %s", e)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            models = {e.name: {"resident": e.model is not None, "size_mb": round(e.mb, 1),
+                               "measured": e.size_mb is not None, "in_use": e.in_use,
+                               "loads": e.loads, "evictions": e.evictions, "load_s": e.load_s,
+                               "idle_s": round(now - e.last_used, 1) if e.last_used else None}
+                      for e in self._entries.values()}
+        return {"budget_mb": self.budget_mb, "idle_timeout_s": self.idle_timeout_s,
+                "resident_mb": round(self.resident_mb(), 1),
+                "loads": sum(m["loads"] for m in models.values()),
+                "evictions": sum(m["evictions"] for m in models.values()),
+                "models": models}
+
+# the process-wide manager every src model module registers with
+manager = ModelManager()
+register = manager.register
+get = manager.get
+use = manager.use
+evict = manager.evict
+evict_idle = manager.evict_idle
+stats = manager.stats
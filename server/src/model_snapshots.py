@@ -0,0 +1,95 @@
+"""
+Local model snapshot cache.
+Every transformer the classifier uses is stored once under MODEL_SNAPSHOT_DIR/<name>/ as
+safetensors weights + config + tokenizer (prepare_models.py populates it offline). Loaders then
+read the snapshot instead of resolving the hub id: no network round trips, no pickle
+checkpoints (the cardiffnlp models only publish pytorch_model.bin), and from_pretrained maps
+the safetensors file into memory instead of copying it, so the weights are file-backed pages
+shared by every process on the host (forked workers included) and only paged in when touched.
+A snapshot is used when its manifest names the same hub id the module asks for; otherwise the
+loader falls back to the hub id as before.
+Expose: register(name, hub_id, kind, **tokenizer_kwargs), source(name), prepare(name), snapshot_dir(name)
+"""
+
+import os,json,time,shutil,logging
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger("model_snapshots")
+
+SNAPSHOT_DIR = Path(os.environ.get("MODEL_SNAPSHOT_DIR",
+                                   Path(__file__).resolve().parent.parent / "models" / "snapshots"))
+MANIFEST = "manifest.json"
+# kind -> how prepare() saves it
+KINDS = ("sequence_classification", "sentence_transformer")
+
+_registry: Dict[str, dict] = {}
+
+def register(name: str, hub_id: str, kind: str, **tokenizer_kwargs) -> None:
+    if kind not in KINDS:
+        raise ValueError(f"Unknown snapshot kind {kind!r}")
+    _registry[name] = {"hub_id": hub_id, "kind": kind, "tokenizer_kwargs": tokenizer_kwargs}
+
+def registered() -> Dict[str, dict]:
+    return dict(_registry)
+
+def snapshot_dir(name: str) -> Optional[Path]:
+    """The snapshot of name, None when it is missing, incomplete or of another hub id."""
+    path = SNAPSHOT_DIR / name
+    try:
+        manifest = json.loads((path / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if manifest.get("hub_id") != _registry[name]["hub_id"]:
+        return None
+    return path
+
+def source(name: str) -> str:
+    """What to pass to from_pretrained / SentenceTransformer: the snapshot, else the hub id."""
+    path = snapshot_dir(name)
+    if path is None:
+        logger.info("No snapshot for %s, loading %s (run prepare_models.py)", name, _registry[name]["hub_id"])
+        return _registry[name]["hub_id"]
+    return str(path)
+
+def prepare(name: str, force: bool = False) -> Path:
+    """Download (or read from the hub cache) and store name as a safetensors snapshot."""
+    spec = _registry[name]
+    final = SNAPSHOT_DIR / name
+    if not force and snapshot_dir(name) is not None:
+        logger.info("Snapshot %s is up to date", name)
+        return final
+    tmp = SNAPSHOT_DIR / f".{name}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    start = time.perf_counter()
+    if spec["kind"] == "sentence_transformer":
+        from sentence_transformers import SentenceTransformer
+        SentenceTransformer(spec["hub_id"]).save(str(tmp))
+        weights = list(tmp.rglob("*.safetensors"))
+    else:
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        AutoTokenizer.from_pretrained(spec["hub_id"], **spec["tokenizer_kwargs"]).save_pretrained(str(tmp))
+        # safetensors is the default serialization (transformers >= 4.35)
+        AutoModelForSequenceClassification.from_pretrained(spec["hub_id"]).save_pretrained(str(tmp))
+        weights = list(tmp.glob("*.safetensors"))
+    if not weights:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise RuntimeError(f"Snapshot of {name} has no safetensors weights (transformers too old?)")
+
+    import transformers
+    files = {str(p.relative_to(tmp)): p.stat().st_size for p in tmp.rglob("*") if p.is_file()}
+    manifest = {"name": name, "hub_id": spec["hub_id"], "kind": spec["kind"],
+                "created_at": time.strftime("%Y-%m-%d %H:%M:%S"), "transformers": transformers.__version__,
+                "files": files}
+    (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    # swap in whole: a reader sees the old snapshot or the new one, never a partial one
+    old = SNAPSHOT_DIR / f".{name}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if final.exists():
+        os.replace(final, old)
+    os.replace(tmp, final)
+    shutil.rmtree(old, ignore_errors=True)
+    logger.info("Snapshot %s: %d files, %.0f MB in %.1fs", name, len(files), sum(files.values()) / 1e6,
+                time.perf_counter() - start)
+    return final
@@ -0,0 +1,135 @@
+import os
+import re
+import zlib
+import numpy as np
+
+# --------------------------------------------------
+# MinHash-LSH near-duplicate grouping
+# --------------------------------------------------
+# Crossposts / copy-pastes differ only in a few words (urls are already stripped by clean_text),
+# so word 3-gram shingles of near-identical posts have a high Jaccard similarity.
+# Signature: NUM_PERM min-hashes; LSH: BANDS bands of NUM_PERM/BANDS rows, candidates that share
+# a band bucket are confirmed when the estimated Jaccard (fraction of equal min-hashes) >= threshold.
+
+NEAR_DUP_THRESHOLD = float(os.environ.get("NEAR_DUP_THRESHOLD", 0.8))
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_WORDS = 3
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, _PRIME, NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, NUM_PERM).astype(np.uint64)
+_WORD_RE = re.compile(r"\w+")
+
+def shingles(text: str) -> set:
+    """
+    Word 3-grams of the lower-cased text (the whole text for posts shorter than that)
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+def minhash(text: str):
+    """
+    MinHash signature (uint64[NUM_PERM]) or None for texts without words
+    """
+    sh = shingles(text)
+    if not sh:
+        return None
+    # crc32 is stable across processes (unlike hash()), values < 2^32 keep a*x within uint64
+    x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in sh), dtype=np.uint64, count=len(sh)) % _PRIME
+    return ((np.outer(x, _A) + _B) % _PRIME).min(axis=0)
+
+class NearDuplicateIndex:
+    """
+    Incremental index: add(text) returns the position of the representative (earliest added
+    near-identical text) so a streaming consumer can classify only the first copy.
+    window > 0 keeps only the last `window` texts matchable, so memory stays bounded whatever the
+    input size: a copy of something further back starts a new group. A representative whose
+    group has no text left in the window is appended to `closed` for the consumer to forget.
+    A text that bridges two groups merges the later one into the earlier: (other, root) is
+    appended to `merged` so the consumer can fold the state it keeps for `other` into `root`.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, window: int = 0):
+        self.threshold = threshold
+        self.window = window
+        self.rows = NUM_PERM // BANDS
+        self.buckets = [dict() for _ in range(BANDS)]
+        # position -> signature / representative, for the texts still in the window
+        self.signatures = {}
+        self.rep = {}
+        # representative -> positions of its group still in the window
+        self.members = {}
+        self.added = 0
+        self.closed = []
+        self.merged = []
+
+    def find(self, i: int) -> int:
+        return self.rep[i]
+
+    def _union(self, i: int, j: int) -> None:
+        ri, rj = self.rep[i], self.rep[j]
+        if ri == rj:
+            return
+        # the earliest item stays the representative
+        root, other = min(ri, rj), max(ri, rj)
+        moved = self.members.pop(other)
+        for k in moved:
+            self.rep[k] = root
+        self.members[root] |= moved
+        # the text being added has not been handed out as a representative yet
+        if other != self.added - 1:
+            self.merged.append((other, root))
+
+    def _keys(self, sig) -> list:
+        return [sig[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(BANDS)]
+
+    def add(self, text: str) -> int:
+        idx = self.added
+        self.added += 1
+        sig = minhash(text or "")
+        self.signatures[idx] = sig
+        self.rep[idx] = idx
+        self.members[idx] = {idx}
+        if sig is not None:
+            keys = self._keys(sig)
+            candidates = set()
+            for band, key in zip(self.buckets, keys):
+                candidates.update(band.get(key, ()))
+            for c in sorted(candidates):
+                if np.mean(self.signatures[c] == sig) >= self.threshold:
+                    self._union(idx, c)
+            for band, key in zip(self.buckets, keys):
+                band.setdefault(key, []).append(idx)
+        rep = self.rep[idx]
+        if self.window and len(self.signatures) > self.window:
+            self._forget(idx - self.window)
+        return rep
+
+    def _forget(self, i: int) -> None:
+        sig = self.signatures.pop(i)
+        if sig is not None:
+            for band, key in zip(self.buckets, self._keys(sig)):
+                # positions are appended and forgotten in order: i is the oldest in every bucket
+                bucket = band[key]
+                del bucket[0]
+                if not bucket:
+                    del band[key]
+        rep = self.rep.pop(i)
+        group = self.members[rep]
+        group.discard(i)
+        if not group:
+            del self.members[rep]
+            self.closed.append(rep)
+
+def group_near_duplicates(texts: list, threshold: float = NEAR_DUP_THRESHOLD) -> list:
+    """
+    Representative position for every text (itself when it has no earlier near-duplicate)
+    """
+    index = NearDuplicateIndex(threshold)
+    for text in texts:
+        index.add(text)
+    return [index.find(i) for i in range(len(texts))]
@@ -1,18 +1,20 @@
 import joblib
 import numpy as np
 
+from src.fast_predict import LinearModel, margin_confidence_batch
+
 print("predict module loaded")
 
 MODEL_PATH = "models/final_classifier.pkl"
 
 clf = joblib.load(MODEL_PATH)
+# same coefficients as plain arrays; scores without sklearn's per-call validation
+model = LinearModel.from_sklearn(clf)
 
-def predict(features: np.ndarray):
+def margin_confidence(probs: np.ndarray):
     """
-    Predict stance label and confidence
+    (best - second best) / best, the confidence predict() reports
     """
-    probs = clf.predict_proba([features])[0]
-
     sorted_idx = np.argsort(probs)[::-1]
     best = sorted_idx[0]
     second = sorted_idx[1]
@@ -20,3 +22,16 @@ def predict(features: np.ndarray):
     confidence = (probs[best] - probs[second]) / probs[best]
 
     return best, float(confidence)
+
+def predict(features: np.ndarray):
+    """
+    Predict stance label and confidence
+    """
+    probs = model.predict_proba(np.asarray(features).reshape(1, -1))[0]
+    return margin_confidence(probs)
+
+def predict_batch(X: np.ndarray):
+    """
+    Vectorised predict for an N x 13 matrix: (label indices, confidences)
+    """
+    return margin_confidence_batch(model.predict_proba(X))
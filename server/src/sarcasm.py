@@ -1,34 +1,50 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from src import model_manager, model_snapshots
 
 print("sarcasm module loaded (BERT Sarcasm Detector)")
 
 # FIX: Use a Twitter-based Irony model (RoBERTa) which is better for social media/Reddit
 MODEL_NAME = "cardiffnlp/twitter-roberta-base-irony"
-
-try:
-    # FIX: Force use_fast=False to avoid Windows rust-tokenizer crashes
-    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, use_fast=False)
-    model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
-    model.eval()
-except Exception as e:
-    print(f"CRITICAL ERROR loading sarcasm model: {e}")
-    raise e
-
-
-def sarcasm_score(text: str) -> float:
+# token limit; callers under a time budget pass a shorter one (run_budget.py)
+MAX_LENGTH = 128
+
+# the snapshot stores the slow (Python) tokenizer _load asks for
+model_snapshots.register("sarcasm", MODEL_NAME, "sequence_classification", use_fast=False)
+
+def _load():
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    try:
+        # FIX: Force use_fast=False to avoid Windows rust-tokenizer crashes
+        # local safetensors snapshot when prepare_models.py made one (src/model_snapshots.py)
+        source = model_snapshots.source("sarcasm")
+        tok = AutoTokenizer.from_pretrained(source, use_fast=False)
+        mdl = AutoModelForSequenceClassification.from_pretrained(source)
+        mdl.eval()
+    except Exception as e:
+        print(f"CRITICAL ERROR loading sarcasm model: {e}")
+        raise e
+    return tok, mdl
+
+# loaded on first use and unloaded under memory pressure / when idle (src/model_manager.py)
+model_manager.register("sarcasm", _load, est_mb=500)
+
+def load_model():
+    model_manager.get("sarcasm")
+
+
+def sarcasm_score(text: str, max_length: int = None) -> float:
     """
     Deep sarcasm probability (0-1).
     Uses helinivan/english-sarcasm-detector (BERT-based).
     """
 
-    with torch.no_grad():
+    import torch
+    with model_manager.use("sarcasm") as (tokenizer, model), torch.no_grad():
         inputs = tokenizer(
             text,
             return_tensors="pt",
             truncation=True,
             padding=True,
-            max_length=128
+            max_length=max_length or MAX_LENGTH
         )
 
         outputs = model(**inputs)
@@ -1,35 +1,51 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from src import model_manager, model_snapshots
 
 print("sentiment module loaded (English RoBERTa)")
 
 # FIX: Use the standard (older) model which definitely has support for slow tokenizers
 # The 'latest' version sometimes lacks full file support for use_fast=False on all setups
 MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment"
+# token limit; callers under a time budget pass a shorter one (run_budget.py)
+MAX_LENGTH = 128
 
-try:
-    # FIX: Force use_fast=False to avoid Windows rust-tokenizer crashes
-    # This uses the stable Python-based tokenizer (Byte-Level BPE)
-    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, use_fast=False)
-    model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
-    model.eval()
-except Exception as e:
-    print(f"CRITICAL ERROR loading sentiment model: {e}")
-    raise e
+# the snapshot stores the slow (Python) tokenizer _load asks for
+model_snapshots.register("sentiment", MODEL_NAME, "sequence_classification", use_fast=False)
 
+def _load():
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    try:
+        # FIX: Force use_fast=False to avoid Windows rust-tokenizer crashes
+        # This uses the stable Python-based tokenizer (Byte-Level BPE)
+        # local safetensors snapshot when prepare_models.py made one (src/model_snapshots.py)
+        source = model_snapshots.source("sentiment")
+        tok = AutoTokenizer.from_pretrained(source, use_fast=False)
+        mdl = AutoModelForSequenceClassification.from_pretrained(source)
+        mdl.eval()
+    except Exception as e:
+        print(f"CRITICAL ERROR loading sentiment model: {e}")
+        raise e
+    return tok, mdl
 
-def sentiment_scores(text: str):
+# loaded on first use and unloaded under memory pressure / when idle (src/model_manager.py)
+model_manager.register("sentiment", _load, est_mb=500)
+
+def load_model():
+    model_manager.get("sentiment")
+
+
+def sentiment_scores(text: str, max_length: int = None):
     """
     Returns sentiment probabilities as:
     [negative, neutral, positive]
     """
-    with torch.no_grad():
+    import torch
+    with model_manager.use("sentiment") as (tokenizer, model), torch.no_grad():
         inputs = tokenizer(
             text,
             return_tensors="pt",
             truncation=True,
             padding=True,
-            max_length=128
+            max_length=max_length or MAX_LENGTH
         )
         outputs = model(**inputs)
         probs = torch.softmax(outputs.logits, dim=1)
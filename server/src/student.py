@@ -0,0 +1,89 @@
+"""
+Multi-task student: the 13 stance features (src/feature_builder.py) from one CPU forward pass
+instead of four transformer passes (mpnet + anchors, sentiment RoBERTa, irony RoBERTa, NLI).
+Trained by src/distill.py on teacher targets.
+
+Shared encoder: word + char n-gram TF-IDF -> TruncatedSVD -> hidden layer (MLPRegressor); the
+output layer is split into one head per teacher. Heads regress a transformed target so every
+output is unbounded and on a similar scale (targets standardized on top):
+  similarity  features 0-4   raw cosine, clipped to [-1, 1] on the way out
+  sentiment   features 5-7   centered log-probabilities, softmax on the way out
+  irony       feature  8     logit, sigmoid on the way out
+  nli         features 9-12  centered log-probabilities, softmax on the way out
+The student has no sentence embedding: results it produces carry "embedding": None.
+Expose: STUDENT_MODEL_PATH, HEADS, encode_targets(Y), decode_outputs(Z), available(), load(),
+features_from(student, texts), predict_features(texts)
+"""
+
+import os
+import numpy as np
+
+from src import model_manager
+
+STUDENT_MODEL_PATH = os.environ.get(
+    "STUDENT_MODEL_PATH", os.path.join(os.path.dirname(__file__), "..", "models", "student.pkl"))
+HEADS = {
+    "similarity": slice(0, 5),
+    "sentiment": slice(5, 8),
+    "irony": slice(8, 9),
+    "nli": slice(9, 13),
+}
+N_FEATURES = 13
+EPS = 1e-4
+
+def _log_probs(P: np.ndarray) -> np.ndarray:
+    L = np.log(np.clip(P, EPS, 1.0))
+    return L - L.mean(axis=1, keepdims=True)
+
+def _softmax(Z: np.ndarray) -> np.ndarray:
+    Z = Z - Z.max(axis=1, keepdims=True)
+    E = np.exp(Z)
+    return E / E.sum(axis=1, keepdims=True)
+
+def encode_targets(Y: np.ndarray) -> np.ndarray:
+    """N x 13 teacher features -> N x 13 regression targets."""
+    Y = np.asarray(Y, dtype=np.float64)
+    T = np.empty_like(Y)
+    T[:, HEADS["similarity"]] = Y[:, HEADS["similarity"]]
+    T[:, HEADS["sentiment"]] = _log_probs(Y[:, HEADS["sentiment"]])
+    p = np.clip(Y[:, HEADS["irony"]], EPS, 1 - EPS)
+    T[:, HEADS["irony"]] = np.log(p / (1 - p))
+    T[:, HEADS["nli"]] = _log_probs(Y[:, HEADS["nli"]])
+    return T
+
+def decode_outputs(Z: np.ndarray) -> np.ndarray:
+    """N x 13 regression outputs -> N x 13 features in build_features' layout (float32)."""
+    Z = np.asarray(Z, dtype=np.float64)
+    X = np.empty((len(Z), N_FEATURES), dtype=np.float32)
+    X[:, HEADS["similarity"]] = np.clip(Z[:, HEADS["similarity"]], -1.0, 1.0)
+    X[:, HEADS["sentiment"]] = _softmax(Z[:, HEADS["sentiment"]])
+    X[:, HEADS["irony"]] = 1.0 / (1.0 + np.exp(-Z[:, HEADS["irony"]]))
+    X[:, HEADS["nli"]] = _softmax(Z[:, HEADS["nli"]])
+    return X
+
+def _load():
+    import joblib
+    return joblib.load(STUDENT_MODEL_PATH)
+
+# a few MB of sklearn arrays; registered so /models shows it next to the teachers
+model_manager.register("student", _load, est_mb=60)
+
+def available() -> bool:
+    return os.path.exists(STUDENT_MODEL_PATH)
+
+def load() -> dict:
+    """{"encoder", "head", "target_scaler", "fidelity", ...} as saved by src/distill.py."""
+    return model_manager.get("student")
+
+def features_from(student: dict, texts: list) -> np.ndarray:
+    """N x 13 features from a loaded student for N (cleaned, English) texts, one batched pass."""
+    if not texts:
+        return np.zeros((0, N_FEATURES), dtype=np.float32)
+    H = student["encoder"].transform(texts)
+    Z = student["target_scaler"].inverse_transform(student["head"].predict(H).reshape(len(texts), -1))
+    return decode_outputs(Z)
+
+def predict_features(texts: list) -> np.ndarray:
+    """features_from with the saved student (models/student.pkl)."""
+    with model_manager.use("student") as student:
+        return features_from(student, texts)
@@ -0,0 +1,100 @@
+"""
+Fit and evaluate the stance classifier straight from the feature store (feature_store.py),
+no transformer re-runs: seconds instead of hours.
+
+Targets: the label each post was published with, overridden by analyst corrections
+(POST /corrections). --corrected-only trains on corrected posts alone (supervised);
+--correction-weight up-weights corrected posts when mixing them with the published labels.
+Every post is used once (its newest row). Rows where the cascade skipped the zero-shot model
+(stage one) are left out by default: their context features are placeholders, and a model
+fitted on them learns to ignore the context. --include-stage-one keeps them, weighted by
+--stage-one-weight.
+
+Usage (from server/):
+  python -m src.train_from_store                       # fit + report, writes a candidate model
+  python -m src.train_from_store --install             # replace models/final_classifier.pkl
+"""
+
+import os
+import sys
+import shutil
+import argparse
+import numpy as np
+import joblib
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import feature_store
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "..", "models")
+FINAL_MODEL_PATH = os.path.join(MODELS_DIR, "final_classifier.pkl")
+CANDIDATE_PATH = os.path.join(MODELS_DIR, "final_classifier.candidate.pkl")
+
+def training_set(store, full_only=True, corrected_only=False):
+    """
+    (X, y, corrected mask, stage-one mask, post ids) from the store's newest row per post
+    """
+    rows = store.latest_rows()
+    if full_only:
+        rows = rows[store.stages[rows] == 2]
+    corrections = feature_store.corrections(store.store_dir)
+    ids = [store.post_ids[i] for i in rows]
+    y = np.array([corrections.get(pid, store.labels[i]) for pid, i in zip(ids, rows)], dtype=np.int64)
+    corrected = np.array([pid in corrections for pid in ids], dtype=bool)
+    stage_one = np.asarray(store.stages[rows] == 1, dtype=bool)
+    keep = (y >= 0) & (corrected if corrected_only else True)
+    return (np.asarray(store.features[rows[keep]]), y[keep], corrected[keep], stage_one[keep],
+            [p for p, k in zip(ids, keep) if k])
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--include-stage-one", action="store_true",
+                    help="also train on rows scored by cascade stage one (placeholder context features)")
+    ap.add_argument("--stage-one-weight", type=float, default=0.2)
+    ap.add_argument("--corrected-only", action="store_true")
+    ap.add_argument("--correction-weight", type=float, default=5.0)
+    ap.add_argument("--test-size", type=float, default=0.2)
+    ap.add_argument("--out", default=CANDIDATE_PATH)
+    ap.add_argument("--install", action="store_true", help="replace the serving model (old one kept as .bak)")
+    args = ap.parse_args()
+
+    store = feature_store.load()
+    X, y, corrected, stage_one, _ = training_set(store, not args.include_stage_one, args.corrected_only)
+    print(f"Feature store: {store.rows} rows, {len(store.segments)} runs; training on {len(X)} posts "
+          f"({int(corrected.sum())} analyst-corrected, {int(stage_one.sum())} stage-one)")
+    if len(np.unique(y)) < 2:
+        print("Need at least two classes to train.")
+        return
+
+    # an analyst label outweighs the placeholder-context caveat
+    weights = np.where(corrected, args.correction_weight, np.where(stage_one, args.stage_one_weight, 1.0))
+    stratify = y if np.bincount(y).min() >= 2 else None
+    X_train, X_test, y_train, y_test, w_train, _, c_train, c_test = train_test_split(
+        X, y, weights, corrected, test_size=args.test_size, random_state=42, stratify=stratify)
+
+    # same estimator as src/train_classifier.py
+    clf = LogisticRegression(max_iter=2000)
+    clf.fit(X_train, y_train, sample_weight=w_train)
+    pred = clf.predict(X_test)
+    print(f"Held-out accuracy: {accuracy_score(y_test, pred):.4f}  macro-F1: {f1_score(y_test, pred, average='macro'):.4f}")
+    if c_test.any():
+        print(f"Held-out accuracy on corrected posts: {accuracy_score(y_test[c_test], pred[c_test]):.4f} "
+              f"({int(c_test.sum())} posts)")
+    if os.path.exists(FINAL_MODEL_PATH):
+        current = joblib.load(FINAL_MODEL_PATH)
+        base = current.predict(X_test)
+        print(f"Current model held-out accuracy: {accuracy_score(y_test, base):.4f}  "
+              f"agreement with new model: {(base == pred).mean():.4f}")
+
+    # refit on everything for the saved model
+    clf.fit(X, y, sample_weight=weights)
+    out = FINAL_MODEL_PATH if args.install else args.out
+    if args.install and os.path.exists(FINAL_MODEL_PATH):
+        shutil.copy2(FINAL_MODEL_PATH, FINAL_MODEL_PATH + ".bak")
+    joblib.dump(clf, out)
+    print(f"Saved model to {out}")
+
+if __name__ == "__main__":
+    main()
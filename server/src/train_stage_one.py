@@ -0,0 +1,119 @@
+"""
+Train the cascade's stage-one model (src/cascade.py).
+Stage one sees features 0-8 only (anchor similarity, sentiment, sarcasm). Its targets are the
+labels the full 13-feature pipeline assigns on a reference corpus, so "stage one is confident"
+means "the zero-shot context would not change the answer". Probabilities are calibrated
+(CalibratedClassifierCV, sigmoid) because the cascade thresholds on them.
+
+Usage (from server/):
+  python -m src.train_stage_one --corpus storage/latest/scraped_input.csv --limit 2000
+"""
+
+import os
+import csv
+import hashlib
+import argparse
+import numpy as np
+import joblib
+from sklearn.linear_model import LogisticRegression
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.model_selection import train_test_split
+
+from src.cascade import STAGE_ONE_MODEL_PATH, STAGE_ONE_FEATURES
+
+def load_corpus_texts(path: str, limit: int = None) -> list:
+    """
+    Texts from a scraped_input.csv (Title/Comments/Description) or any CSV with a text column.
+    """
+    texts = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if "Title" in row:
+                parts = [row.get("Title") or "", row.get("Description") or ""]
+                text = " ".join(p for p in parts if p and p.strip())
+            else:
+                text = row.get("text") or row.get("clean_text") or ""
+            if text.strip():
+                texts.append(text)
+            if limit and len(texts) >= limit:
+                break
+    return texts
+
+def texts_digest(texts: list) -> str:
+    h = hashlib.sha256()
+    for text in texts:
+        h.update(text.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+def corpus_features(texts: list, cache_path: str = None):
+    """
+    Full-pipeline features for every text with any left after cleaning: (X [N x 13],
+    context_seconds [N]). Cached to cache_path (.npz) because the transformers make this the
+    slow part; the cache is only reused for exactly the same texts (sha256 of the list).
+    """
+    digest = texts_digest(texts)
+    if cache_path and os.path.exists(cache_path):
+        data = np.load(cache_path)
+        if "texts_sha256" in data and str(data["texts_sha256"]) == digest:
+            print(f"Using cached features from {cache_path}")
+            return data["X"], data["context_s"]
+        print(f"Cached features in {cache_path} are for other texts, recomputing")
+
+    import sentiment_analysis
+    sentiment_analysis.init_anchors()
+    rows, context_s = [], []
+    for i, text in enumerate(texts):
+        out = sentiment_analysis.full_features(text)
+        if out is None:
+            continue
+        rows.append(out[0])
+        context_s.append(out[1])
+        if (i + 1) % 100 == 0:
+            print(f"  features: {i + 1}/{len(texts)}")
+    X = np.asarray(rows, dtype=np.float32)
+    context_s = np.asarray(context_s, dtype=np.float64)
+    if cache_path:
+        np.savez(cache_path, X=X, context_s=context_s, texts_sha256=np.array(digest))
+    return X, context_s
+
+def train_stage_one(X: np.ndarray, y: np.ndarray):
+    base = LogisticRegression(max_iter=2000)
+    # calibration needs a few samples of every class per fold
+    if np.bincount(y).min() >= 3:
+        clf = CalibratedClassifierCV(base, method="sigmoid", cv=3)
+    else:
+        print("[WARN] Too few samples for some classes, skipping calibration")
+        clf = base
+    clf.fit(X[:, :STAGE_ONE_FEATURES], y)
+    return clf
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", required=True, help="CSV of reference posts")
+    ap.add_argument("--limit", type=int, default=None)
+    ap.add_argument("--features-cache", default=None, help=".npz to reuse computed features")
+    ap.add_argument("--out", default=STAGE_ONE_MODEL_PATH)
+    args = ap.parse_args()
+
+    from src.predict import clf as final_clf
+
+    texts = load_corpus_texts(args.corpus, args.limit)
+    print(f">>> Computing full-pipeline features for {len(texts)} posts...")
+    X, _ = corpus_features(texts, args.features_cache)
+    # teacher labels: what the full pipeline (with zero-shot context) predicts
+    y = final_clf.predict(X)
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=0)
+    clf = train_stage_one(X_train, y_train)
+    agreement = float((clf.predict(X_test[:, :STAGE_ONE_FEATURES]) == y_test).mean()) if len(y_test) else 0.0
+    print(f"Held-out agreement with the full pipeline (no cascade threshold): {agreement:.4f}")
+
+    # refit on everything for the saved model
+    clf = train_stage_one(X, y)
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    joblib.dump(clf, args.out)
+    print(f"Saved stage-one model to {args.out}")
+
+if __name__ == "__main__":
+    main()
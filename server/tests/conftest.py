@@ -0,0 +1,10 @@
+"""
+Unit tests for the pure-logic modules (no models, no network).
+Run from server/:  python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+# the server modules import each other as top-level modules (main.py, processor.py, ...)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,89 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import embedding_store
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+DIM = 4
+
+def _rows(n: int, offset: int = 0):
+    vectors = np.eye(DIM, dtype=np.float32)[[(offset + i) % DIM for i in range(n)]]
+    posts = [{"post_id": f"p{offset + i}", "title": f"post {offset + i}"} for i in range(n)]
+    return vectors, posts
+
+def test_commit_makes_rows_searchable(tmp_path):
+    writer = embedding_store.RunWriter("run-1", store_dir=tmp_path)
+    writer.write(*_rows(2))
+    writer.write(*_rows(2, offset=2))
+    # staged rows are invisible until the segment is written
+    assert embedding_store.SimilarityIndex(tmp_path).rows == 0
+    assert writer.commit() == 4
+    index = embedding_store.SimilarityIndex(tmp_path)
+    assert index.rows == 4
+    assert index.post("p2")["run_id"] == "run-1"
+    np.testing.assert_array_equal(index.vector_for("p3"), np.eye(DIM, dtype=np.float32)[3])
+    assert [p["post_id"] for p in index.search(np.eye(DIM, dtype=np.float32)[1], k=1)] == ["p1"]
+
+def test_abort_drops_staged_rows(tmp_path):
+    embedding_store.append_run("run-1", *_rows(2), store_dir=tmp_path)
+    writer = embedding_store.RunWriter("run-2", store_dir=tmp_path)
+    writer.write(*_rows(3, offset=2))
+    writer.abort()
+    assert (tmp_path / embedding_store.EMBEDDINGS_FILE).stat().st_size == 2 * DIM * 4
+    assert len((tmp_path / embedding_store.POSTS_FILE).read_text().splitlines()) == 2
+    embedding_store.append_run("run-3", *_rows(1, offset=9), store_dir=tmp_path)
+    index = embedding_store.SimilarityIndex(tmp_path)
+    assert [p["post_id"] for p in index.posts] == ["p0", "p1", "p9"]
+    assert [s["start"] for s in embedding_store._segments(tmp_path)] == [0, 2]
+
+def test_dim_mismatch_is_rejected(tmp_path):
+    embedding_store.append_run("run-1", *_rows(1), store_dir=tmp_path)
+    with pytest.raises(ValueError):
+        embedding_store.append_run("run-2", np.ones((1, DIM + 1), dtype=np.float32), [{"post_id": "x"}],
+                                   store_dir=tmp_path)
+    # the failed writer gave the slot back
+    assert embedding_store.append_run("run-3", *_rows(1, offset=1), store_dir=tmp_path) == 1
+
+@pytest.mark.skipif(embedding_store.fcntl is None, reason="no cross-process writer lock without fcntl")
+def test_staging_writer_holds_the_cross_process_lock(tmp_path):
+    fcntl = embedding_store.fcntl
+    writer = embedding_store.RunWriter("run-1", store_dir=tmp_path)
+    writer.write(*_rows(1))
+    with open(tmp_path / embedding_store.WRITER_LOCK_FILE, "a+b") as other:
+        with pytest.raises(OSError):
+            fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        writer.commit()
+        fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+@pytest.mark.skipif(embedding_store.fcntl is None, reason="no cross-process writer lock without fcntl")
+def test_writer_in_another_process_waits_for_commit(tmp_path):
+    writer = embedding_store.RunWriter("run-1", store_dir=tmp_path)
+    writer.write(*_rows(2))
+    child = subprocess.Popen([sys.executable, "-c", textwrap.dedent(f"""
+        from pathlib import Path
+        import numpy as np
+        import embedding_store
+        print("started", flush=True)
+        embedding_store.append_run("run-2", np.ones((3, {DIM}), dtype=np.float32),
+                                   [{{"post_id": f"q{{i}}"}} for i in range(3)], store_dir=Path({str(tmp_path)!r}))
+    """)], cwd=SERVER_DIR, stdout=subprocess.PIPE, text=True)
+    try:
+        assert child.stdout.readline().strip() == "started"
+        with pytest.raises(subprocess.TimeoutExpired):
+            child.wait(0.5)
+        # still ours: the other process has neither truncated nor interleaved anything
+        writer.write(*_rows(1, offset=2))
+        assert writer.commit() == 3
+        assert child.wait(10) == 0
+    finally:
+        if child.poll() is None:
+            child.kill()
+    assert [(s["run_id"], s["start"], s["count"]) for s in embedding_store._segments(tmp_path)] == [
+        ("run-1", 0, 3), ("run-2", 3, 3)]
+    index = embedding_store.SimilarityIndex(tmp_path)
+    assert [p["post_id"] for p in index.posts] == ["p0", "p1", "p2", "q0", "q1", "q2"]
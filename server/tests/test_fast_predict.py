@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from src.fast_predict import LinearModel, margin_confidence_batch
+
+def _data(n_classes: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((300, 13))
+    y = (X[:, :n_classes] + 0.5 * rng.standard_normal((300, n_classes))).argmax(axis=1)
+    return X, y
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_predict_proba_matches_sklearn(n_classes, dtype):
+    X, y = _data(n_classes)
+    clf = LogisticRegression(max_iter=1000).fit(X, y)
+    model = LinearModel.from_sklearn(clf)
+    Xt = X[:50].astype(dtype)
+    np.testing.assert_array_equal(model.predict_proba(Xt), clf.predict_proba(Xt))
+    np.testing.assert_array_equal(model.classes[model.predict_proba(Xt).argmax(axis=1)], clf.predict(Xt))
+
+def test_save_and_load_round_trip(tmp_path):
+    X, y = _data(3)
+    clf = LogisticRegression(max_iter=1000).fit(X, y)
+    path = str(tmp_path / "model.npz")
+    LinearModel.from_sklearn(clf).save(path)
+    loaded = LinearModel.load(path)
+    assert loaded.mode == "multinomial"
+    np.testing.assert_array_equal(loaded.predict_proba(X), LinearModel.from_sklearn(clf).predict_proba(X))
+
+def test_margin_confidence_batch():
+    best, margin = margin_confidence_batch(np.array([[0.2, 0.5, 0.3], [0.6, 0.1, 0.3]]))
+    assert best.tolist() == [1, 0]
+    np.testing.assert_allclose(margin, [0.4, 0.5])
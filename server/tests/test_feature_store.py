@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+import feature_store
+from src.train_from_store import training_set
+
+def _rows(n: int, offset: int = 0):
+    ids = [f"p{offset + i}" for i in range(n)]
+    features = np.arange(n * 13, dtype=np.float32).reshape(n, 13) + offset
+    return ids, features, ["Neutral"] * n, [2] * n
+
+def test_commit_makes_rows_visible(tmp_path):
+    writer = feature_store.RunWriter("run-1", version="v1", store_dir=tmp_path)
+    writer.write(*_rows(3))
+    writer.write(*_rows(2, offset=3))
+    # staged rows are invisible until the segment is written
+    assert feature_store.load(tmp_path).rows == 0
+    assert writer.commit() == 5
+    store = feature_store.load(tmp_path)
+    assert store.rows == 5
+    assert store.post_ids == [f"p{i}" for i in range(5)]
+    np.testing.assert_array_equal(store.features[3], _rows(1, offset=3)[1][0])
+    assert store.segments[0]["run_id"] == "run-1" and store.segments[0]["model_version"] == "v1"
+
+def test_abort_drops_staged_rows(tmp_path):
+    feature_store.append_run("run-1", *_rows(2), version="v1", store_dir=tmp_path)
+    writer = feature_store.RunWriter("run-2", version="v1", store_dir=tmp_path)
+    writer.write(*_rows(4, offset=2))
+    writer.abort()
+    assert (tmp_path / feature_store.FEATURES_FILE).stat().st_size == 2 * 13 * 4
+    feature_store.append_run("run-3", *_rows(1, offset=9), version="v1", store_dir=tmp_path)
+    store = feature_store.load(tmp_path)
+    assert store.post_ids == ["p0", "p1", "p9"]
+    assert [s["start"] for s in store.segments] == [0, 2]
+
+def test_crash_leftovers_are_truncated_by_the_next_writer(tmp_path):
+    feature_store.append_run("run-1", *_rows(2), version="v1", store_dir=tmp_path)
+    crashed = feature_store.RunWriter("run-2", version="v1", store_dir=tmp_path)
+    crashed.write(*_rows(3, offset=2))
+    # the process dies: the slot is freed, the rows stay on disk
+    feature_store._release_writer(crashed._lock_file)
+    feature_store.append_run("run-3", *_rows(1, offset=7), version="v1", store_dir=tmp_path)
+    store = feature_store.load(tmp_path)
+    assert store.post_ids == ["p0", "p1", "p7"]
+    assert store.features.shape == (3, 13)
+
+def test_mismatched_lengths_are_rejected(tmp_path):
+    ids, features, labels, stages = _rows(3)
+    with pytest.raises(ValueError):
+        feature_store.RunWriter("run-1", store_dir=tmp_path).write(ids[:2], features, labels, stages)
+
+@pytest.mark.skipif(feature_store.fcntl is None, reason="no cross-process writer lock without fcntl")
+def test_staging_writer_holds_the_cross_process_lock(tmp_path):
+    fcntl = feature_store.fcntl
+    writer = feature_store.RunWriter("run-1", version="v1", store_dir=tmp_path)
+    writer.write(*_rows(1))
+    with open(tmp_path / feature_store.WRITER_LOCK_FILE, "a+b") as other:
+        with pytest.raises(OSError):
+            fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        writer.commit()
+        fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+def test_training_set_leaves_out_stage_one_rows_by_default(tmp_path):
+    ids = ["a", "b", "c"]
+    features = np.ones((3, 13), dtype=np.float32)
+    feature_store.append_run("run-1", ids, features, ["Neutral", "Pro-India", "Anti-India"], [2, 1, 2],
+                             version="v1", store_dir=tmp_path)
+    store = feature_store.load(tmp_path)
+    X, y, corrected, stage_one, post_ids = training_set(store)
+    assert post_ids == ["a", "c"] and not stage_one.any()
+    X, y, corrected, stage_one, post_ids = training_set(store, full_only=False)
+    assert post_ids == ["a", "b", "c"] and stage_one.tolist() == [False, True, False]
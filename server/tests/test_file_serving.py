@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+
+from artifacts import http_date
+from file_serving import ArtifactResponse, if_range_matches, parse_range_header, MAX_RANGES
+
+def test_no_or_malformed_header_serves_full_file():
+    assert parse_range_header(None, 100) is None
+    assert parse_range_header("items=0-5", 100) is None
+    assert parse_range_header("bytes=5", 100) is None
+    assert parse_range_header("bytes=9-3", 100) is None
+
+def test_single_open_and_suffix_ranges():
+    assert parse_range_header("bytes=0-9", 100) == [(0, 9)]
+    assert parse_range_header("bytes=90-", 100) == [(90, 99)]
+    assert parse_range_header("bytes=-10", 100) == [(90, 99)]
+    # end past the file is clamped, suffix longer than the file is the whole file
+    assert parse_range_header("bytes=95-500", 100) == [(95, 99)]
+    assert parse_range_header("bytes=-500", 100) == [(0, 99)]
+
+def test_unsatisfiable_ranges():
+    assert parse_range_header("bytes=100-", 100) == []
+    assert parse_range_header("bytes=200-300", 100) == []
+
+def test_overlapping_and_adjacent_ranges_are_merged():
+    assert parse_range_header("bytes=50-59,0-9,5-20,21-30", 100) == [(0, 30), (50, 59)]
+
+def test_too_many_ranges_serves_full_file():
+    spec = ",".join(f"{i * 2}-{i * 2}" for i in range(MAX_RANGES + 1))
+    assert parse_range_header(f"bytes={spec}", 1000) is None
+
+def test_if_range():
+    etag, mtime = '"abc"', 1700000000.0
+    assert if_range_matches(None, etag, mtime)
+    assert if_range_matches('"abc"', etag, mtime)
+    assert not if_range_matches('"other"', etag, mtime)
+    # weak validators never match
+    assert not if_range_matches('W/"abc"', etag, mtime)
+    assert if_range_matches(http_date(mtime), etag, mtime)
+    assert not if_range_matches(http_date(mtime + 60), etag, mtime)
+
+def _request(headers=None):
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "headers": raw, "path": "/", "query_string": b""})
+
+def _serve(response, fail_after=None):
+    messages = []
+
+    async def send(message):
+        if fail_after is not None and len(messages) >= fail_after:
+            raise OSError("client went away")
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    asyncio.run(response(_scope(), receive, send))
+    return messages
+
+def _scope():
+    return {"type": "http", "extensions": {}}
+
+def test_range_response_body(tmp_path):
+    path = tmp_path / "a.bin"
+    path.write_bytes(bytes(range(100)))
+    response = ArtifactResponse(path, _request({"Range": "bytes=10-19"}))
+    messages = _serve(response)
+    assert messages[0]["status"] == 206
+    assert b"".join(m.get("body", b"") for m in messages[1:]) == bytes(range(10, 20))
+
+def test_background_runs_when_the_client_disconnects(tmp_path):
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"x" * 10)
+    released = []
+    response = ArtifactResponse(path, _request(), background=BackgroundTask(released.append, "run"))
+    with pytest.raises(OSError):
+        _serve(response, fail_after=1)
+    assert released == ["run"]
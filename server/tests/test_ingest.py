@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+import ingest
+from ingest import IngestResponse, LineSplitter, parse_line
+
+def _split(chunks, max_bytes=64):
+    splitter = LineSplitter(max_bytes)
+    lines = [line for chunk in chunks for line in splitter.feed(chunk)]
+    return lines + splitter.close()
+
+def test_lines_across_chunk_boundaries():
+    assert _split([b'{"a":', b'1}\n{"b"', b':2}\n']) == [(1, b'{"a":1}'), (2, b'{"b":2}')]
+
+def test_blank_lines_are_skipped_but_counted():
+    assert _split([b"x\n\n  \ny\n"]) == [(1, b"x"), (4, b"y")]
+
+def test_last_line_without_newline():
+    assert _split([b"x\ny"]) == [(1, b"x"), (2, b"y")]
+    assert _split([b"x\n  "]) == [(1, b"x")]
+
+def test_crlf_is_stripped():
+    assert _split([b"x\r\ny\r\n"]) == [(1, b"x"), (2, b"y")]
+
+def test_over_long_line_is_reported_once_and_skipped():
+    long_line = b"z" * 100
+    # the line overflows the buffer before its newline arrives
+    assert _split([b"a\n", long_line[:70], long_line[70:] + b"\nb\n"], max_bytes=64) == [
+        (1, b"a"), (2, None), (3, b"b")]
+    # and arrives in one piece
+    assert _split([b"a\n" + long_line + b"\nb\n"], max_bytes=64) == [(1, b"a"), (2, None), (3, b"b")]
+    # without a trailing newline
+    assert _split([b"a\n" + long_line], max_bytes=64) == [(1, b"a"), (2, None)]
+
+def test_parse_line():
+    line_no, row, error = parse_line(3, b'{"Title": "t", "Score": 5, "Author": null}')
+    assert (line_no, error) == (3, None)
+    assert row["Title"] == "t" and row["Score"] == "5" and row["Author"] == "" and row["Url"] == ""
+    assert parse_line(4, b"[1, 2]")[2] == "Expected a JSON object"
+    assert parse_line(5, b"{nope")[2].startswith("Invalid JSON")
+
+def test_response_streams_results_in_input_order(monkeypatch):
+    def classify_rows(items):
+        return [{"line": n, "error": e} if e else {"line": n, "title": row["Title"]} for n, row, e in items]
+
+    monkeypatch.setattr(ingest, "classify_rows", classify_rows)
+    body = b'{"Title": "a"}\nnot json\n{"Title": "b"}\n\n{"Title": "c"}'
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+
+    async def scenario():
+        messages = [{"type": "http.request", "body": c, "more_body": i < len(chunks) - 1} for i, c in enumerate(chunks)]
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        response = IngestResponse(batch_rows=2, queue_batches=1)
+        await response({"type": "http"}, receive, send)
+        return sent, response.stats
+
+    sent, stats = asyncio.run(scenario())
+    assert sent[0]["status"] == 200
+    assert not sent[-1]["more_body"]
+    lines = [json.loads(l) for m in sent[1:] for l in m.get("body", b"").decode().splitlines()]
+    assert [l["line"] for l in lines] == [1, 2, 3, 5]
+    assert [l.get("title") for l in lines] == ["a", None, "b", "c"]
+    assert stats["lines"] == 4 and stats["errors"] == 1 and stats["batches"] == 2
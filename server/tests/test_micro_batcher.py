@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from micro_batcher import MicroBatcher, percentile
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile(range(1, 101), 99) == 99
+    assert percentile([7], 99) == 7
+
+def test_concurrent_requests_share_batches():
+    batches = []
+
+    def batch_fn(items):
+        batches.append(list(items))
+        time.sleep(0.02)
+        return [item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(batch_fn, max_wait_ms=20, max_batch=4)
+        try:
+            results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        finally:
+            await batcher.stop()
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == [i * 2 for i in range(10)]
+    assert [len(b) for b in batches] == [4, 4, 2]
+    # each item in one batch, in submission order
+    assert [i for b in batches for i in b] == list(range(10))
+    assert stats["requests"] == 10 and stats["batches"] == 3 and stats["largest_batch"] == 4
+    assert stats["latency_ms"]["p50"] is not None
+
+def test_lone_request_waits_at_most_max_wait():
+    async def scenario():
+        batcher = MicroBatcher(lambda items: items, max_wait_ms=30, max_batch=32)
+        try:
+            start = time.perf_counter()
+            result = await batcher.submit("x")
+            return result, time.perf_counter() - start
+        finally:
+            await batcher.stop()
+
+    result, elapsed = asyncio.run(scenario())
+    assert result == "x"
+    assert 0.025 <= elapsed < 1.0
+
+def test_batch_error_reaches_every_caller_and_the_worker_keeps_going():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        if len(calls) == 1:
+            raise ValueError("model failed")
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher(batch_fn, max_wait_ms=10, max_batch=8)
+        try:
+            failed = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+            ok = await batcher.submit(3)
+        finally:
+            await batcher.stop()
+        return failed, ok, batcher.stats()
+
+    failed, ok, stats = asyncio.run(scenario())
+    assert all(isinstance(e, ValueError) for e in failed)
+    assert ok == 3
+    assert stats["failed_batches"] == 1
+
+def test_wrong_result_count_is_an_error():
+    async def scenario():
+        batcher = MicroBatcher(lambda items: items[:-1], max_wait_ms=5, max_batch=8)
+        try:
+            return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    assert all(isinstance(e, RuntimeError) for e in asyncio.run(scenario()))
+
+def test_cancelled_caller_is_dropped_from_the_batch():
+    seen = []
+
+    def batch_fn(items):
+        seen.extend(items)
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher(batch_fn, max_wait_ms=30, max_batch=8)
+        try:
+            gone = asyncio.create_task(batcher.submit("gone"))
+            await asyncio.sleep(0)
+            gone.cancel()
+            return await batcher.submit("kept")
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(scenario()) == "kept"
+    assert seen == ["kept"]
@@ -0,0 +1,62 @@
+import socket
+import threading
+
+import pytest
+
+from src import model_client
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="model server needs Unix sockets")
+
+@pytest.fixture
+def configured(tmp_path, monkeypatch):
+    path = str(tmp_path / "ms.sock")
+    monkeypatch.setattr(model_client, "SOCKET_PATH", path)
+    monkeypatch.setattr(model_client, "_client", None)
+    return path
+
+def test_no_fallback_by_default(configured, monkeypatch):
+    monkeypatch.setattr(model_client, "FALLBACK", False)
+    client = model_client.get()
+    # configured but not running: the client is still handed out and the call fails loudly
+    assert client is not None
+    with pytest.raises(model_client.ModelServerUnavailable):
+        client.embed(["text"])
+    assert model_client.get() is client
+
+def test_fallback_when_opted_in(configured, monkeypatch):
+    monkeypatch.setattr(model_client, "FALLBACK", True)
+    assert model_client.get() is None
+    open(configured, "w").close()
+    client = model_client.get()
+    with pytest.raises(model_client.ModelServerUnavailable):
+        client.embed(["text"])
+    # backing off: callers use their local models
+    assert model_client.get() is None
+
+def test_timeout_never_falls_back(configured, monkeypatch):
+    monkeypatch.setattr(model_client, "FALLBACK", True)
+    monkeypatch.setattr(model_client, "TIMEOUT_S", 0.2)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(configured)
+    server.listen()
+    accepted = []
+
+    def serve():
+        conn, _ = server.accept()
+        accepted.append(conn)
+        model_client.recv_msg(conn)
+        model_client.send_msg(conn, {"dim": 4, "features": 13})
+        # takes the request, never answers
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    try:
+        client = model_client.get()
+        with pytest.raises(RuntimeError, match="timed out"):
+            client.embed(["text"])
+        assert model_client.get() is client
+    finally:
+        thread.join(2)
+        for conn in accepted:
+            conn.close()
+        server.close()
@@ -0,0 +1,49 @@
+from src.near_duplicates import NearDuplicateIndex, group_near_duplicates, minhash
+
+POST = "the government announced a new farm policy for small farmers in punjab today after protests"
+
+def test_copies_map_to_the_earliest():
+    texts = [POST, "completely unrelated cricket match report from the weekend", POST + " via", POST]
+    assert group_near_duplicates(texts) == [0, 1, 0, 0]
+
+def test_different_posts_stay_apart():
+    texts = [f"post number {i} about topic {i * 7} with words {i * 13}" for i in range(20)]
+    assert group_near_duplicates(texts) == list(range(20))
+
+def test_texts_without_words_are_their_own_group():
+    assert minhash("!!! ...") is None
+    assert group_near_duplicates(["", "", POST]) == [0, 1, 2]
+
+def test_bridging_text_merges_groups_into_the_earliest():
+    # Jaccard a~bridge and b~bridge 0.58, a~b 0.31
+    a = " ".join(f"w{i}" for i in range(40))
+    b = " ".join(f"w{i}" for i in range(20, 60))
+    bridge = " ".join(f"w{i}" for i in range(10, 50))
+    index = NearDuplicateIndex(threshold=0.6)
+    assert [index.add(t) for t in (a, b)] == [0, 1]
+    assert index.add(bridge) == 0
+    assert index.find(1) == 0
+    assert index.merged == [(1, 0)]
+
+def test_merged_group_closes_once_under_its_root():
+    a = " ".join(f"w{i}" for i in range(40))
+    b = " ".join(f"w{i}" for i in range(20, 60))
+    bridge = " ".join(f"w{i}" for i in range(10, 50))
+    index = NearDuplicateIndex(threshold=0.6, window=3)
+    for t in (a, b, bridge, "x", "y", "z"):
+        index.add(t)
+    # b's representative was merged away, only the root is left to forget
+    assert index.merged == [(1, 0)]
+    assert index.closed == [0]
+    assert set(index.members) == {3, 4, 5}
+
+def test_window_forgets_old_posts_and_reports_closed_groups():
+    index = NearDuplicateIndex(window=3)
+    reps = [index.add(t) for t in (POST, POST, "a", "b", "c", POST)]
+    # the last copy is four posts after the group's last member: a new group
+    assert reps == [0, 0, 2, 3, 4, 5]
+    # POST's group when its second copy left the window, then "a"
+    assert index.closed == [0, 2]
+    assert len(index.signatures) == 3
+    assert all(index.buckets[b] for b in range(len(index.buckets)))
+    assert sum(len(v) for band in index.buckets for v in band.values()) <= 3 * len(index.buckets)
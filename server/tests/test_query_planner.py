@@ -0,0 +1,58 @@
+import pytest
+
+import query_planner
+from query_planner import QueryPlanner
+
+@pytest.fixture
+def planner(tmp_path):
+    return QueryPlanner(tmp_path / "query_stats.json")
+
+def _members(plans):
+    return sorted(m for p in plans for m in p.members)
+
+def test_narrower_queries_fold_into_the_broader_one(planner):
+    [plan] = planner.plan(["india protest", "india farmers protest", "protest india delhi"], 50)
+    assert plan.expression == "india protest"
+    assert sorted(plan.members) == ["india farmers protest", "india protest", "protest india delhi"]
+    assert plan.limit == 150
+    assert plan.keywords == ["delhi", "farmers", "india", "protest"]
+
+def test_packing_respects_clause_and_length_limits(planner, monkeypatch):
+    monkeypatch.setattr(query_planner, "MAX_CLAUSES", 3)
+    queries = [f"topic{i} word{i}" for i in range(7)]
+    plans = planner.plan(queries, 10)
+    assert [len(p.members) for p in plans] == [3, 3, 1]
+    assert plans[0].expression.count(" OR ") == 2
+    assert all(p.expression.startswith("(") for p in plans[:2])
+    # a single clause is sent bare
+    assert not plans[2].expression.startswith("(")
+    assert _members(plans) == sorted(queries)
+
+    monkeypatch.setattr(query_planner, "MAX_CLAUSES", 100)
+    monkeypatch.setattr(query_planner, "MAX_QUERY_CHARS", 60)
+    plans = planner.plan(queries, 10)
+    assert all(len(p.expression) <= 60 for p in plans)
+    assert _members(plans) == sorted(queries)
+
+def test_budget_is_capped(planner, monkeypatch):
+    monkeypatch.setattr(query_planner, "MAX_GROUP_LIMIT", 120)
+    [plan] = planner.plan(["india", "india army", "india navy"], 100)
+    assert plan.limit == 120
+
+def test_low_yield_queries_go_last_with_a_small_budget(planner):
+    good, bad = "kashmir news", "cricket score"
+    for _ in range(2):
+        for query, kept in ((good, 40), (bad, 0)):
+            planned = query_planner.PlannedQuery(query, 100, [query], query.split())
+            planner.observe(planned, 100, [{"title": query}] * kept)
+    assert planner.query_yield(good) == pytest.approx(0.4)
+    assert planner.query_yield(bad) == 0
+    plans = planner.plan([bad, good], 100)
+    assert [p.members for p in plans] == [[good], [bad]]
+    assert plans[1].limit < plans[0].limit
+
+def test_stats_round_trip(planner, tmp_path):
+    planned = query_planner.PlannedQuery("modi", 100, ["modi"], ["modi"])
+    planner.observe(planned, 10, [{"title": "modi rally"}] * 5)
+    planner.save()
+    assert QueryPlanner(tmp_path / "query_stats.json").stats == planner.stats
@@ -0,0 +1,66 @@
+import pytest
+
+from reddit_scrapper import RedditSearchFetcher, TokenBucket
+
+class _Resp:
+    def __init__(self, status_code, headers=None, body=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._body = body or {}
+
+    def json(self):
+        return self._body
+
+class _Http:
+    def __init__(self, fail_get=False):
+        self.fail_get = fail_get
+
+    def post(self, url, **kwargs):
+        return _Resp(200, body={"access_token": "t", "expires_in": 3600})
+
+    def get(self, url, **kwargs):
+        if self.fail_get:
+            raise ConnectionError("connection reset")
+        return _Resp(200, {"X-Ratelimit-Remaining": "50", "X-Ratelimit-Reset": "100"},
+                     {"data": {"children": [], "after": None}})
+
+@pytest.fixture(autouse=True)
+def credentials(monkeypatch):
+    monkeypatch.setenv("REDDIT_CLIENT_ID", "id")
+    monkeypatch.setenv("REDDIT_CLIENT_SECRET", "secret")
+
+def test_headers_resync_the_bucket():
+    bucket = TokenBucket(rate=1.0, capacity=5.0)
+    bucket.acquire()
+    bucket.acquire()
+    assert bucket.in_flight == 2
+    bucket.update_from_headers({"x-ratelimit-remaining": "10", "x-ratelimit-reset": "5"})
+    assert bucket.in_flight == 1
+    assert bucket.rate == 2.0
+    # the request still in flight will spend one of the remaining ten
+    assert bucket.tokens == 9
+
+def test_exhausted_budget_blocks_until_reset():
+    bucket = TokenBucket()
+    bucket.acquire()
+    bucket.update_from_headers({"x-ratelimit-remaining": "0", "x-ratelimit-reset": "30"})
+    assert bucket.tokens == 0
+    assert bucket.blocked_until > 0
+
+def test_successful_request_leaves_nothing_in_flight():
+    fetcher = RedditSearchFetcher(http_client=_Http())
+    assert fetcher.search("india", 10) == []
+    assert fetcher.limiter.in_flight == 0
+
+def test_failed_request_is_no_longer_in_flight():
+    fetcher = RedditSearchFetcher(http_client=_Http(fail_get=True))
+    with pytest.raises(ConnectionError):
+        fetcher.search("india", 10)
+    assert fetcher.limiter.in_flight == 0
+
+def test_failed_token_request_is_no_longer_in_flight(monkeypatch):
+    monkeypatch.delenv("REDDIT_CLIENT_SECRET")
+    fetcher = RedditSearchFetcher(http_client=_Http())
+    with pytest.raises(EnvironmentError):
+        fetcher.search("india", 10)
+    assert fetcher.limiter.in_flight == 0
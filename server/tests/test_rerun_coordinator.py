@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+import pytest
+
+from rerun_coordinator import RerunCoordinator
+
+class _Pipeline:
+    """run_fn that blocks until released, recording the intents it ran."""
+
+    def __init__(self):
+        self.ran = []
+        self.release = threading.Event()
+        self.error = None
+
+    def __call__(self, intent):
+        self.ran.append(intent)
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return {"intent": intent}
+
+async def _until(predicate):
+    for _ in range(200):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+def test_coalescing_decisions():
+    async def scenario():
+        pipeline = _Pipeline()
+        coordinator = RerunCoordinator(pipeline)
+        first = asyncio.create_task(coordinator.submit("medium"))
+        await _until(lambda: pipeline.ran)
+        others = [asyncio.create_task(coordinator.submit(i)) for i in ("light", "medium", "deep", "light", "deep")]
+        await asyncio.sleep(0.05)
+        pipeline.release.set()
+        return pipeline.ran, await first, await asyncio.gather(*others)
+
+    ran, (result, info), others = asyncio.run(scenario())
+    assert ran == ["medium", "deep"]
+    assert info["decision"] == "started" and result == {"intent": "medium"}
+    assert [i["decision"] for _, i in others] == ["attached", "attached", "queued", "attached", "attached_queued"]
+    assert [r["intent"] for r, _ in others] == ["medium", "medium", "deep", "medium", "deep"]
+    assert others[0][1]["coalesced_callers"] == 4
+    assert others[2][1]["coalesced_callers"] == 2
+
+def test_queued_job_is_superseded_by_a_higher_intent():
+    async def scenario():
+        pipeline = _Pipeline()
+        coordinator = RerunCoordinator(pipeline)
+        first = asyncio.create_task(coordinator.submit("light"))
+        await _until(lambda: pipeline.ran)
+        queued = asyncio.create_task(coordinator.submit("medium"))
+        await asyncio.sleep(0.01)
+        upgraded = asyncio.create_task(coordinator.submit("deep"))
+        await asyncio.sleep(0.01)
+        pipeline.release.set()
+        await first
+        return pipeline.ran, await queued, await upgraded
+
+    ran, (queued_result, queued_info), (_, upgraded_info) = asyncio.run(scenario())
+    assert ran == ["light", "deep"]
+    assert queued_info["decision"] == "queued" and queued_info["executed_intent"] == "deep"
+    assert queued_result == {"intent": "deep"}
+    assert upgraded_info["decision"] == "superseded_queued"
+
+def test_failed_run_reaches_every_caller_and_frees_the_slot():
+    async def scenario():
+        pipeline = _Pipeline()
+        pipeline.error = ValueError("scrape failed")
+        coordinator = RerunCoordinator(pipeline)
+        calls = [asyncio.create_task(coordinator.submit("light")) for _ in range(2)]
+        await _until(lambda: pipeline.ran)
+        pipeline.release.set()
+        errors = await asyncio.gather(*calls, return_exceptions=True)
+        return errors, coordinator.status()
+
+    errors, status = asyncio.run(scenario())
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert status["active"] is None
+
+def test_cancelled_driver_settles_active_and_queued_jobs():
+    async def scenario():
+        pipeline = _Pipeline()
+        coordinator = RerunCoordinator(pipeline)
+        active = asyncio.create_task(coordinator.submit("light"))
+        await _until(lambda: pipeline.ran)
+        queued = asyncio.create_task(coordinator.submit("deep"))
+        await asyncio.sleep(0.01)
+        coordinator._task.cancel()
+        results = await asyncio.wait_for(asyncio.gather(active, queued, return_exceptions=True), 2)
+        pipeline.release.set()
+        return results, coordinator.status()
+
+    results, status = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert status == {"active": None, "queued": None}
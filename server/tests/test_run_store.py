@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+from pathlib import Path
+
+import pytest
+
+import run_store
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_store, "STORAGE_DIR", tmp_path)
+    monkeypatch.setattr(run_store, "RUNS_DIR", tmp_path / "runs")
+    monkeypatch.setattr(run_store, "POINTER_FILE", tmp_path / "LATEST")
+    monkeypatch.setattr(run_store, "LEGACY_DIR", tmp_path / "latest")
+    monkeypatch.setattr(run_store, "KEEP_FULL_RUNS", 1)
+    monkeypatch.setattr(run_store, "KEEP_MAX_RUNS", 1)
+    monkeypatch.setattr(run_store, "_pointer_cache", (None, None))
+    return tmp_path
+
+def _published_run() -> str:
+    run_id, path = run_store.create_run()
+    (path / "analysis_output.csv").write_text("a\n1\n")
+    run_store.publish(run_id)
+    # LATEST can be replaced within the same mtime tick
+    run_store._pointer_cache = (None, None)
+    return run_id
+
+def test_pinned_run_survives_compaction_until_released(store):
+    old = _published_run()
+    run_id, _ = run_store.acquire()
+    assert run_id == old
+    _published_run()
+    assert old not in run_store.compact()["deleted"]
+    assert run_store.is_pinned(old)
+    run_store.release(run_id)
+    assert not run_store.is_pinned(old)
+    assert old in run_store.compact()["deleted"]
+
+def test_pins_are_counted(store):
+    old = _published_run()
+    run_store.acquire()
+    with run_store.pinned() as (run_id, _):
+        assert run_id == old
+    assert run_store.is_pinned(old)
+    run_store.release(old)
+    assert not run_store.is_pinned(old)
+    assert not run_store._pin_files
+
+@pytest.mark.skipif(run_store.fcntl is None, reason="pins are per process without fcntl")
+def test_pin_held_by_another_process_blocks_compaction(store):
+    old = _published_run()
+    child = subprocess.Popen([sys.executable, "-c", textwrap.dedent(f"""
+        import sys
+        from pathlib import Path
+        import run_store
+        root = Path({str(store)!r})
+        run_store.RUNS_DIR, run_store.POINTER_FILE = root / "runs", root / "LATEST"
+        print(run_store.acquire()[0], flush=True)
+        sys.stdin.readline()
+    """)], cwd=SERVER_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert child.stdout.readline().strip() == old
+        _published_run()
+        assert run_store.is_pinned(old)
+        assert old not in run_store.compact()["deleted"]
+        assert (store / "runs" / old).is_dir()
+    finally:
+        child.communicate("\n", timeout=10)
+    assert old in run_store.compact()["deleted"]
+
+def test_acquire_does_not_wait_for_compaction_io(store, monkeypatch):
+    old = _published_run()
+    current = _published_run()
+    removing, done = threading.Event(), threading.Event()
+    remove_run = run_store._remove_run
+    def slow_remove(path):
+        removing.set()
+        done.wait(10)
+        return remove_run(path)
+    monkeypatch.setattr(run_store, "_remove_run", slow_remove)
+    compaction = threading.Thread(target=run_store.compact)
+    compaction.start()
+    try:
+        assert removing.wait(10)
+        # the old run is removed without holding the in-process lock: readers go straight through
+        with run_store.pinned() as (run_id, _):
+            assert run_id == current
+    finally:
+        done.set()
+        compaction.join(10)
+    assert not (store / "runs" / old).exists()
@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import trend_store
+
+def ts(text: str) -> float:
+    return datetime.fromisoformat(text).replace(tzinfo=timezone.utc).timestamp()
+
+def rollups(posts: int, positive: int) -> dict:
+    return {"posts": posts, "counts": {"sentiment": {"Positive": positive, "Negative": posts - positive}}}
+
+@pytest.fixture
+def db(tmp_path):
+    return tmp_path / "trends.sqlite3"
+
+def test_runs_of_the_same_hour_are_all_kept(db):
+    trend_store.append_run("a", ts("2024-03-04 10:05"), rollups(10, 4), "light", db_path=db)
+    trend_store.append_run("b", ts("2024-03-04 10:50"), rollups(30, 6), "deep", db_path=db)
+    [hour] = trend_store.trends("sentiment", ts("2024-03-04 00:00"), ts("2024-03-05 00:00"), "hour", db_path=db)["buckets"]
+    assert hour["start"] == "2024-03-04T10:00:00Z"
+    assert hour["runs"] == 2 and hour["posts"] == 40
+    assert hour["counts"] == {"Negative": 30, "Positive": 10}
+    assert hour["mean_per_run"] == {"Negative": 15.0, "Positive": 5.0}
+    assert hour["share"] == {"Negative": 0.75, "Positive": 0.25}
+
+def test_reappending_a_run_replaces_it(db):
+    trend_store.append_run("a", ts("2024-03-04 10:05"), rollups(10, 4), db_path=db)
+    trend_store.append_run("a", ts("2024-03-04 10:05"), rollups(10, 7), db_path=db)
+    [hour] = trend_store.trends("sentiment", ts("2024-03-04 00:00"), ts("2024-03-05 00:00"), "hour", db_path=db)["buckets"]
+    assert hour["runs"] == 1 and hour["counts"]["Positive"] == 7
+
+def test_day_week_and_month_buckets(db):
+    # Sunday 2024-03-03, Monday 2024-03-04, Friday 2024-03-29, Monday 2024-04-01
+    for run_id, when in (("a", "2024-03-03 23:30"), ("b", "2024-03-04 00:30"), ("c", "2024-03-29 12:00"),
+                         ("d", "2024-04-01 08:00")):
+        trend_store.append_run(run_id, ts(when), rollups(10, 5), db_path=db)
+    start, end = ts("2024-03-01 00:00"), ts("2024-05-01 00:00")
+
+    def starts(bucket):
+        return [(b["start"], b["runs"]) for b in trend_store.trends("sentiment", start, end, bucket, db_path=db)["buckets"]]
+
+    assert starts("day") == [("2024-03-03T00:00:00Z", 1), ("2024-03-04T00:00:00Z", 1),
+                             ("2024-03-29T00:00:00Z", 1), ("2024-04-01T00:00:00Z", 1)]
+    assert starts("week") == [("2024-02-26T00:00:00Z", 1), ("2024-03-04T00:00:00Z", 1),
+                              ("2024-03-25T00:00:00Z", 1), ("2024-04-01T00:00:00Z", 1)]
+    assert starts("month") == [("2024-03-01T00:00:00Z", 3), ("2024-04-01T00:00:00Z", 1)]
+
+def test_range_is_half_open_and_start_rounds_down_to_the_hour(db):
+    trend_store.append_run("a", ts("2024-03-04 10:05"), rollups(10, 4), db_path=db)
+    assert trend_store.trends("sentiment", ts("2024-03-04 10:30"), ts("2024-03-04 11:00"), db_path=db)["buckets"]
+    assert not trend_store.trends("sentiment", ts("2024-03-04 00:00"), ts("2024-03-04 10:00"), db_path=db)["buckets"]
+
+def test_intent_filter(db):
+    trend_store.append_run("a", ts("2024-03-04 10:05"), rollups(10, 4), "light", db_path=db)
+    trend_store.append_run("b", ts("2024-03-04 10:50"), rollups(30, 6), "deep", db_path=db)
+    [hour] = trend_store.trends("sentiment", ts("2024-03-04 00:00"), ts("2024-03-05 00:00"), "hour", "deep",
+                                db_path=db)["buckets"]
+    assert hour["runs"] == 1 and hour["counts"] == {"Negative": 24, "Positive": 6}
+    assert [r["intent"] for r in trend_store.runs(db)] == ["deep", "light"]
+
+def test_unknown_metric_or_bucket(db):
+    with pytest.raises(ValueError):
+        trend_store.trends("mood", 0, 1, db_path=db)
+    with pytest.raises(ValueError):
+        trend_store.trends("sentiment", 0, 1, "year", db_path=db)
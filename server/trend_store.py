@@ -0,0 +1,206 @@
+"""
+Cross-run time series of stance metrics (SQLite, storage/trends/trends.sqlite3).
+Every published run appends its rollups: post counts per sentiment, nature, subreddit, topic
+and dangerous value (processor.ReportSummary.rollups()), keyed by run and filed under the UTC
+hour the run completed in, with the run's intent.
+Runs are snapshots of what was being posted when they ran, and overlapping runs see many of the
+same posts, so the counts are per snapshot: a bucket's counts are the sum over its runs, and a
+post seen by three runs counts three times. Compare buckets by share (count / posts over the
+bucket's runs) or mean_per_run, not by raw counts.
+/trends aggregates the hourly rows into hour / day / week (Monday) / month buckets with one
+indexed range scan, never reading the runs' CSVs.
+Topic ids are per run (each run fits its own LDA), so "topic" only compares within a run.
+Runs retained from before the store existed can be loaded with
+  python trend_store.py backfill
+Expose: METRICS, BUCKETS, append_run(run_id, completed_at, rollups, intent),
+trends(metric, start, end, bucket, intent), runs()
+"""
+
+import os,csv,gzip,json,time,sqlite3,logging,threading
+from pathlib import Path
+from collections import Counter
+from datetime import datetime, timezone
+
+logger = logging.getLogger("trend_store")
+
+BASE_DIR = Path(__file__).resolve().parent
+DB_PATH = Path(os.environ.get("TREND_DB", BASE_DIR / "storage" / "trends" / "trends.sqlite3"))
+METRICS = ("sentiment", "nature", "subreddit", "topic", "dangerous")
+HOUR = 3600
+# bucket -> SQL expression of its start (epoch seconds, UTC) from the hourly bucket column
+BUCKETS = {
+    "hour": "bucket",
+    "day": "bucket - bucket % 86400",
+    # 1970-01-05 was a Monday
+    "week": "bucket - (bucket - 345600) % 604800",
+    "month": "CAST(strftime('%s', bucket, 'unixepoch', 'start of month') AS INTEGER)",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    bucket INTEGER NOT NULL,
+    completed_at REAL NOT NULL,
+    posts INTEGER NOT NULL,
+    intent TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_bucket ON runs (bucket);
+CREATE TABLE IF NOT EXISTS rollups (
+    metric TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    run_id TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (metric, bucket, run_id, value)
+) WITHOUT ROWID;
+"""
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+def _connect(db_path: Path = None) -> sqlite3.Connection:
+    db_path = Path(db_path or DB_PATH)
+    with _init_lock:
+        if db_path not in _initialized:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            with sqlite3.connect(db_path) as conn:
+                # readers (/trends) never wait on a run being appended
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+            _initialized.add(db_path)
+    return sqlite3.connect(db_path, timeout=10)
+
+def append_run(run_id: str, completed_at: float, rollups: dict, intent: str = None, db_path: Path = None) -> bool:
+    """
+    Store one run's rollups ({"posts": N, "counts": {metric: {value: count}}}); appending the
+    same run again replaces its rows. Other runs of the same hour are kept.
+    """
+    bucket = int(completed_at) // HOUR * HOUR
+    conn = _connect(db_path)
+    try:
+        with conn:
+            previous = conn.execute("SELECT bucket FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if previous is not None:
+                # by primary key prefix, not a scan on run_id
+                conn.executemany("DELETE FROM rollups WHERE metric = ? AND bucket = ? AND run_id = ?",
+                                 [(metric, previous[0], run_id) for metric in METRICS])
+            conn.execute("INSERT OR REPLACE INTO runs (run_id, bucket, completed_at, posts, intent) VALUES (?, ?, ?, ?, ?)",
+                         (run_id, bucket, completed_at, int(rollups.get("posts", 0)), intent))
+            conn.executemany(
+                "INSERT INTO rollups (metric, bucket, run_id, value, count) VALUES (?, ?, ?, ?, ?)",
+                [(metric, bucket, run_id, str(value), int(count))
+                 for metric, counts in rollups.get("counts", {}).items() if metric in METRICS
+                 for value, count in counts.items() if count])
+    finally:
+        conn.close()
+    logger.info("Trend store: appended run %s (%s, %d posts) to hour %s", run_id, intent or "no intent",
+                rollups.get("posts", 0), _iso(bucket))
+    return True
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def trends(metric: str, start: float, end: float, bucket: str = "day", intent: str = None,
+           db_path: Path = None) -> dict:
+    """
+    Per bucket, for runs completed in [start, end) (of one intent when given): runs, posts and
+    counts summed over the runs' snapshots, mean_per_run = counts / runs and share = count / posts.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {', '.join(METRICS)}")
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket {bucket!r}, expected one of {', '.join(BUCKETS)}")
+    # hourly rows: the hour a run falls in is its bucket, so round start down to the hour
+    lo, hi = int(start) // HOUR * HOUR, int(end)
+    expr = BUCKETS[bucket]
+    run_filter, run_args = "", ()
+    if intent is not None:
+        run_filter, run_args = "AND run_id IN (SELECT run_id FROM runs WHERE intent = ?)", (intent,)
+    conn = _connect(db_path)
+    try:
+        totals = conn.execute(
+            f"SELECT {expr} AS b, COUNT(*), SUM(posts) FROM runs WHERE bucket >= ? AND bucket < ? {run_filter} "
+            f"GROUP BY b ORDER BY b", (lo, hi) + run_args).fetchall()
+        counts = conn.execute(
+            f"SELECT {expr} AS b, value, SUM(count) FROM rollups WHERE metric = ? AND bucket >= ? AND bucket < ? "
+            f"{run_filter} GROUP BY b, value", (metric, lo, hi) + run_args).fetchall()
+    finally:
+        conn.close()
+    by_bucket = {}
+    for b, value, count in counts:
+        by_bucket.setdefault(b, {})[value] = count
+    series = []
+    for b, n_runs, posts in totals:
+        values = dict(sorted(by_bucket.get(b, {}).items(), key=lambda kv: -kv[1]))
+        series.append({
+            "start": _iso(b),
+            "runs": n_runs,
+            "posts": posts,
+            "counts": values,
+            "mean_per_run": {v: round(c / n_runs, 2) for v, c in values.items()},
+            "share": {v: round(c / posts, 4) for v, c in values.items()} if posts else {},
+        })
+    return {"metric": metric, "bucket": bucket, "intent": intent, "from": _iso(lo), "to": _iso(hi),
+            # counts are summed per-run snapshots: a post seen by several runs counts once per run
+            "counts": "per_snapshot", "buckets": series}
+
+def runs(db_path: Path = None) -> list:
+    """Stored runs, newest first."""
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute("SELECT run_id, completed_at, posts, intent FROM runs ORDER BY completed_at DESC").fetchall()
+    finally:
+        conn.close()
+    return [{"run_id": r, "completed_at": _iso(c), "posts": p, "intent": i} for r, c, p, i in rows]
+
+# ---- backfill from retained runs ----
+def rollups_from_csv(path: Path) -> dict:
+    """ReportSummary.rollups() recomputed from a run's analysis_output.csv(.gz)."""
+    counts = {metric: Counter() for metric in METRICS}
+    posts = 0
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            posts += 1
+            for metric in METRICS:
+                value = row.get(metric, "")
+                if value not in ("", None):
+                    counts[metric][value] += 1
+    counts["dangerous"]["False"] += posts - sum(counts["dangerous"].values())
+    return {"posts": posts, "counts": {m: dict(c) for m, c in counts.items()}}
+
+def backfill(db_path: Path = None) -> int:
+    """Append every retained run (full or compacted) not in the store yet. Returns runs appended."""
+    import run_store
+    stored = {r["run_id"] for r in runs(db_path)}
+    appended = 0
+    for run in reversed(run_store.list_runs()):
+        run_dir = run_store.RUNS_DIR / run["run_id"]
+        if run["run_id"] in stored:
+            continue
+        csv_path = next((p for p in (run_dir / "analysis_output.csv", run_dir / "analysis_output.csv.gz")
+                         if p.exists()), None)
+        if csv_path is None:
+            continue
+        meta_file = run_dir / "meta.json"
+        try:
+            meta = json.loads(meta_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            meta = {}
+        completed_at = float(meta.get("completed_at") or (meta_file if meta_file.exists() else csv_path).stat().st_mtime)
+        intent = (meta.get("budget") or {}).get("intent")
+        if append_run(run["run_id"], completed_at, rollups_from_csv(csv_path), intent, db_path):
+            appended += 1
+    return appended
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("command", choices=["backfill", "runs"])
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "backfill":
+        start = time.perf_counter()
+        print(f"Appended {backfill()} runs in {time.perf_counter() - start:.1f}s")
+    else:
+        print(json.dumps(runs(), indent=2))